@@ -0,0 +1,48 @@
+"""hash_refresh_tokens
+
+Revision ID: 3c9e5a1f7b2d
+Revises: afeda3715092
+Create Date: 2026-10-19 09:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5a1f7b2d'
+down_revision = 'afeda3715092'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Expired tokens are useless, don't bother hashing them
+    op.execute("DELETE FROM refresh_tokens WHERE expires_at < NOW()")
+    
+    # Replace raw tokens with their SHA-256 hex digest
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(64), nullable=True))
+    op.execute("UPDATE refresh_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True)
+    op.drop_column('refresh_tokens', 'token')
+    
+    # Indexes for set-based revocation and the periodic purge
+    op.create_index(
+        'ix_refresh_tokens_user_id_active', 'refresh_tokens', ['user_id'],
+        postgresql_where=sa.text('NOT is_revoked')
+    )
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_expires_at', 'refresh_tokens')
+    op.drop_index('ix_refresh_tokens_user_id_active', 'refresh_tokens')
+    
+    # Raw tokens can't be recovered: restore the column and revoke everything
+    op.add_column('refresh_tokens', sa.Column('token', sa.String, nullable=True))
+    op.execute("UPDATE refresh_tokens SET token = token_hash, is_revoked = TRUE")
+    op.alter_column('refresh_tokens', 'token', nullable=False)
+    op.create_index('ix_refresh_tokens_token', 'refresh_tokens', ['token'], unique=True)
+    op.drop_index('ix_refresh_tokens_token_hash', 'refresh_tokens')
+    op.drop_column('refresh_tokens', 'token_hash')
@@ -0,0 +1,38 @@
+"""add_email_dead_letters
+
+Revision ID: 8d4b2e6f1a7c
+Revises: 3c9e5a1f7b2d
+Create Date: 2026-10-19 09:30:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b2e6f1a7c'
+down_revision = '3c9e5a1f7b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Emails the outbound queue gave up on
+    op.create_table(
+        'email_dead_letters',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('to_email', sa.String(255), nullable=False),
+        sa.Column('subject', sa.String(255), nullable=False),
+        sa.Column('category', sa.String(50), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()'))
+    )
+    op.create_index('ix_email_dead_letters_to_email', 'email_dead_letters', ['to_email'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_dead_letters_to_email', 'email_dead_letters')
+    op.drop_table('email_dead_letters')
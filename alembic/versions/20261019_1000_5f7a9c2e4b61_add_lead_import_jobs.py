@@ -0,0 +1,45 @@
+"""add_lead_import_jobs
+
+Revision ID: 5f7a9c2e4b61
+Revises: 8d4b2e6f1a7c
+Create Date: 2026-10-19 10:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5f7a9c2e4b61'
+down_revision = '8d4b2e6f1a7c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Progress of bulk lead imports, readable from any worker
+    op.create_table(
+        'lead_import_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('format', sa.String(10), nullable=False),
+        sa.Column('qualify', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('rows_read', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('rows_imported', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('rows_failed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('rows_enqueued', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('error_file', sa.String(500), nullable=True),
+        sa.Column('error_message', sa.Text, nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()'))
+    )
+    # The qualification feeder pages through an import's leads by source
+    op.create_index('ix_leads_source_id', 'leads', ['source', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_leads_source_id', 'leads')
+    op.drop_table('lead_import_jobs')
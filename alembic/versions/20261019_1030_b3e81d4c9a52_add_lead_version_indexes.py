@@ -0,0 +1,33 @@
+"""add_lead_version_indexes
+
+Revision ID: b3e81d4c9a52
+Revises: 5f7a9c2e4b61
+Create Date: 2026-10-19 10:30:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e81d4c9a52'
+down_revision = '5f7a9c2e4b61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lead reads probe (id, updated_at) for their ETag; covering indexes let
+    # the probe for a single lead and for the default list page skip the heap
+    op.create_index('ix_leads_id_updated_at', 'leads', ['id'], postgresql_include=['updated_at'])
+    op.create_index(
+        'ix_leads_created_at_version',
+        'leads',
+        [sa.text('created_at DESC')],
+        postgresql_include=['id', 'updated_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_leads_created_at_version', 'leads')
+    op.drop_index('ix_leads_id_updated_at', 'leads')
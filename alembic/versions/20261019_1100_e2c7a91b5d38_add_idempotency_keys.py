@@ -0,0 +1,45 @@
+"""add_idempotency_keys
+
+Revision ID: e2c7a91b5d38
+Revises: b3e81d4c9a52
+Create Date: 2026-10-19 11:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7a91b5d38'
+down_revision = 'b3e81d4c9a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # First response to repeated /leads/qualify requests; the primary key
+    # resolves concurrent duplicates
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.String(64), primary_key=True),
+        sa.Column(
+            'lead_id',
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('leads.id', ondelete='CASCADE', deferrable=True, initially='DEFERRED'),
+            nullable=False,
+        ),
+        sa.Column('request_hash', sa.String(64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()'))
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+    # The cascade from deleted leads looks keys up by lead
+    op.create_index('ix_idempotency_keys_lead_id', 'idempotency_keys', ['lead_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotency_keys_lead_id', 'idempotency_keys')
+    op.drop_index('ix_idempotency_keys_expires_at', 'idempotency_keys')
+    op.drop_table('idempotency_keys')
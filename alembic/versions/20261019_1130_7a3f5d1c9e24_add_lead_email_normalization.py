@@ -0,0 +1,75 @@
+"""add_lead_email_normalization
+
+Revision ID: 7a3f5d1c9e24
+Revises: e2c7a91b5d38
+Create Date: 2026-10-19 11:30:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3f5d1c9e24'
+down_revision = 'e2c7a91b5d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('leads', sa.Column('email_normalized', sa.String(255), nullable=True))
+    op.add_column('leads', sa.Column('tenant', sa.String(100), nullable=False, server_default='anonymous'))
+    op.add_column('lead_import_jobs', sa.Column('rows_merged', sa.Integer, nullable=False, server_default='0'))
+
+    # Same keys as tenant_key(): the creator's company, else the creator
+    op.execute("""
+        UPDATE leads
+        SET tenant = CASE
+            WHEN users.company_id IS NOT NULL THEN 'company:' || users.company_id
+            ELSE 'user:' || users.id
+        END
+        FROM users
+        WHERE users.id = leads.created_by
+    """)
+    # Same rules as normalize_email(): fold case, drop +tags, drop dots for Gmail
+    op.execute("""
+        UPDATE leads
+        SET email_normalized = CASE
+            WHEN domain IN ('gmail.com', 'googlemail.com')
+                THEN replace(split_part(local, '+', 1), '.', '') || '@gmail.com'
+            ELSE split_part(local, '+', 1) || '@' || domain
+        END
+        FROM (
+            SELECT id AS lead_id,
+                   regexp_replace(lower(trim(email)), '@[^@]*$', '') AS local,
+                   substring(lower(trim(email)) FROM '@([^@]*)$') AS domain
+            FROM leads
+        ) AS parts
+        WHERE parts.lead_id = leads.id
+    """)
+    # Existing duplicates stay as they are; only the newest of each becomes
+    # the lead later submissions merge into
+    op.execute("""
+        UPDATE leads
+        SET email_normalized = NULL
+        FROM (
+            SELECT id AS lead_id,
+                   row_number() OVER (PARTITION BY tenant, email_normalized ORDER BY created_at DESC, id) AS position
+            FROM leads
+        ) AS ranked
+        WHERE ranked.lead_id = leads.id AND ranked.position > 1
+    """)
+    op.create_index(
+        'uq_leads_tenant_email_normalized',
+        'leads',
+        ['tenant', 'email_normalized'],
+        unique=True,
+        postgresql_where=sa.text('email_normalized IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_leads_tenant_email_normalized', 'leads')
+    op.drop_column('lead_import_jobs', 'rows_merged')
+    op.drop_column('leads', 'tenant')
+    op.drop_column('leads', 'email_normalized')
@@ -0,0 +1,32 @@
+"""add_lead_message_signature
+
+Revision ID: c5d8e2f4a716
+Revises: 7a3f5d1c9e24
+Create Date: 2026-10-19 12:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d8e2f4a716'
+down_revision = '7a3f5d1c9e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing leads stay unsigned; the index fills as leads are qualified
+    op.add_column('leads', sa.Column('message_signature', sa.LargeBinary, nullable=True))
+    op.create_index(
+        'ix_leads_signed_updated_at',
+        'leads',
+        [sa.text('updated_at DESC')],
+        postgresql_where=sa.text('message_signature IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_leads_signed_updated_at', 'leads')
+    op.drop_column('leads', 'message_signature')
@@ -0,0 +1,28 @@
+"""add_idempotency_key_merged
+
+Revision ID: f1a9c3e7b052
+Revises: c5d8e2f4a716
+Create Date: 2026-10-19 12:30:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9c3e7b052'
+down_revision = 'c5d8e2f4a716'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Replays of a request merged into an existing lead must not return it
+    op.add_column(
+        'idempotency_keys',
+        sa.Column('merged', sa.Boolean, nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'merged')
@@ -0,0 +1,29 @@
+"""add_lead_qualification_heartbeat
+
+Revision ID: 9d4b6e2a8c13
+Revises: f1a9c3e7b052
+Create Date: 2026-10-19 13:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b6e2a8c13'
+down_revision = 'f1a9c3e7b052'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Refreshed while a worker still holds the lead for qualification, so
+    # the stale lead reaper leaves queued leads alone
+    op.add_column(
+        'leads',
+        sa.Column('qualification_heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('leads', 'qualification_heartbeat_at')
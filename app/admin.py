@@ -4,6 +4,7 @@ SQLAdmin interface for LeadGenie
 
 from sqladmin import Admin, ModelView
 from sqladmin.authentication import AuthenticationBackend
+from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,6 +14,7 @@ import structlog
 from app.models.user import User
 from app.models.lead import Lead
 from app.models.otp import EmailOTP
+from app.models.email_dead_letter import EmailDeadLetter
 from app.core.database import engine, async_session_factory
 from app.services import auth as auth_service
 
@@ -128,6 +130,24 @@ class EmailOTPAdmin(ModelView, model=EmailOTP):
     icon = "fa-solid fa-key"
 
 
+class EmailDeadLetterAdmin(ModelView, model=EmailDeadLetter):
+    column_list = [
+        EmailDeadLetter.id, EmailDeadLetter.to_email, EmailDeadLetter.category,
+        EmailDeadLetter.attempts, EmailDeadLetter.last_error, EmailDeadLetter.created_at
+    ]
+    column_searchable_list = [EmailDeadLetter.to_email]
+    column_sortable_list = [EmailDeadLetter.to_email, EmailDeadLetter.created_at]
+    column_filters = [EmailDeadLetter.category]
+    
+    # Audit records only
+    can_create = False
+    can_edit = False
+    
+    name = "Failed Email"
+    name_plural = "Failed Emails"
+    icon = "fa-solid fa-envelope"
+
+
 def setup_admin(app):
     """Setup SQLAdmin with authentication"""
     
@@ -148,6 +168,16 @@ def setup_admin(app):
     admin.add_view(UserAdmin)
     admin.add_view(LeadAdmin)
     admin.add_view(EmailOTPAdmin)
+    admin.add_view(EmailDeadLetterAdmin)
     
     logger.info("SQLAdmin setup complete")
-    return admin
\ No newline at end of file
+    return admin
+
+
+def build_admin_app():
+    """
+    Build the SQLAdmin ASGI app on its own, for mounting at /admin.
+    main.py mounts it lazily so SQLAdmin is only imported on first use.
+    """
+    admin = setup_admin(Starlette())
+    return admin.admin
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy import select, func
 from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 
-from app.core.deps import get_db, get_current_admin_user
+from app.core.deps import DbSession, ReadDbSession, get_current_admin_user
+from app.core.lead_cache import lead_response_cache
 from app.schemas.user import UserResponse
 from app.schemas.lead import LeadResponse, LeadUpdate
 from app.models.user import User
@@ -15,7 +15,7 @@ router = APIRouter()
 
 @router.get("/users", response_model=List[UserResponse])
 async def list_users(
-    db: AsyncSession = Depends(get_db),
+    db: ReadDbSession,
     current_admin: User = Depends(get_current_admin_user),
     skip: int = 0,
     limit: int = 100
@@ -27,7 +27,7 @@ async def list_users(
 
 @router.get("/leads", response_model=List[LeadResponse])
 async def list_all_leads(
-    db: AsyncSession = Depends(get_db),
+    db: ReadDbSession,
     current_admin: User = Depends(get_current_admin_user),
     category: Optional[str] = None,
     skip: int = 0,
@@ -40,13 +40,16 @@ async def list_all_leads(
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
     leads = result.scalars().all()
-    return leads
+    # Reuse the JSON bodies cached per lead version instead of validating
+    # and serializing the whole page again
+    body = b"[" + b",".join(lead_response_cache.serialize(lead)[1] for lead in leads) + b"]"
+    return Response(content=body, media_type="application/json")
 
 @router.put("/leads/{lead_id}", response_model=LeadResponse)
 async def update_lead(
     lead_id: UUID,
     lead_update: LeadUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     current_admin: User = Depends(get_current_admin_user)
 ):
     """Update a lead's details (admin only)"""
@@ -62,14 +65,13 @@ async def update_lead(
         setattr(lead, field, value)
     
     lead.updated_at = datetime.utcnow()
-    await db.commit()
-    await db.refresh(lead)
+    await db.flush()
     return lead
 
 @router.delete("/leads/{lead_id}")
 async def delete_lead(
     lead_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     current_admin: User = Depends(get_current_admin_user)
 ):
     """Delete a lead (admin only)"""
@@ -82,12 +84,11 @@ async def delete_lead(
         )
     
     await db.delete(lead)
-    await db.commit()
     return {"message": "Lead deleted successfully"}
 
 @router.get("/stats")
 async def get_system_stats(
-    db: AsyncSession = Depends(get_db),
+    db: ReadDbSession,
     current_admin: User = Depends(get_current_admin_user)
 ):
     """Get system statistics (admin only)"""
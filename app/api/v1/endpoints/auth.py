@@ -2,12 +2,13 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 import uuid
 
 from app.core.config import settings
-from app.core.deps import get_db, get_current_user
+from app.core.deps import DbSession, get_current_user
+from app.core.invalidation import invalidation_bus
+from app.core.principal_cache import principal_cache
 from app.core.rate_limiter import limiter, AUTH_RATE_LIMITS
 from app.services import auth as auth_service
 from app.services.otp import OTPService
@@ -22,7 +23,7 @@ router = APIRouter()
 async def login(
     request: Request,
     response: Response,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
@@ -76,7 +77,7 @@ async def login(
 async def register(
     request: Request,
     *,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     user_in: UserCreate,
 ) -> Any:
     """
@@ -100,13 +101,12 @@ async def register(
     """), {
         "id": user_id,
         "email": user_in.email,
-        "hashed_password": auth_service.get_password_hash(user_in.password),
+        "hashed_password": await auth_service.get_password_hash_async(user_in.password),
         "full_name": user_in.full_name,
         "role": role_value,
         "is_active": True,
         "is_superuser": False,
     })
-    await db.commit()
     
     # Fetch the created user
     result = await db.execute(select(User).filter(User.id == user_id))
@@ -117,7 +117,7 @@ async def register(
 async def refresh_token(
     request: Request,
     response: Response,
-    db: AsyncSession = Depends(get_db)
+    db: DbSession
 ) -> Any:
     """
     Refresh access token using refresh token from cookie
@@ -130,7 +130,8 @@ async def refresh_token(
             detail="Refresh token not found"
         )
     
-    user = await auth_service.verify_refresh_token(db, refresh_token_value)
+    # Revoke the old refresh token; committed together with the new one
+    user = await auth_service.consume_refresh_token(db, refresh_token_value)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -143,8 +144,7 @@ async def refresh_token(
             detail="Inactive user"
         )
     
-    # Revoke the old refresh token and create new ones
-    await auth_service.revoke_refresh_token(db, refresh_token_value)
+    # Create new tokens in the same transaction as the revocation
     access_token, new_refresh_token = await auth_service.create_tokens(db, str(user.id))
     
     # Set new secure httpOnly cookies
@@ -176,7 +176,7 @@ async def refresh_token(
 async def logout(
     request: Request,
     response: Response,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
@@ -187,6 +187,10 @@ async def logout(
     if refresh_token_value:
         await auth_service.revoke_refresh_token(db, refresh_token_value)
     
+    access_token_value = request.cookies.get("access_token")
+    if access_token_value:
+        principal_cache.invalidate_token(current_user.id, access_token_value)
+    
     # Clear cookies
     response.delete_cookie(key="access_token", httponly=True, secure=settings.SECURE_COOKIES, samesite="lax")
     response.delete_cookie(key="refresh_token", httponly=True, secure=settings.SECURE_COOKIES, samesite="lax")
@@ -196,13 +200,15 @@ async def logout(
 @router.post("/logout-all")
 async def logout_all(
     response: Response,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Logout user from all devices by revoking all refresh tokens
     """
     await auth_service.revoke_all_user_tokens(db, str(current_user.id))
+    principal_cache.invalidate_user(current_user.id)
+    await invalidation_bus.publish(db, "principal", current_user.id)
     
     # Clear cookies on this device
     response.delete_cookie(key="access_token", httponly=True, secure=settings.SECURE_COOKIES, samesite="lax")
@@ -224,7 +230,7 @@ async def read_users_me(
 async def send_verification_otp(
     request: Request,
     *,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     otp_request: OTPRequest,
 ) -> Any:
     """
@@ -264,7 +270,7 @@ async def send_verification_otp(
 async def verify_otp(
     request: Request,
     *,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     otp_verification: OTPVerification,
 ) -> Any:
     """
@@ -290,7 +296,7 @@ async def verify_otp(
 async def register_with_otp(
     request: Request,
     *,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     user_in: UserRegistrationWithOTP,
 ) -> Any:
     """
@@ -329,13 +335,12 @@ async def register_with_otp(
     """), {
         "id": user_id,
         "email": user_in.email,
-        "hashed_password": auth_service.get_password_hash(user_in.password),
+        "hashed_password": await auth_service.get_password_hash_async(user_in.password),
         "full_name": user_in.full_name,
         "role": role_value,
         "is_active": True,
         "is_superuser": False,
     })
-    await db.commit()
     
     # Fetch the created user
     result = await db.execute(select(User).filter(User.id == user_id))
@@ -1,53 +1,130 @@
 
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+import os
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy import select, func, desc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 from typing import List, Optional
 import structlog
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from app.core.database import get_db, async_session_factory
-from app.core.deps import get_current_user
+from app.core.database import DbSession, ReadDbSession, async_session_factory, client_last_write, replica_router
+from app.core.deps import get_current_user, get_current_manager_user, get_optional_current_user
+from app.core.lead_cache import (
+    etag_matches, json_response, lead_etag, lead_list_body, lead_response_cache, lead_version, list_etag, not_modified
+)
+from app.core.metrics import QUALIFICATION_REPLAYS, qualification_queue
+from app.core.notify import PENDING_STATUSES, lead_event_broker, lead_stream, stamp_lead_event, user_stream
+from app.core.rate_limiter import limiter, GENERAL_RATE_LIMITS
+from app.crud.crud_lead import lead_filters
+from app.services import idempotency
 from app.services.ai import LeadQualificationAI
+from app.services.ai.similar_leads import publish_signature
+from app.services.lead_export import EXPORT_FORMATS, stream_leads
+from app.services.lead_import import UploadTooLarge, lead_importer, spool_path, spool_upload
+from app.services.lead_merge import ingest_lead
+from app.services.qualification_scheduler import TenantQueueFull, qualification_scheduler, tenant_key
 from app.models.lead import Lead, LeadStatus
+from app.models.lead_import_job import LeadImportJob
 from app.models.user import User
-from app.schemas.lead import LeadCreate, LeadResponse, LeadList, LeadStats, LeadUpdate, LeadScoringAnalysis
+from app.schemas.lead import (
+    LeadAccepted, LeadCreate, LeadResponse, LeadList, LeadStats, LeadUpdate, LeadScoringAnalysis, lead_projection, parse_lead_fields
+)
+from app.schemas.lead_import import LeadImportJobResponse
 
 logger = structlog.get_logger()
 router = APIRouter()
 
-@router.post("/qualify", response_model=LeadResponse)
+LEAD_RESPONSE_FIELDS = tuple(LeadResponse.model_fields)
+
+def _merge_accepted(replayed: bool = False) -> JSONResponse:
+    # Anyone can submit any address, so a merge must not reveal the lead it
+    # went into, not even its id (GET /leads/{id} is public)
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return JSONResponse(LeadAccepted().model_dump(), status_code=202, headers=headers)
+
+
+@router.post(
+    "/qualify",
+    response_model=LeadResponse,
+    responses={202: {"model": LeadAccepted, "description": "Merged into an existing lead, which is not returned"}},
+)
+@limiter.limit(GENERAL_RATE_LIMITS["create"])
 async def qualify_lead(
+    request: Request,
+    response: Response,
     lead: LeadCreate,
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db)
+    db: DbSession,
+    current_user: Optional[User] = Depends(get_optional_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=idempotency.MAX_KEY_LENGTH),
 ):
     """
     Qualify a single lead using AI analysis.
+    Leads are queued per tenant and qualified fairly across tenants.
+    A repeated request (same Idempotency-Key, or without one the same body
+    within a short window) returns the original lead instead of a new one.
+    A lead for an address the tenant already has is merged into that lead,
+    and the answer is 202 without the lead.
     """
+    tenant = tenant_key(current_user)
+    identity = idempotency.identify_request(tenant, lead, idempotency_key)
     try:
-        # Create lead record
-        db_lead = Lead(
-            name=lead.name,
-            email=lead.email,
-            company=lead.company,
-            message=lead.message,
-            category="cold",  # Default category
-            score=0,  # Default score
-            status=LeadStatus.PROCESSING.value
+        original = await idempotency.find_original_lead(db, identity)
+        if original is None:
+            await qualification_scheduler.check_admission(tenant)
+            # A lead for the same mailbox is merged into rather than duplicated
+            new_lead_id = uuid4()
+            lead_id, lead_data = await ingest_lead(
+                db, new_lead_id, lead, tenant, current_user.id if current_user else None
+            )
+            merged = lead_id != new_lead_id
+            original = await idempotency.claim(db, identity, lead_id, merged=merged)
+            if original is not None:
+                # A concurrent repeat got there first; undo this submission
+                await db.rollback()
+    except idempotency.IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different lead",
+        )
+    except TenantQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many leads are waiting for qualification. Please retry later.",
+            headers={"Retry-After": "30"},
         )
-        db.add(db_lead)
+
+    if original is not None:
+        QUALIFICATION_REPLAYS.labels(identity.source).inc()
+        if original.merged:
+            return _merge_accepted(replayed=True)
+        original_lead = await db.get(Lead, original.lead_id)
+        if original_lead is None:
+            # Deleted since; its key went with it, so a retry creates a lead
+            raise HTTPException(status_code=409, detail="The original lead was deleted. Please retry.")
+        response.headers["Idempotent-Replayed"] = "true"
+        return original_lead
+
+    try:
+        # Commit now rather than at the end of the request: a worker may
+        # pick the lead up before this handler returns
         await db.commit()
-        await db.refresh(db_lead)
 
-        # Queue AI processing as background task
-        background_tasks.add_task(
-            process_lead_qualification,
-            db_lead.id,
-            lead.dict()
-        )
+        # Queue AI processing on the tenant's qualification queue, unless
+        # the submission added nothing to an existing lead
+        if lead_data is not None:
+            qualification_queue.enqueued(lead_id)
+            await qualification_scheduler.submit(
+                tenant,
+                lead_id,
+                lambda: process_lead_qualification(lead_id, lead_data)
+            )
 
-        return db_lead
+        if merged:
+            return _merge_accepted()
+        return await db.get(Lead, lead_id)
 
     except Exception as e:
         logger.error("lead_qualification_failed", error=str(e))
@@ -56,10 +133,13 @@ async def qualify_lead(
 async def process_lead_qualification(
     lead_id: str,
     lead_data: dict
-):
+) -> Optional[int]:
     """
     Background task for lead qualification.
+    Returns: LLM tokens used, for the tenant's token quota
     """
+    qualification_queue.started(lead_id)
+    ai_service = None
     async with async_session_factory() as db:
         try:
             ai_service = LeadQualificationAI(db)
@@ -79,22 +159,35 @@ async def process_lead_qualification(
                 # Store detailed analysis
                 lead_record.intent_analysis = {
                     "confidence": qualification.get("confidence"),
-                    "reasoning": qualification.get("reasoning")
+                    "reasoning": qualification.get("reasoning"),
+                    # The LLM's own score, for rescoring this analysis if reused
+                    "original_score": qualification.get("ai_original_score"),
                 }
                 lead_record.buying_signals = qualification.get("buying_signals", [])
                 lead_record.risk_factors = qualification.get("risk_factors", [])
                 lead_record.next_actions = qualification.get("next_actions", [])
                 lead_record.scoring_breakdown = qualification.get("scoring_breakdown")
+                # Set when triage scored the lead as junk without the LLM
+                lead_record.reason = qualification.get("triage_reason")
+                # Set when the LLM qualified it; its analysis may then be reused
+                lead_record.message_signature = qualification.get("message_signature")
                 lead_record.status = LeadStatus.QUALIFIED.value
+                await db.flush()
+                await publish_signature(db, lead_record)
+                await stamp_lead_event(db, lead_record)
 
-                await db.commit()
+            # The processing log and the lead are written in one transaction
+            await db.commit()
 
+            if lead_record:
                 logger.info(
                     "lead_qualified",
                     lead_id=lead_id,
                     ai_score=qualification.get("score"),
                     enhanced_score=qualification.get("enhanced_score"),
-                    category=qualification.get("category")
+                    category=qualification.get("category"),
+                    triage_reason=qualification.get("triage_reason"),
+                    similar_lead_id=qualification.get("similar_lead_id"),
                 )
 
         except Exception as e:
@@ -105,63 +198,95 @@ async def process_lead_qualification(
             )
 
             # Update lead status to failed
+            await db.rollback()
             lead_record = await db.get(Lead, lead_id)
             if lead_record:
                 lead_record.status = LeadStatus.FAILED.value
+                await db.flush()
+                await stamp_lead_event(db, lead_record)
                 await db.commit()
 
+    return ai_service.tokens_used if ai_service else None
+
 
 @router.get("/", response_model=LeadList)
+@limiter.limit(GENERAL_RATE_LIMITS["poll"])
 async def get_leads(
+    request: Request,
+    db: ReadDbSession,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     category: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = Query(
+        None, description="Comma-separated lead fields to return (id is always included); all fields when omitted"
+    )
 ):
     """
     Get paginated list of leads with filtering.
+    Sends an ETag over the page's lead versions and answers 304 when unchanged.
     """
     try:
-        # Base query
-        query = select(Lead)
-        count_query = select(func.count(Lead.id))
-        
-        # Apply filters
-        if category:
-            query = query.where(Lead.category == category)
-            count_query = count_query.where(Lead.category == category)
-        
-        if status:
-            query = query.where(Lead.status == status)
-            count_query = count_query.where(Lead.status == status)
-            
-        if search:
-            search_filter = Lead.name.ilike(f"%{search}%") | Lead.company.ilike(f"%{search}%")
-            query = query.where(search_filter)
-            count_query = count_query.where(search_filter)
+        selected = parse_lead_fields(fields) if fields else LEAD_RESPONSE_FIELDS
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Sparse fieldsets are serialized per request; full leads come from the cache
+    projection = lead_projection(selected) if fields else None
+
+    try:
+        conditions = lead_filters(category, status, search)
+        count_query = select(func.count(Lead.id)).where(*conditions)
         
         # Get total count
         total_result = await db.execute(count_query)
         total = total_result.scalar()
         
-        # Apply pagination and ordering
+        # Probe the page's lead versions first; full rows are loaded only for
+        # leads without a cached body
         offset = (page - 1) * per_page
-        query = query.order_by(desc(Lead.created_at)).offset(offset).limit(per_page)
+        version_query = (
+            select(Lead.id, Lead.updated_at)
+            .where(*conditions)
+            .order_by(desc(Lead.created_at))
+            .offset(offset)
+            .limit(per_page)
+        )
+        versions = [(row.id, lead_version(row.updated_at)) for row in await db.execute(version_query)]
+        etag = list_etag(total, versions, variant=",".join(selected))
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        result = await db.execute(query)
-        leads = result.scalars().all()
+        if projection is None:
+            bodies = {lead_id: lead_response_cache.get(lead_id, version) for lead_id, version in versions}
+        else:
+            bodies = dict.fromkeys(lead_id for lead_id, _ in versions)
+        missing = [lead_id for lead_id, body in bodies.items() if body is None]
+        if missing:
+            # Load only the columns being returned; the JSON analysis columns
+            # are the bulk of a lead row
+            result = await db.execute(
+                select(Lead)
+                .where(Lead.id.in_(missing))
+                .options(load_only(*(getattr(Lead, name) for name in selected)))
+            )
+            for lead in result.scalars():
+                if projection is None:
+                    bodies[lead.id] = lead_response_cache.serialize(lead)[1]
+                else:
+                    bodies[lead.id] = projection.model_validate(lead).model_dump_json().encode()
         
         total_pages = (total + per_page - 1) // per_page
         
-        return LeadList(
-            leads=leads,
+        # A lead deleted since the probe has no body and drops out of the page
+        body = lead_list_body(
+            [bodies[lead_id] for lead_id, _ in versions if bodies[lead_id] is not None],
             total=total,
             page=page,
             per_page=per_page,
             total_pages=total_pages
         )
+        return json_response(body, etag)
         
     except Exception as e:
         logger.error("get_leads_failed", error=str(e))
@@ -169,7 +294,8 @@ async def get_leads(
 
 
 @router.get("/stats", response_model=LeadStats)
-async def get_lead_stats(db: AsyncSession = Depends(get_db)):
+@limiter.limit(GENERAL_RATE_LIMITS["default"])
+async def get_lead_stats(request: Request, db: ReadDbSession):
     """
     Get lead statistics for dashboard.
     """
@@ -218,19 +344,164 @@ async def get_lead_stats(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/export")
+@limiter.limit(GENERAL_RATE_LIMITS["export"])
+async def export_leads(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    category: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream every lead matching the list filters as CSV or NDJSON.
+    """
+    filename = f"leads-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{format}"
+    logger.info("lead_export_started", format=format, user_id=str(current_user.id))
+    return StreamingResponse(
+        stream_leads(
+            lead_filters(category, status, search),
+            format,
+            use_replica=replica_router.use_replica(client_last_write(request)),
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _valid_event_id(last_event_id: Optional[str]) -> Optional[str]:
+    # Event ids are lead versions; anything else means "no history"
+    try:
+        int(last_event_id, 16)
+    except (TypeError, ValueError):
+        return None
+    return last_event_id
+
+
+@router.get("/events")
+async def stream_lead_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events with the qualification outcome of every lead the current user submits.
+    Reconnect with Last-Event-ID to receive the outcomes missed meanwhile.
+    """
+    return _event_stream(user_stream(lead_event_broker, current_user.id, _valid_event_id(last_event_id)))
+
+
+@router.post("/import", response_model=LeadImportJobResponse, status_code=202)
+@limiter.limit(GENERAL_RATE_LIMITS["import"])
+async def import_leads(
+    request: Request,
+    db: DbSession,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    qualify: bool = Query(False),
+    current_user: User = Depends(get_current_manager_user)
+):
+    """
+    Bulk import leads from a CSV or NDJSON request body.
+    The upload is loaded in the background; poll the returned job for progress.
+    """
+    # Spool before the session is used: an upload can take minutes, and a
+    # pooled connection must not sit idle in transaction meanwhile
+    job_id = uuid4()
+    path = spool_path(job_id)
+    try:
+        size = await spool_upload(request.stream(), path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    job = LeadImportJob(id=job_id, format=format, qualify=qualify, created_by=current_user.id, status="pending")
+    db.add(job)
+    try:
+        # Commit now: the import task reads the job in its own session
+        await db.commit()
+    except Exception:
+        os.unlink(path)
+        raise
+    lead_importer.start(
+        job.id,
+        path,
+        tenant_key(current_user),
+        qualify=process_lead_qualification if qualify else None
+    )
+    logger.info("lead_import_queued", job_id=str(job.id), bytes=size, user_id=str(current_user.id))
+    return job
+
+
+@router.get("/import/{job_id}", response_model=LeadImportJobResponse)
+@limiter.limit(GENERAL_RATE_LIMITS["poll"])
+async def get_import_job(
+    request: Request,
+    job_id: UUID,
+    db: ReadDbSession,
+    current_user: User = Depends(get_current_manager_user)
+):
+    """
+    Get the progress of a bulk import.
+    """
+    job = await db.get(LeadImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/import/{job_id}/errors")
+@limiter.limit(GENERAL_RATE_LIMITS["default"])
+async def get_import_errors(
+    request: Request,
+    job_id: UUID,
+    db: ReadDbSession,
+    current_user: User = Depends(get_current_manager_user)
+):
+    """
+    Download the rows of a bulk import that failed validation, as CSV.
+    """
+    job = await db.get(LeadImportJob, job_id)
+    # The file lives on the host that ran the import (IMPORT_WORK_DIR)
+    if not job or not job.error_file or not os.path.exists(job.error_file):
+        raise HTTPException(status_code=404, detail="No error file for this import")
+    return FileResponse(job.error_file, media_type="text/csv", filename=f"lead-import-{job_id}-errors.csv")
+
+
 @router.get("/{lead_id}", response_model=LeadResponse)
+@limiter.limit(GENERAL_RATE_LIMITS["poll"])
 async def get_lead(
+    request: Request,
     lead_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    db: ReadDbSession
 ):
     """
     Get a specific lead by ID.
+    Sends the lead's version as an ETag and answers 304 when it is unchanged.
     """
     try:
-        lead = await db.get(Lead, lead_id)
-        if not lead:
+        updated_at = await db.scalar(select(Lead.updated_at).where(Lead.id == lead_id))
+        if updated_at is None:
             raise HTTPException(status_code=404, detail="Lead not found")
-        return lead
+        version = lead_version(updated_at)
+        if etag_matches(request, lead_etag(version)):
+            return not_modified(lead_etag(version))
+        
+        body = lead_response_cache.get(lead_id, version)
+        if body is None:
+            lead = await db.get(Lead, lead_id)
+            if not lead:
+                raise HTTPException(status_code=404, detail="Lead not found")
+            version, body = lead_response_cache.serialize(lead)
+        return json_response(body, lead_etag(version))
         
     except HTTPException:
         raise
@@ -239,11 +510,39 @@ async def get_lead(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{lead_id}/events")
+async def stream_lead(
+    request: Request,
+    lead_id: UUID,
+    db: ReadDbSession,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events for one lead: a single event with its qualification outcome.
+    Replaces polling GET /leads/{lead_id} while the lead is PROCESSING.
+    """
+    lead = (await db.execute(select(Lead.status, Lead.updated_at).where(Lead.id == lead_id))).first()
+    if lead is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    last_event_id = _valid_event_id(last_event_id)
+    status = getattr(lead.status, "value", lead.status)
+    if (
+        status not in PENDING_STATUSES
+        and last_event_id is not None
+        and int(last_event_id, 16) >= int(lead_version(lead.updated_at), 16)
+    ):
+        # The outcome was delivered already; 204 stops EventSource reconnecting
+        return Response(status_code=204)
+    return _event_stream(lead_stream(lead_event_broker, lead_id, last_event_id))
+
+
 @router.put("/{lead_id}", response_model=LeadResponse)
+@limiter.limit(GENERAL_RATE_LIMITS["update"])
 async def update_lead(
+    request: Request,
     lead_id: UUID,
     lead_update: LeadUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: DbSession
 ):
     """
     Update a specific lead.
@@ -257,23 +556,28 @@ async def update_lead(
         for field, value in lead_update.dict(exclude_unset=True).items():
             setattr(lead, field, value)
         
-        await db.commit()
-        await db.refresh(lead)
+        # Write now so the response carries the new updated_at
+        await db.flush()
         
         logger.info("lead_updated", lead_id=lead_id)
         return lead
         
     except HTTPException:
         raise
+    except IntegrityError:
+        # uq_leads_tenant_email_normalized: the new email is another lead's
+        raise HTTPException(status_code=409, detail="Another lead already has this email address")
     except Exception as e:
         logger.error("update_lead_failed", lead_id=lead_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{lead_id}/analysis", response_model=LeadScoringAnalysis)
+@limiter.limit(GENERAL_RATE_LIMITS["default"])
 async def get_lead_scoring_analysis(
+    request: Request,
     lead_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    db: ReadDbSession
 ):
     """
     Get detailed scoring analysis for a specific lead.
@@ -311,9 +615,11 @@ async def get_lead_scoring_analysis(
 
 
 @router.delete("/{lead_id}")
+@limiter.limit(GENERAL_RATE_LIMITS["delete"])
 async def delete_lead(
+    request: Request,
     lead_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: DbSession,
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -325,7 +631,6 @@ async def delete_lead(
             raise HTTPException(status_code=404, detail="Lead not found")
         
         await db.delete(lead)
-        await db.commit()
         
         logger.info("lead_deleted", lead_id=lead_id)
         return {"message": "Lead deleted successfully"}
@@ -1,10 +1,32 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, field_validator, EmailStr, model_validator, Field
 import secrets
 from functools import lru_cache
 import os
 
+# Connection settings for each DB_CONNECTION_PRESET. PgBouncer already pools
+# server connections, so the app keeps fewer of its own and pings them before
+# use, since the pooler may have dropped the server side. In transaction mode
+# consecutive statements can land on different server connections, so
+# prepared statements must not be cached and need unique names.
+DB_CONNECTION_PRESETS: Dict[str, Dict[str, Any]] = {
+    "direct": {},
+    "pgbouncer-session": {
+        "DB_POOL_SIZE": 10,
+        "DB_MAX_OVERFLOW": 5,
+        "DB_POOL_PRE_PING": True,
+    },
+    "pgbouncer-transaction": {
+        "DB_POOL_SIZE": 10,
+        "DB_MAX_OVERFLOW": 5,
+        "DB_POOL_PRE_PING": True,
+        "DB_STATEMENT_CACHE_SIZE": 0,
+        "DB_PREPARED_STATEMENT_CACHE_SIZE": 0,
+        "DB_UNIQUE_STATEMENT_NAMES": True,
+    },
+}
+
 class Settings(BaseSettings):
     # API Settings
     API_V1_STR: str = "/api/v1"
@@ -12,6 +34,19 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_TOKEN_PURGE_GRACE_HOURS: int = 24
+    REFRESH_TOKEN_PURGE_INTERVAL_MINUTES: int = 60
+    
+    # Authenticated principal cache (0 disables it)
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    
+    # Serialized lead responses reused across polls, keyed by lead version (0 disables it)
+    LEAD_CACHE_MAX_SIZE: int = 5000
+    
+    # Password hashing executor (bcrypt runs off the event loop)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
     
     # Cookie Security Settings
     SECURE_COOKIES: bool = False  # Set to True in production with HTTPS
@@ -38,6 +73,52 @@ class Settings(BaseSettings):
             self.SQLALCHEMY_DATABASE_URI = f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
         return self
 
+    # Connection pool and asyncpg driver settings. DB_CONNECTION_PRESET fills
+    # in whichever of these aren't set explicitly: "direct" (Postgres itself),
+    # "pgbouncer-session" or "pgbouncer-transaction" (see DB_CONNECTION_PRESETS)
+    DB_CONNECTION_PRESET: str = "direct"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a pooled connection
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    DB_COMMAND_TIMEOUT_SECONDS: Optional[float] = None
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg's own prepared statement cache
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # SQLAlchemy's cache per connection
+    # Unique names for prepared statements, needed behind a transaction pooler
+    DB_UNIQUE_STATEMENT_NAMES: bool = False
+
+    @model_validator(mode="after")
+    def apply_db_connection_preset(self) -> 'Settings':
+        if self.DB_CONNECTION_PRESET not in DB_CONNECTION_PRESETS:
+            raise ValueError(
+                f"DB_CONNECTION_PRESET must be one of {', '.join(DB_CONNECTION_PRESETS)}"
+            )
+        for name, value in DB_CONNECTION_PRESETS[self.DB_CONNECTION_PRESET].items():
+            if name not in self.model_fields_set:
+                setattr(self, name, value)
+        return self
+
+    # Read replica (optional). Read-only endpoints use it while its lag is
+    # acceptable; a client reads from the primary for a while after writing.
+    SQLALCHEMY_REPLICA_URI: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 2.0
+    REPLICA_STICKY_SECONDS: float = 5.0
+
+    # Lead events pushed to clients over SSE and cross-worker cache
+    # invalidation. Each worker LISTENs on one dedicated connection; LISTEN
+    # needs a session, so behind a transaction pooler point
+    # NOTIFY_DATABASE_URI at Postgres itself.
+    NOTIFY_DATABASE_URI: Optional[str] = None
+    NOTIFY_PING_SECONDS: float = 15.0  # how often the listener checks its connection
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_REPLAY_LIMIT: int = 100  # events replayed to a reconnecting user feed
+    # Catch-ups replay from this far before the newest version a feed has
+    # seen; must exceed the time between stamping a lead version and commit
+    SSE_REPLAY_MARGIN_SECONDS: float = 10.0
+
     # Redis Settings (Optional for free deployments)
     REDIS_HOST: Optional[str] = None
     REDIS_PORT: int = 6379
@@ -49,6 +130,30 @@ class Settings(BaseSettings):
         """Check if Redis configuration is available"""
         return bool(self.REDIS_URL or (self.REDIS_HOST and self.REDIS_PORT))
 
+    @property
+    def REDIS_CONNECTION_URL(self) -> Optional[str]:
+        """Redis URL built from REDIS_URL or the host/port/password settings"""
+        if self.REDIS_URL:
+            return self.REDIS_URL
+        if not self.REDIS_AVAILABLE:
+            return None
+        auth = f":{self.REDIS_PASSWORD}@" if self.REDIS_PASSWORD else ""
+        return f"redis://{auth}{self.REDIS_HOST}:{self.REDIS_PORT}/0"
+
+    # Rate limiting (shared across workers when Redis is available)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE_URI: Optional[str] = None  # Defaults to Redis, else memory://
+    # "sliding-window-counter", "moving-window" or "fixed-window"
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter"
+    # Comma-separated addresses or CIDRs of the reverse proxies in front of the
+    # app; their X-Forwarded-For entries identify anonymous clients
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+
+    @property
+    def RATE_LIMIT_STORAGE(self) -> str:
+        """Storage URI for the rate limiter"""
+        return self.RATE_LIMIT_STORAGE_URI or self.REDIS_CONNECTION_URL or "memory://"
+
     # OpenAI Settings
     OPENAI_API_KEY: Optional[str] = None
     GROQ_API_KEY: Optional[str] = None
@@ -60,10 +165,68 @@ class Settings(BaseSettings):
     EMAIL_FROM_ADDRESS: str = "noreply@leadgenie.com"
     EMAIL_FROM_NAME: str = "LeadGenie"
     BREVO_API_KEY: Optional[str] = None  # Required: Get from brevo.com (300 emails/day free)
+    EMAIL_HTTP_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_HTTP_MAX_CONNECTIONS: int = 10
+    # Outbound queue (emails are sent by background workers)
+    EMAIL_QUEUE_WORKERS: int = 2
+    EMAIL_QUEUE_MAX_SIZE: int = 1000
+    EMAIL_MAX_ATTEMPTS: int = 4
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 2.0
     
     # OTP Settings
     OTP_EXPIRY_MINUTES: int = 5
     OTP_MAX_ATTEMPTS: int = 3
+    # "database" (email_otps table) or "kv" (Redis if available, else in-process)
+    OTP_STORE_BACKEND: str = "database"
+
+    # AI qualification scheduling (per tenant: company, else user, else "anonymous")
+    QUALIFICATION_WORKERS: int = 4
+    QUALIFICATION_ESTIMATED_TOKENS: int = 1200  # charged up front, corrected after the call
+    # Each worker stamps the leads it holds queued or running this often, so
+    # the stale lead reaper only fails leads no live worker holds; keep it
+    # well under STALE_LEAD_TIMEOUT_MINUTES
+    QUALIFICATION_HEARTBEAT_SECONDS: int = 300
+    # Score obvious junk (spam, test entries, gibberish) cold without an LLM call
+    TRIAGE_ENABLED: bool = True
+    # Reuse the LLM analysis of a recently qualified lead from the same tenant
+    # and company domain whose message is at least SIMILAR_LEAD_THRESHOLD
+    # similar (estimated Jaccard over word bigrams); only scoring runs again
+    SIMILAR_LEAD_REUSE_ENABLED: bool = True
+    SIMILAR_LEAD_THRESHOLD: float = 0.75
+    SIMILAR_LEAD_MAX_AGE_HOURS: int = 72
+    SIMILAR_LEAD_INDEX_MAX_ENTRIES: int = 10000  # per worker, about 1.7 KB each
+    TENANT_WEIGHT: float = 1.0
+    TENANT_MAX_IN_FLIGHT: int = 2
+    TENANT_MAX_QUEUED: int = 200
+    TENANT_TOKENS_PER_MINUTE: int = 20000
+    # Per-tenant overrides as JSON keyed like tenant_key(): "company:<company_id>",
+    # "user:<user_id>" or "anonymous", e.g. {"company:<company_id>": {"weight": 2, "max_in_flight": 4}}
+    TENANT_QUOTAS: Dict[str, Dict[str, float]] = {}
+    # Tenant quotas are shared through Redis when it is configured; a worker
+    # renews the slots of the leads it holds, which lapse this long after it dies
+    TENANT_LEASE_SECONDS: int = 60
+    # Without Redis each process enforces an equal share of every quota;
+    # gunicorn.conf.py sets this to its worker count
+    QUALIFICATION_PROCESSES: int = 1
+
+    # Bulk lead import: uploads are spooled to IMPORT_WORK_DIR (default: the
+    # system temp dir, shared by the workers of one host) and loaded in chunks
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_UPLOAD_MB: int = 500
+    IMPORT_WORK_DIR: Optional[str] = None
+
+    # Repeated /leads/qualify requests return the first lead. Idempotency-Key
+    # headers are kept IDEMPOTENCY_KEY_TTL_HOURS; without one, an identical
+    # body from the same tenant within IDEMPOTENCY_WINDOW_SECONDS is a repeat
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_WINDOW_SECONDS: int = 600
+
+    # Maintenance scheduler (one worker runs each job, via advisory locks)
+    MAINTENANCE_ENABLED: bool = True
+    OTP_CLEANUP_INTERVAL_MINUTES: int = 30
+    STALE_LEAD_TIMEOUT_MINUTES: int = 30
+    STALE_LEAD_CHECK_INTERVAL_MINUTES: int = 10
+    IDEMPOTENCY_PURGE_INTERVAL_MINUTES: int = 60
 
     # Security Settings
     FIRST_SUPERUSER: EmailStr
@@ -1,23 +1,100 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import time
+import uuid
+from typing import Annotated, Any, AsyncGenerator, Dict, Optional
+from fastapi import Depends, Request
+import structlog
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import AsyncAdaptedQueuePool
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
+from app.core import metrics
+from app.core.replica import WRITE_COOKIE, ReplicaRouter
+
+logger = structlog.get_logger()
 
 # Construct database URL
 DATABASE_URL = settings.SQLALCHEMY_DATABASE_URI
 
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout wait time to Prometheus"""
+
+    pool_name = "primary"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.labels(self.pool_name).observe(time.perf_counter() - start)
+
+
+class ReplicaQueuePool(InstrumentedQueuePool):
+    pool_name = "replica"
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def asyncpg_connect_args(config=settings) -> Dict[str, Any]:
+    """Driver settings passed to every new asyncpg connection"""
+    connect_args: Dict[str, Any] = {
+        "timeout": config.DB_CONNECT_TIMEOUT_SECONDS,
+        "command_timeout": config.DB_COMMAND_TIMEOUT_SECONDS,
+        "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": config.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+    if config.DB_UNIQUE_STATEMENT_NAMES:
+        connect_args["prepared_statement_name_func"] = _unique_statement_name
+    return connect_args
+
+
+def _create_engine(url: str, poolclass) -> AsyncEngine:
+    pooled_engine = create_async_engine(
+        url,
+        echo=False,  # Set to True for SQL query logging
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=asyncpg_connect_args(),
+    )
+
+    @event.listens_for(pooled_engine.sync_engine, "checkout")
+    def _record_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_pool_state(pooled_engine.pool, poolclass.pool_name)
+
+    @event.listens_for(pooled_engine.sync_engine, "checkin")
+    def _record_pool_checkin(dbapi_connection, connection_record):
+        metrics.record_pool_state(pooled_engine.pool, poolclass.pool_name)
+
+    return pooled_engine
+
+
 # Create async engine with connection pooling
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,  # Set to True for SQL query logging
-    poolclass=AsyncAdaptedQueuePool,
-    pool_size=20,  # Maximum number of connections to keep
-    max_overflow=10,  # Maximum number of connections that can be created beyond pool_size
-    pool_timeout=30,  # Seconds to wait before giving up on getting a connection from the pool
-    pool_recycle=1800,  # Recycle connections after 30 minutes
+engine = _create_engine(DATABASE_URL, InstrumentedQueuePool)
+
+# Optional read replica with its own pool; read-only at the session level too
+replica_engine = (
+    _create_engine(settings.SQLALCHEMY_REPLICA_URI, ReplicaQueuePool).execution_options(postgresql_readonly=True)
+    if settings.SQLALCHEMY_REPLICA_URI
+    else None
+)
+
+replica_router = ReplicaRouter(
+    replica_engine,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    secret_key=settings.SECRET_KEY,
 )
 
+
 # Create async session factory
 async_session_factory = async_sessionmaker(
     engine,
@@ -27,17 +104,60 @@ async_session_factory = async_sessionmaker(
     autoflush=False,
 )
 
+# Sessions on this engine run every transaction as READ ONLY, so Postgres
+# rejects writes and can skip the bookkeeping a writable transaction needs
+read_only_engine = engine.execution_options(postgresql_readonly=True)
+
+
+
+class RoutingSession(Session):
+    """
+    Session for read-only requests that runs on the replica when the router
+    allowed it (info["use_replica"]), and on the primary otherwise. Anything
+    that writes goes to the primary and the session stays there, so later
+    reads in the same session see the write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["use_replica"] = False
+        if self.info.get("use_replica"):
+            return replica_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+read_session_factory = async_sessionmaker(
+    read_only_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_session_used(session, transaction, connection):
+    # DbSession handlers write, so any transaction there counts as a write
+    # for read-your-writes routing, including ones committed mid-request
+    session.info["used"] = True
+
+
 # Create declarative base
 Base = declarative_base()
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def client_last_write(request: Request) -> Optional[float]:
+    """When the caller last wrote on the primary, from its signed write cookie"""
+    return replica_router.written_at(request.cookies.get(WRITE_COOKIE))
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency for getting async database sessions.
-    Usage in FastAPI:
-    @app.get("/")
-    async def route(db: AsyncSession = Depends(get_db)):
-        ...
+    Unit of work for one request.
+    The session checks out a connection on its first query and the whole
+    request is committed once on exit, or rolled back if the handler raises.
+    Handlers flush() when they need generated values; they don't commit.
     """
     async with async_session_factory() as session:
         try:
@@ -46,16 +166,63 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
+        if session.info.get("used") and replica_router.enabled:
+            # Set as a cookie on the response by ReadYourWritesMiddleware
+            request.state.db_write_marker = replica_router.write_marker()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read-only unit of work for handlers that never write.
+    Runs on the read replica when one is configured and routing allows.
+    """
+    async with read_session_factory() as session:
+        session.info["use_replica"] = replica_router.use_replica(client_last_write(request))
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+# Endpoint parameter types. "function" scope ends the transaction as soon as
+# the handler returns, so the commit lands before the response is sent and
+# the connection isn't held while the body is serialized and written.
+#     async def route(db: DbSession): ...
+DbSession = Annotated[AsyncSession, Depends(get_db, scope="function")]
+ReadDbSession = Annotated[AsyncSession, Depends(get_read_db, scope="function")]
 
 # Database health check
-async def check_db_health() -> bool:
-    """Check if database connection is healthy"""
+async def check_db_health() -> Dict[str, Any]:
+    """
+    Run a round trip to the primary and report it with the pool's state.
+    Saturation is checked-out connections over pool_size + max_overflow;
+    near 1.0 requests start waiting for a connection, which shows up as
+    checkout_ms.
+    """
+    pool = engine.pool
+    capacity = pool.size() + settings.DB_MAX_OVERFLOW
+    report: Dict[str, Any] = {
+        "healthy": True,
+        "pool": {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+        },
+    }
+    start = time.perf_counter()
     try:
-        async with engine.begin() as conn:
-            await conn.execute("SELECT 1")
-        return True
+        async with engine.connect() as conn:
+            connected = time.perf_counter()
+            report["checkout_ms"] = round((connected - start) * 1000, 2)
+            await conn.execute(text("SELECT 1"))
+            report["latency_ms"] = round((time.perf_counter() - connected) * 1000, 2)
     except Exception as e:
-        print(f"Database health check failed: {e}")
-        return False 
\ No newline at end of file
+        logger.error("database_health_check_failed", error=str(e))
+        report["healthy"] = False
+        report["error"] = str(e)
+    if replica_router.enabled:
+        report["replica"] = {"healthy": replica_router.healthy, "lag_seconds": replica_router.lag_seconds}
+    return report
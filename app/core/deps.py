@@ -1,25 +1,55 @@
-from typing import AsyncGenerator, Optional
+from typing import Optional
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import jwt
 
 from app.core.config import settings
-from app.core.database import async_session_factory as SessionLocal
+from app.core.database import get_db, get_read_db, DbSession, ReadDbSession, read_session_factory
+from app.core.principal_cache import principal_cache
 from app.models.user import User
 from app.services import auth as auth_service
 from app.schemas.auth import TokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
-        yield session
+async def _resolve_user(token: str) -> User:
+    """
+    Decode an access token and load its user, using the principal cache.
+    A cache miss reads the user in its own short read-only session, so
+    authentication never holds a connection for the rest of the request.
+    """
+    token_data = principal_cache.get_payload(token)
+    if token_data is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=["HS256"]
+            )
+            token_data = TokenPayload(**payload)
+        except (jwt.JWTError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        principal_cache.set_payload(token, token_data)
+
+    user = principal_cache.get_user(token_data.sub, token)
+    if user is not None:
+        return user
+
+    async with read_session_factory() as db:
+        result = await db.execute(select(User).filter(User.id == token_data.sub))
+        user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    principal_cache.set_user(token_data.sub, token, user, token_data.exp)
+    return user
 
 async def get_current_user_from_cookie(
-    request: Request,
-    db: AsyncSession = Depends(get_db)) -> User:
+    request: Request) -> User:
     """Get current user from httpOnly cookie token"""
     # Try to get token from cookie first
     token = request.cookies.get("access_token")
@@ -31,28 +61,12 @@ async def get_current_user_from_cookie(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValueError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    result = await db.execute(select(User).filter(User.id == token_data.sub))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+    user = await _resolve_user(token)
+    request.state.user_id = user.id
     return user
 
 async def get_current_user(
     request: Request,
-    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)) -> User:
     """Get current user - supports both cookie and Bearer token authentication"""
     # Try cookie first (secure method)
@@ -66,23 +80,24 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    user = await _resolve_user(auth_token)
+    # Rate limits key on the user rather than the address
+    request.state.user_id = user.id
+    return user
+
+async def get_optional_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme)) -> Optional[User]:
+    """Current user for endpoints that also serve anonymous callers"""
+    auth_token = request.cookies.get("access_token") or token
+    if not auth_token:
+        return None
     try:
-        payload = jwt.decode(
-            auth_token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValueError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    result = await db.execute(select(User).filter(User.id == token_data.sub))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+        user = await _resolve_user(auth_token)
+    except HTTPException:
+        # A stale or invalid token on a public endpoint means anonymous
+        return None
+    request.state.user_id = user.id
     return user
 
 def get_current_active_superuser(
@@ -3,9 +3,7 @@ from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import async_session_factory
 from app.models.database import User, Company, Lead, AIProcessingLog
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.security import get_password_hash_async
 
 async def init_db() -> None:
     """Initialize the database with test data."""
@@ -22,7 +20,7 @@ async def init_db() -> None:
         # Create admin user
         admin = User(
             email="admin@testcompany.com",
-            hashed_password=pwd_context.hash("admin123"),
+            hashed_password=await get_password_hash_async("admin123"),
             full_name="Admin User",
             role="admin",
             company_id=company.id,
@@ -0,0 +1,78 @@
+"""
+Cross-worker invalidation of in-process caches.
+
+Each worker keeps its own caches, so a write in one worker would leave stale
+entries in the others. Writers publish "<cache>:<key>" on the
+cache_invalidation channel with pg_notify in their own transaction, so the
+message goes out only if the write commits, and every worker's listener
+connection (see pg_listener) evicts that key from the named cache. A key of
+"*" flushes the whole cache.
+
+Messages sent while a worker's listener was disconnected are lost, so every
+registered cache is flushed whenever the listener (re)connects. Caches also
+evict locally as they do today; the worker that made the write hears its own
+message too, which only costs a second eviction.
+"""
+
+from typing import Callable, Dict, Tuple
+
+import structlog
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.pg_listener import PostgresListener, pg_listener
+
+logger = structlog.get_logger()
+
+CHANNEL = "cache_invalidation"
+
+ALL_KEYS = "*"
+
+
+def _message(cache: str, key) -> str:
+    return f"{cache}:{key}"
+
+
+class InvalidationBus:
+    """Routes invalidation messages to the caches registered in this worker"""
+
+    def __init__(self, listener: PostgresListener):
+        self._caches: Dict[str, Tuple[Callable[[str], None], Callable[[], None]]] = {}
+        listener.listen(CHANNEL, self._on_notify)
+        listener.on_connect(self.flush_all)
+
+    def register(self, cache: str, evict: Callable[[str], None], flush: Callable[[], None]) -> None:
+        """Name a cache; evict(key) drops one key, flush() everything"""
+        self._caches[cache] = (evict, flush)
+
+    async def publish(self, db: AsyncSession, cache: str, key=ALL_KEYS) -> None:
+        """Queue an invalidation; Postgres sends it when db commits"""
+        await db.execute(select(func.pg_notify(CHANNEL, _message(cache, key))))
+
+    def publish_from_flush(self, connection: Connection, cache: str, key=ALL_KEYS) -> None:
+        """publish() for mapper events, on the flush's own connection"""
+        connection.execute(select(func.pg_notify(CHANNEL, _message(cache, key))))
+
+    def flush_all(self) -> None:
+        for cache, (_, flush) in self._caches.items():
+            flush()
+            metrics.CACHE_INVALIDATIONS.labels(cache, "flush").inc()
+
+    def _on_notify(self, payload: str) -> None:
+        cache, _, key = payload.partition(":")
+        handlers = self._caches.get(cache)
+        if handlers is None or not key:
+            logger.warning("cache_invalidation_unknown", payload=payload[:200])
+            return
+        evict, flush = handlers
+        if key == ALL_KEYS:
+            flush()
+            metrics.CACHE_INVALIDATIONS.labels(cache, "flush").inc()
+        else:
+            evict(key)
+            metrics.CACHE_INVALIDATIONS.labels(cache, "key").inc()
+
+
+invalidation_bus = InvalidationBus(pg_listener)
@@ -0,0 +1,138 @@
+"""
+Conditional GET support and serialized-response cache for lead reads.
+
+The frontend polls lead reads while qualification runs. A lead's version is
+its updated_at, which every ORM and Core UPDATE bumps through onupdate, and
+is sent as a weak ETag. Handlers first probe only (id, updated_at), which the
+covering indexes on leads answer index-only, reply 304 when the client already
+holds that version, and otherwise reuse the JSON bytes cached for
+(lead id, version). Only leads that changed are loaded and serialized again.
+Versioned entries are never served stale; ORM updates and deletes still
+publish on the invalidation bus so every worker frees the superseded body.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.models.lead import Lead
+from app.schemas.lead import LeadResponse
+
+# Browsers keep the body but revalidate it on every request
+CACHE_CONTROL = "private, no-cache"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def lead_version(updated_at: datetime) -> str:
+    """updated_at in whole microseconds, as hex"""
+    return f"{(updated_at - EPOCH) // timedelta(microseconds=1):x}"
+
+
+def version_datetime(version: str) -> datetime:
+    """Inverse of lead_version"""
+    return EPOCH + timedelta(microseconds=int(version, 16))
+
+
+def lead_etag(version: str) -> str:
+    return f'W/"{version}"'
+
+
+def list_etag(total: int, versions: Iterable[Tuple[object, str]], variant: str = "") -> str:
+    """ETag of a page of leads; variant tells apart representations such as fieldsets"""
+    digest = hashlib.blake2b(f"{total}|{variant}".encode(), digest_size=16)
+    for lead_id, version in versions:
+        digest.update(f"|{lead_id}:{version}".encode())
+    return lead_etag(digest.hexdigest())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 requires for GET"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(body: bytes, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def lead_list_body(bodies: List[bytes], total: int, page: int, per_page: int, total_pages: int) -> bytes:
+    """A LeadList body assembled from serialized LeadResponse bodies"""
+    pagination = json.dumps(
+        {"total": total, "page": page, "per_page": per_page, "total_pages": total_pages},
+        separators=(",", ":"),
+    )
+    return b'{"leads":[' + b",".join(bodies) + b"]," + pagination[1:].encode()
+
+
+class LeadResponseCache:
+    """Bounded LRU of serialized LeadResponse bodies, one version per lead"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._bodies: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, lead_id, version: str) -> Optional[bytes]:
+        key = str(lead_id)
+        entry = self._bodies.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._bodies.move_to_end(key)
+        return entry[1]
+
+    def serialize(self, lead: Lead) -> Tuple[str, bytes]:
+        """Returns: (version, JSON body) of a loaded lead, cached for later reads"""
+        version = lead_version(lead.updated_at)
+        body = self.get(lead.id, version)
+        if body is None:
+            body = LeadResponse.model_validate(lead).model_dump_json().encode()
+            if self.enabled:
+                key = str(lead.id)
+                self._bodies[key] = (version, body)
+                self._bodies.move_to_end(key)
+                while len(self._bodies) > self.max_size:
+                    self._bodies.popitem(last=False)
+        return version, body
+
+    def invalidate(self, lead_id) -> None:
+        self._bodies.pop(str(lead_id), None)
+
+    def clear(self) -> None:
+        self._bodies.clear()
+
+
+lead_response_cache = LeadResponseCache(max_size=settings.LEAD_CACHE_MAX_SIZE)
+invalidation_bus.register("lead", lead_response_cache.invalidate, lead_response_cache.clear)
+
+
+@event.listens_for(Lead, "after_update")
+@event.listens_for(Lead, "after_delete")
+def _forget_changed_lead(mapper, connection, target):
+    # Covers update_lead, delete_lead and the qualification write-back.
+    # Versioned keys never serve stale bodies; this only frees the slot
+    lead_response_cache.invalidate(target.id)
+    invalidation_bus.publish_from_flush(connection, "lead", target.id)
@@ -0,0 +1,265 @@
+"""
+Prometheus metrics for HTTP traffic, the database pool, LLM calls, password
+hashing, outbound email and the lead qualification queue.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this) every worker
+writes its samples to that directory and /metrics aggregates all live workers.
+The variable must be set before prometheus_client is imported.
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS_MODE = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status_code"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# Database connection pool
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of pooled database connections",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond the pool size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of the read replica as last measured; -1 when unreachable",
+    multiprocess_mode="livemax",
+)
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "Read-only sessions by the server they were routed to and why",
+    ["target", "reason"],
+)
+LEAD_EVENT_SUBSCRIBERS = Gauge(
+    "lead_event_subscribers",
+    "Open Server-Sent Event streams waiting for lead events",
+    multiprocess_mode="livesum",
+)
+LEAD_EVENTS = Counter(
+    "lead_events_total",
+    "Lead events received from Postgres NOTIFY and fanned out to streams",
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "In-process cache invalidations applied from the invalidation bus",
+    ["cache", "scope"],
+)
+
+# LLM
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM completion calls",
+    ["provider", "model"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["provider", "model", "type"],
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total",
+    "Failed LLM calls",
+    ["provider", "reason"],
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Qualifications answered by the rule-based fallback",
+    ["reason"],
+)
+LEAD_TRIAGE = Counter(
+    "lead_triage_total",
+    "Leads seen by pre-LLM triage by outcome: forwarded to the LLM, or the junk reason "
+    "(bypass rate = non-forwarded / all)",
+    ["outcome"],
+)
+SIMILAR_LEAD_LOOKUPS = Counter(
+    "lead_similar_lookups_total",
+    "Near-duplicate lookups before the LLM call by outcome: reused, miss, stale (the similar "
+    "lead changed since it was indexed) or unscoped (free mail domain)",
+    ["outcome"],
+)
+
+# Password hashing
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent in bcrypt hashing or verification",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a bcrypt job waited for a free hashing thread",
+    ["operation"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "bcrypt jobs queued or running in the hashing executor",
+    multiprocess_mode="livesum",
+)
+
+# Outbound email queue
+EMAIL_QUEUE_DEPTH = Gauge(
+    "email_queue_depth",
+    "Emails waiting in the outbound queue",
+    multiprocess_mode="livesum",
+)
+EMAIL_SEND_DURATION = Histogram(
+    "email_send_duration_seconds",
+    "Latency of email provider API calls",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+EMAIL_DELIVERIES = Counter(
+    "email_deliveries_total",
+    "Outbound emails by final outcome",
+    ["category", "outcome"],
+)
+
+# Lead qualification queue
+QUALIFICATION_QUEUE_DEPTH = Gauge(
+    "lead_qualification_queue_depth",
+    "Leads waiting for AI qualification",
+    multiprocess_mode="livesum",
+)
+QUALIFICATION_QUEUE_OLDEST_AGE = Gauge(
+    "lead_qualification_queue_oldest_age_seconds",
+    "Age of the oldest lead waiting for AI qualification",
+    multiprocess_mode="livemax",
+)
+QUALIFICATION_QUEUE_WAIT = Histogram(
+    "lead_qualification_queue_wait_seconds",
+    "Time a lead spent queued before qualification started",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0),
+)
+TENANT_QUEUE_DEPTH = Gauge(
+    "lead_qualification_tenant_queue_depth",
+    "Leads waiting for AI qualification per tenant",
+    ["tenant"],
+    multiprocess_mode="livesum",
+)
+TENANT_IN_FLIGHT = Gauge(
+    "lead_qualification_tenant_in_flight",
+    "Leads being qualified right now per tenant",
+    ["tenant"],
+    multiprocess_mode="livesum",
+)
+TENANT_TOKENS = Counter(
+    "lead_qualification_tenant_tokens_total",
+    "LLM tokens consumed by lead qualification per tenant",
+    ["tenant"],
+)
+TENANT_REJECTED = Counter(
+    "lead_qualification_tenant_rejected_total",
+    "Leads refused by per-tenant admission control",
+    ["tenant"],
+)
+LEAD_MERGES = Counter(
+    "lead_ingest_merges_total",
+    "Submitted leads by whether they were new, merged into an existing lead or added nothing",
+    ["outcome"],
+)
+QUALIFICATION_REPLAYS = Counter(
+    "lead_qualification_replays_total",
+    "Repeated /leads/qualify requests answered with the original lead",
+    ["key_source"],
+)
+
+
+def route_label(scope: dict) -> str:
+    """Return the route template for a request so labels stay low-cardinality"""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format:
+        return path_format
+    root_path = scope.get("root_path")
+    if root_path:
+        # Mounted sub-applications (SQLAdmin) don't expose their own routes
+        return f"{root_path}/{{path}}"
+    return "<unmatched>"
+
+
+def record_pool_state(pool, name: str = "primary") -> None:
+    """Update pool gauges from a SQLAlchemy QueuePool"""
+    DB_POOL_SIZE.labels(name).set(pool.size())
+    DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+    DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+
+class QualificationQueueTracker:
+    """Tracks leads queued for qualification in this process"""
+
+    def __init__(self):
+        self._enqueued_at: Dict[str, float] = {}
+
+    def enqueued(self, lead_id) -> None:
+        self._enqueued_at[str(lead_id)] = time.monotonic()
+        self.refresh()
+
+    def started(self, lead_id) -> None:
+        enqueued_at = self._enqueued_at.pop(str(lead_id), None)
+        if enqueued_at is not None:
+            QUALIFICATION_QUEUE_WAIT.observe(time.monotonic() - enqueued_at)
+        self.refresh()
+
+    def refresh(self) -> None:
+        QUALIFICATION_QUEUE_DEPTH.set(len(self._enqueued_at))
+        oldest: Optional[float] = min(self._enqueued_at.values(), default=None)
+        QUALIFICATION_QUEUE_OLDEST_AGE.set(time.monotonic() - oldest if oldest is not None else 0)
+
+
+qualification_queue = QualificationQueueTracker()
+
+
+def render_latest() -> bytes:
+    """Render metrics for all workers (multiprocess) or this process"""
+    qualification_queue.refresh()
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
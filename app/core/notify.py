@@ -0,0 +1,251 @@
+"""
+Lead events pushed to clients over Server-Sent Events.
+
+When a lead's qualification finishes or fails, the writer queues
+pg_notify('lead_events', ...) in the same transaction, so the event goes out
+exactly when the change commits. Every worker's listener connection (see
+pg_listener) receives them and fans them out to the SSE streams open on that
+worker, so a client hears about a lead whichever worker qualified it.
+
+Event ids are lead versions (updated_at in microseconds, as in lead ETags).
+Writers stamp them from clock_timestamp() just before committing, so a
+version can commit after a larger one only by that short gap. A
+reconnecting stream sends Last-Event-ID and whatever it missed is read back
+from the leads table; the same catch-up runs for every stream when the
+listener connection itself had to reconnect, or a stream fell behind.
+Catch-ups start SSE_REPLAY_MARGIN_SECONDS before the newest version the
+stream has seen, to pick up such late commits, and skip events the stream
+already sent; clients apply events idempotently either way.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+import structlog
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.core.lead_cache import lead_version, version_datetime
+from app.core.pg_listener import PostgresListener, pg_listener
+from app.models.lead import Lead, LeadStatus
+
+logger = structlog.get_logger()
+
+CHANNEL = "lead_events"
+
+# Statuses a lead waits in before qualification has an outcome
+PENDING_STATUSES = (LeadStatus.NEW.value, LeadStatus.PROCESSING.value)
+
+# Browsers wait this long before reconnecting a dropped stream
+RETRY_MILLISECONDS = 3000
+
+EVENT_COLUMNS = (
+    Lead.id, Lead.status, Lead.category, Lead.score, Lead.ai_score, Lead.enhanced_score, Lead.created_by,
+    Lead.updated_at,
+)
+
+# Put on a subscription's queue when it may have missed events
+RESYNC = None
+
+
+def lead_event(lead) -> dict:
+    """Event payload for a Lead, or a row with the EVENT_COLUMNS"""
+    return {
+        "id": str(lead.id),
+        "status": getattr(lead.status, "value", lead.status),
+        "category": lead.category,
+        "score": lead.score,
+        "ai_score": lead.ai_score,
+        "enhanced_score": lead.enhanced_score,
+        "user_id": str(lead.created_by) if lead.created_by else None,
+        "version": lead_version(lead.updated_at),
+    }
+
+
+def format_event(event: dict) -> str:
+    return f"id: {event['version']}\nevent: lead\ndata: {json.dumps(event)}\n\n"
+
+
+async def notify_lead_event(db: AsyncSession, lead) -> None:
+    """Queue an event for a lead; Postgres sends it when db commits"""
+    await db.execute(select(func.pg_notify(CHANNEL, json.dumps(lead_event(lead)))))
+
+
+async def stamp_lead_event(db: AsyncSession, lead: Lead) -> None:
+    """Give a flushed Lead its event version from the clock (not the transaction start) and queue its event"""
+    version = await db.scalar(
+        update(Lead)
+        .where(Lead.id == lead.id)
+        .values(updated_at=func.clock_timestamp())
+        .returning(Lead.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    set_committed_value(lead, "updated_at", version)
+    await notify_lead_event(db, lead)
+
+
+async def finished_events(*conditions, after: Optional[str] = None, limit: int = 1) -> List[dict]:
+    """Leads matching conditions with a qualification outcome newer than a version"""
+    query = select(*EVENT_COLUMNS).where(*conditions, Lead.status.not_in(PENDING_STATUSES))
+    if after is not None:
+        query = query.where(Lead.updated_at > version_datetime(after))
+    # Read the primary: a lagging replica would hide the outcome being waited for
+    async with async_session_factory() as db:
+        rows = (await db.execute(query.order_by(Lead.updated_at).limit(limit))).all()
+    return [lead_event(row) for row in rows]
+
+
+async def current_version() -> str:
+    async with async_session_factory() as db:
+        return lead_version(await db.scalar(select(func.clock_timestamp())))
+
+
+class Subscription:
+    """Events for one SSE stream, for a lead or for a user's leads"""
+
+    def __init__(self, lead_id: Optional[str] = None, user_id: Optional[str] = None):
+        self.lead_id = lead_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+
+    def put(self, item: Optional[dict]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A stream this far behind catches up from the database instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """The next event or RESYNC; raises asyncio.TimeoutError when idle"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LeadEventBroker:
+    """Hands lead events from this worker's listener to its subscriptions"""
+
+    def __init__(self, listener: PostgresListener):
+        self._by_lead: Dict[str, Set[Subscription]] = {}
+        self._by_user: Dict[str, Set[Subscription]] = {}
+        listener.listen(CHANNEL, self._on_notify)
+        # Events committed while nobody listened are read back by the streams
+        listener.on_connect(self._resync_all)
+
+    def subscribe(self, lead_id=None, user_id=None) -> Subscription:
+        subscription = Subscription(
+            lead_id=str(lead_id) if lead_id else None,
+            user_id=str(user_id) if user_id else None,
+        )
+        if subscription.lead_id:
+            self._by_lead.setdefault(subscription.lead_id, set()).add(subscription)
+        if subscription.user_id:
+            self._by_user.setdefault(subscription.user_id, set()).add(subscription)
+        metrics.LEAD_EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for index, key in ((self._by_lead, subscription.lead_id), (self._by_user, subscription.user_id)):
+            subscriptions = index.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del index[key]
+        metrics.LEAD_EVENT_SUBSCRIBERS.dec()
+
+    def _on_notify(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("lead_event_malformed", payload=payload[:200])
+            return
+        metrics.LEAD_EVENTS.inc()
+        for subscription in self._by_lead.get(event["id"], ()):
+            subscription.put(event)
+        for subscription in self._by_user.get(event.get("user_id"), ()):
+            subscription.put(event)
+
+    def _resync_all(self) -> None:
+        for index in (self._by_lead, self._by_user):
+            for subscriptions in index.values():
+                for subscription in subscriptions:
+                    subscription.put(RESYNC)
+
+
+async def lead_stream(broker: LeadEventBroker, lead_id, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """SSE for one lead; ends with the lead's qualification outcome"""
+    subscription = broker.subscribe(lead_id=lead_id)
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        # Subscribed before looking, so an outcome committed meanwhile is queued
+        events = await finished_events(Lead.id == lead_id, after=last_event_id)
+        while not events:
+            try:
+                item = await subscription.next(settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is RESYNC:
+                events = await finished_events(Lead.id == lead_id, after=last_event_id)
+            elif item["status"] not in PENDING_STATUSES:
+                events = [item]
+        yield format_event(events[0])
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def user_stream(broker: LeadEventBroker, user_id, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """SSE of qualification outcomes for every lead a user created"""
+    subscription = broker.subscribe(user_id=user_id)
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        # Without a Last-Event-ID, catch-ups start from the database's now
+        newest = int(last_event_id or await current_version(), 16)
+        margin = int(settings.SSE_REPLAY_MARGIN_SECONDS * 1_000_000)
+        # Versions of the events sent within the margin of the newest one
+        sent: Dict[str, int] = {}
+        resync = last_event_id is not None
+        while True:
+            if resync:
+                sent = {lead_id: version for lead_id, version in sent.items() if version >= newest - margin}
+                cursor = max(newest - margin, 0)
+                replayed = 0
+                while replayed < settings.SSE_REPLAY_LIMIT:
+                    events = await finished_events(
+                        Lead.created_by == user_id, after=f"{cursor:x}", limit=settings.SSE_REPLAY_LIMIT
+                    )
+                    for event in events:
+                        version = int(event["version"], 16)
+                        cursor = version
+                        if sent.get(event["id"]) == version:
+                            continue
+                        yield format_event(event)
+                        sent[event["id"]] = version
+                        newest = max(newest, version)
+                        replayed += 1
+                    if len(events) < settings.SSE_REPLAY_LIMIT:
+                        break
+                resync = False
+            try:
+                item = await subscription.next(settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is RESYNC:
+                resync = True
+                continue
+            # Clients apply events idempotently, so a replayed duplicate is harmless
+            yield format_event(item)
+            version = int(item["version"], 16)
+            sent[item["id"]] = version
+            newest = max(newest, version)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+lead_event_broker = LeadEventBroker(pg_listener)
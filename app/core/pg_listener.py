@@ -0,0 +1,91 @@
+"""
+One LISTEN connection per worker, shared by everything that reacts to NOTIFY.
+
+LISTEN needs a session of its own, so each worker opens a single dedicated
+asyncpg connection (not one from the pool) and registers every channel on it.
+The connection is pinged every NOTIFY_PING_SECONDS so a dead one is noticed,
+and is reopened with exponential backoff. Notifications sent while it was
+down are lost, so on_connect callbacks run after every (re)connect to let
+their owners catch up: lead event streams re-read the leads table, the
+invalidation bus flushes the caches.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+import structlog
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# callback(payload) for a notification on a channel
+NotifyCallback = Callable[[str], None]
+
+
+class PostgresListener:
+    """Dedicated LISTEN connection of this worker"""
+
+    def __init__(self, database_uri: str):
+        self.dsn = make_url(database_uri).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._channels: Dict[str, NotifyCallback] = {}
+        self._on_connect: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def listen(self, channel: str, callback: NotifyCallback) -> None:
+        """Register a channel; call before start()"""
+        self._channels[channel] = callback
+
+    def on_connect(self, callback: Callable[[], None]) -> None:
+        self._on_connect.append(callback)
+
+    def start(self) -> None:
+        if self._task is None and self._channels:
+            self._task = asyncio.create_task(self._run(), name="postgres-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn, timeout=settings.DB_CONNECT_TIMEOUT_SECONDS)
+                for channel, callback in self._channels.items():
+                    await connection.add_listener(channel, self._dispatcher(callback))
+                for callback in self._on_connect:
+                    callback()
+                delay = 1.0
+                logger.info("postgres_listener_connected", channels=list(self._channels))
+                while True:
+                    await asyncio.sleep(settings.NOTIFY_PING_SECONDS)
+                    # A dead connection only shows when it is used
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("postgres_listener_failed", error=str(e), retry_in=delay)
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    @staticmethod
+    def _dispatcher(callback: NotifyCallback):
+        def dispatch(connection, pid, channel, payload):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error("postgres_notify_callback_failed", channel=channel, error=str(e))
+        return dispatch
+
+
+# Global listener, started with the application
+pg_listener = PostgresListener(settings.NOTIFY_DATABASE_URI or settings.SQLALCHEMY_DATABASE_URI)
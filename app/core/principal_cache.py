@@ -0,0 +1,126 @@
+"""
+Short-lived cache of authenticated principals.
+
+Resolving the current user costs a jwt.decode plus a SELECT on every
+authenticated request. This cache memoizes decoded access tokens and keeps a
+detached snapshot of the user for a few seconds, keyed by (user id, token).
+Entries are evicted when a user row changes (deactivation, role change),
+when a token is logged out and when a user logs out everywhere. User changes
+and logging out everywhere are also published on the invalidation bus, so
+every worker drops the user's entries.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.models.user import User
+from app.schemas.auth import TokenPayload
+
+
+def snapshot_user(user: User) -> User:
+    """Copy column values into a transient User that no session can expire"""
+    return User(**{column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs})
+
+
+class PrincipalCache:
+    """Bounded TTL cache of decoded tokens and user snapshots"""
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._payloads: "OrderedDict[str, Tuple[float, TokenPayload]]" = OrderedDict()
+        self._users: "OrderedDict[Tuple[str, str], Tuple[float, User]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get_payload(self, token: str) -> Optional[TokenPayload]:
+        entry = self._payloads.get(token)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._payloads[token]
+            return None
+        self._payloads.move_to_end(token)
+        return payload
+
+    def set_payload(self, token: str, payload: TokenPayload) -> None:
+        if not self.enabled:
+            return
+        # Decoded payloads stay valid until the token itself expires
+        self._payloads[token] = (float(payload.exp), payload)
+        self._payloads.move_to_end(token)
+        while len(self._payloads) > self.max_size:
+            self._payloads.popitem(last=False)
+
+    def get_user(self, user_id: str, token: str) -> Optional[User]:
+        key = (user_id, token)
+        entry = self._users.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            self._remove_user_entry(key)
+            return None
+        self._users.move_to_end(key)
+        return user
+
+    def set_user(self, user_id: str, token: str, user: User, token_exp: int) -> None:
+        if not self.enabled:
+            return
+        key = (user_id, token)
+        expires_at = min(time.time() + self.ttl_seconds, float(token_exp))
+        self._users[key] = (expires_at, snapshot_user(user))
+        self._users.move_to_end(key)
+        self._tokens_by_user.setdefault(user_id, set()).add(token)
+        while len(self._users) > self.max_size:
+            oldest_key = next(iter(self._users))
+            self._remove_user_entry(oldest_key)
+
+    def invalidate_user(self, user_id) -> None:
+        """Drop every cached principal for a user"""
+        for token in self._tokens_by_user.pop(str(user_id), set()):
+            self._users.pop((str(user_id), token), None)
+            self._payloads.pop(token, None)
+
+    def invalidate_token(self, user_id, token: str) -> None:
+        """Drop a single access token, e.g. on logout"""
+        self._payloads.pop(token, None)
+        self._remove_user_entry((str(user_id), token))
+
+    def clear(self) -> None:
+        self._payloads.clear()
+        self._users.clear()
+        self._tokens_by_user.clear()
+
+    def _remove_user_entry(self, key: Tuple[str, str]) -> None:
+        self._users.pop(key, None)
+        user_id, token = key
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+)
+invalidation_bus.register("principal", principal_cache.invalidate_user, principal_cache.clear)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Covers deactivation and role changes made through the ORM (incl. SQLAdmin)
+    principal_cache.invalidate_user(target.id)
+    invalidation_bus.publish_from_flush(connection, "principal", target.id)
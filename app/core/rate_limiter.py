@@ -2,24 +2,77 @@
 Rate limiting configuration for API endpoints
 """
 
+import ipaddress
+
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
 import structlog
 
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+
 logger = structlog.get_logger()
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",")
+    if proxy.strip()
+]
+
+
+def _trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_address(request: Request) -> str:
+    """
+    The caller's IP address. Behind trusted proxies it is the last
+    X-Forwarded-For entry that no trusted proxy added; anything further
+    left could be made up by the client.
+    """
+    address = get_remote_address(request)
+    if not _trusted_proxy(address):
+        return address
+    for hop in reversed(request.headers.get("x-forwarded-for", "").split(",")):
+        address = hop.strip() or address
+        if not _trusted_proxy(address):
+            break
+    return address
+
+
+def rate_limit_key(request: Request) -> str:
+    """Signed-in callers are limited per user (set by the auth dependencies), others per address"""
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return client_address(request)
+
+# Create limiter instance. Counters live in RATE_LIMIT_STORAGE (Redis when
+# configured) so limits hold across workers and restarts; the limits library
+# updates them with atomic Lua scripts. If Redis becomes unreachable the
+# limiter falls back to per-process memory instead of failing requests.
+_shared_storage = not settings.RATE_LIMIT_STORAGE.startswith("memory://")
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=settings.RATE_LIMIT_STORAGE,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    key_prefix="leadgenie",
+    in_memory_fallback_enabled=_shared_storage,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
 
 # Custom rate limit exceeded handler
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     """Custom handler for rate limit exceeded"""
     logger.warning(
         "Rate limit exceeded",
-        remote_addr=get_remote_address(request),
+        remote_addr=client_address(request),
         path=request.url.path,
         method=request.method
     )
@@ -27,7 +80,7 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     # Get retry_after from the exception, default to 60 seconds if not available
     retry_after = getattr(exc, 'retry_after', 60)
     
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=429,
         content={
             "detail": f"Rate limit exceeded. Please wait {retry_after} seconds before retrying.",
@@ -48,7 +101,10 @@ AUTH_RATE_LIMITS = {
 
 GENERAL_RATE_LIMITS = {
     "default": "60/minute",        # 60 requests per minute for general endpoints
+    "poll": "300/minute",          # Lead reads the dashboard and form poll
     "create": "30/minute",         # 30 create operations per minute
     "update": "30/minute",         # 30 update operations per minute
     "delete": "10/minute",         # 10 delete operations per minute
+    "export": "5/minute",          # 5 full lead exports per minute
+    "import": "5/minute",          # 5 bulk lead imports per minute
 }
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Shared async Redis client, created on first use
+"""
+
+from app.core.config import settings
+
+_client = None
+
+
+def get_redis():
+    """Return the process-wide redis.asyncio client"""
+    global _client
+    if _client is None:
+        if not settings.REDIS_AVAILABLE:
+            raise RuntimeError("Redis is not configured")
+        from redis import asyncio as aioredis
+
+        _client = aioredis.from_url(settings.REDIS_CONNECTION_URL, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,130 @@
+"""
+Read-replica routing.
+
+When SQLALCHEMY_REPLICA_URI is set, read-only sessions (ReadDbSession) run on
+the replica engine, which has its own pool, so the primary is kept for the
+write path. A background task measures replication lag; while the replica is
+unreachable or lags more than REPLICA_MAX_LAG_SECONDS, reads fall back to the
+primary. A client that has just written through DbSession keeps reading from
+the primary for REPLICA_STICKY_SECONDS (or the current lag, if longer) so it
+always sees its own writes. The time of that write travels with the client
+in a signed cookie, so it holds whichever worker serves the next read.
+"""
+
+import asyncio
+import math
+import time
+from typing import List, Optional
+
+import structlog
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import metrics
+
+logger = structlog.get_logger()
+
+# Seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received (an idle primary sends nothing new)
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Cookie holding the signed time of the client's last write on the primary
+WRITE_COOKIE = "db_written_at"
+
+
+class ReplicaRouter:
+    """Decides per read-only session whether the replica may serve it"""
+
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine],
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+        sticky_seconds: float,
+        secret_key: str,
+    ):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.sticky_seconds = sticky_seconds
+        # None until the first successful check, and while unreachable
+        self.lag_seconds: Optional[float] = None
+        self._signer = Signer(secret_key, salt="leadgenie.replica-write")
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds
+
+    def start(self) -> None:
+        if self.enabled and not self._tasks:
+            self._tasks = [asyncio.create_task(self._monitor(), name="replica-lag-monitor")]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def check(self) -> Optional[float]:
+        """Measure replication lag; None if the replica can't be reached"""
+        try:
+            async with self.engine.connect() as conn:
+                lag = float(await conn.scalar(LAG_QUERY))
+        except Exception as e:
+            if self.lag_seconds is not None:
+                logger.warning("replica_unreachable", error=str(e))
+            lag = None
+        else:
+            if self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds < lag:
+                logger.warning("replica_lagging", lag_seconds=round(lag, 3))
+        self.lag_seconds = lag
+        metrics.REPLICA_LAG.set(-1 if lag is None else lag)
+        return lag
+
+    @property
+    def write_cookie_max_age(self) -> int:
+        """Past this a write is older than any lag the replica is used at"""
+        return math.ceil(max(self.sticky_seconds, self.max_lag_seconds))
+
+    def write_marker(self) -> str:
+        """Signed wall-clock time of a write on the primary, for WRITE_COOKIE"""
+        return self._signer.sign(repr(time.time())).decode()
+
+    def written_at(self, marker: Optional[str]) -> Optional[float]:
+        """Time of the client's last write from its marker; None if absent or forged"""
+        if not marker:
+            return None
+        try:
+            return float(self._signer.unsign(marker))
+        except (BadSignature, ValueError):
+            return None
+
+    def use_replica(self, written_at: Optional[float]) -> bool:
+        """Whether a read-only session for a client that last wrote at written_at may run on the replica"""
+        if not self.enabled:
+            return False
+        if not self.healthy:
+            metrics.DB_READ_ROUTES.labels("primary", "replica_unavailable").inc()
+            return False
+        if written_at is not None and time.time() - written_at < max(self.sticky_seconds, self.lag_seconds):
+            metrics.DB_READ_ROUTES.labels("primary", "recent_write").inc()
+            return False
+        metrics.DB_READ_ROUTES.labels("replica", "ok").inc()
+        return True
+
+    async def _monitor(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval_seconds)
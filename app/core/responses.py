@@ -0,0 +1,32 @@
+"""
+JSON rendering for responses without a response model.
+
+Routes that declare a response_model are serialized by Pydantic straight to
+bytes (FastAPI's dump_json path), which is the fastest option; a custom
+default_response_class would turn that path off for every route, so the app
+keeps the default. Handlers that build their own JSONResponse from plain
+dicts (error handlers, health checks) use ORJSONResponse instead.
+"""
+
+import uuid
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    # orjson only handles uuid.UUID itself, not asyncpg's UUID subclass
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding; datetime and Enum values serialize natively"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
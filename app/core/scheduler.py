@@ -0,0 +1,87 @@
+"""
+In-app scheduler for periodic maintenance jobs.
+
+Every worker runs the same scheduler, but each job run first takes a Postgres
+advisory lock named after the job, so only one worker in the deployment
+executes a given job at a time; the others skip that round.
+"""
+
+import asyncio
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+import structlog
+
+logger = structlog.get_logger()
+
+JobFunc = Callable[[AsyncSession], Awaitable[Any]]
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval_seconds: float
+    func: JobFunc
+
+    @property
+    def lock_key(self) -> int:
+        """Stable advisory lock key derived from the job name"""
+        return zlib.crc32(f"leadgenie:maintenance:{self.name}".encode("utf-8"))
+
+
+class MaintenanceScheduler:
+    """Runs registered jobs on fixed intervals under a Postgres advisory lock"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.jobs: List[MaintenanceJob] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, name: str, interval_seconds: float, func: JobFunc) -> None:
+        self.jobs.append(MaintenanceJob(name=name, interval_seconds=interval_seconds, func=func))
+
+    def start(self) -> None:
+        for job in self.jobs:
+            if job.name not in self._tasks:
+                self._tasks[job.name] = asyncio.create_task(self._run_forever(job), name=f"maintenance:{job.name}")
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def run_once(self, job: MaintenanceJob) -> bool:
+        """Run a job if no other worker holds its lock. Returns whether it ran."""
+        async with self.engine.connect() as conn:
+            locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": job.lock_key})
+            await conn.commit()
+            if not locked:
+                logger.debug("maintenance_job_skipped", job=job.name)
+                return False
+            try:
+                # The session shares the locked connection, so the lock is
+                # held for the whole run even if the job commits in batches
+                async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+                    result = await job.func(db)
+                logger.info("maintenance_job_completed", job=job.name, result=result)
+                return True
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": job.lock_key})
+                await conn.commit()
+
+    async def _run_forever(self, job: MaintenanceJob) -> None:
+        # Spread the first run so workers that boot together don't all race
+        await asyncio.sleep(random.uniform(0, min(job.interval_seconds, 30)))
+        while True:
+            try:
+                await self.run_once(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("maintenance_job_failed", job=job.name, error=str(e))
+            await asyncio.sleep(job.interval_seconds)
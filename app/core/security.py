@@ -1,11 +1,20 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Union, Optional
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core import metrics
 
+# Single bcrypt context shared by the API, the admin and the seeding scripts
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt takes 100-300 ms per call, so async code runs it on this executor
+_password_executor: Optional[ThreadPoolExecutor] = None
+_password_slots: Optional[asyncio.Semaphore] = None
+
 ALGORITHM = "HS256"
 
 
@@ -54,4 +63,58 @@ def get_password_hash(password: str) -> str:
     """
     Hash a password.
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor, _password_slots
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+        _password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+    return _password_executor
+
+
+async def _run_password_job(operation: str, func: Callable, *args) -> Any:
+    """Run a bcrypt call on the hashing executor, waiting if it is saturated"""
+    executor = _get_password_executor()
+    queued_at = time.perf_counter()
+
+    def timed():
+        started_at = time.perf_counter()
+        metrics.PASSWORD_HASH_WAIT.labels(operation=operation).observe(started_at - queued_at)
+        try:
+            return func(*args)
+        finally:
+            metrics.PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started_at)
+
+    async with _password_slots:
+        metrics.PASSWORD_HASH_PENDING.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, timed)
+        finally:
+            metrics.PASSWORD_HASH_PENDING.dec()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against a hash without blocking the event loop.
+    """
+    return await _run_password_job("verify", pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a password without blocking the event loop.
+    """
+    return await _run_password_job("hash", pwd_context.hash, password)
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor, _password_slots
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+        _password_slots = None
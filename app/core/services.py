@@ -0,0 +1,76 @@
+"""
+Process-wide service registry.
+
+Services that are expensive to import or construct (the email client, the LLM
+client, the admin UI) register a factory here and are built on first use, so
+importing the application stays cheap. The application lifespan closes
+whatever was built on shutdown.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+Factory = Callable[[], Any]
+Closer = Callable[[Any], Awaitable[None]]
+
+
+class ServiceRegistry:
+    """Lazily constructed singletons, closed in reverse order of creation"""
+
+    def __init__(self):
+        self._factories: Dict[str, Tuple[Factory, Optional[Closer]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._created: List[str] = []
+
+    def register(self, name: str, factory: Factory, close: Optional[Closer] = None) -> None:
+        self._factories[name] = (factory, close)
+
+    def get(self, name: str) -> Any:
+        if name not in self._instances:
+            factory, _ = self._factories[name]
+            self._instances[name] = factory()
+            self._created.append(name)
+            logger.info("service_initialized", service=name)
+        return self._instances[name]
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._instances
+
+    async def aclose(self) -> None:
+        for name in reversed(self._created):
+            instance = self._instances.pop(name)
+            _, close = self._factories[name]
+            if close is None:
+                continue
+            try:
+                await close(instance)
+            except Exception as e:
+                logger.error("service_close_failed", service=name, error=str(e))
+        self._created.clear()
+
+
+services = ServiceRegistry()
+
+
+class LazyASGIApp:
+    """
+    ASGI app that builds the real app through the registry on first request.
+    Exposes the inner routes so url_for() can resolve names under its mount.
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+
+    @property
+    def app(self):
+        return services.get(self.service_name)
+
+    @property
+    def routes(self):
+        return getattr(self.app, "routes", [])
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.app(scope, receive, send)
@@ -9,6 +9,6 @@ async def create_ai_processing_log(
 ) -> AIProcessingLog:
     db_obj = AIProcessingLog(**obj_in.dict())
     db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
+    # Committed with the caller's unit of work
+    await db.flush()
     return db_obj
@@ -0,0 +1,21 @@
+from typing import List, Optional
+
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.lead import Lead
+
+
+def lead_filters(
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+) -> List[ColumnElement]:
+    """WHERE conditions for the lead list filters, shared by listing and export"""
+    conditions = []
+    if category:
+        conditions.append(Lead.category == category)
+    if status:
+        conditions.append(Lead.status == status)
+    if search:
+        conditions.append(Lead.name.ilike(f"%{search}%") | Lead.company.ilike(f"%{search}%"))
+    return conditions
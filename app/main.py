@@ -1,20 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.sessions import SessionMiddleware
 import structlog
-import time
-from typing import Callable
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
+from app.core import metrics
+from app.core.database import check_db_health, replica_router
+from app.core.pg_listener import pg_listener
+from app.core.services import LazyASGIApp, services
+from app.services.maintenance import build_maintenance_scheduler
+from app.services.email_queue import email_queue
+from app.services.qualification_scheduler import qualification_scheduler
+from app.services.lead_import import lead_importer
 from app.api.v1.router import api_router
 from app.core.rate_limiter import limiter, rate_limit_handler
+from app.core.responses import ORJSONResponse
 from app.middleware.security import SecurityHeadersMiddleware
-from app.admin import setup_admin
+from app.middleware.request_logging import RequestLoggingMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
 
 # Configure structured logging
 structlog.configure(
@@ -25,8 +35,41 @@ structlog.configure(
 )
 logger = structlog.get_logger()
 
+def _build_admin():
+    from app.admin import build_admin_app
+
+    return build_admin_app()
+
+services.register("admin", _build_admin)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run periodic maintenance (OTP cleanup, token and idempotency key
+    # purges, stale leads), the outbound email queue, the lead qualification
+    # workers, the read replica lag monitor and the LISTEN connection for
+    # lead events and cache invalidation
+    app.state.maintenance = build_maintenance_scheduler()
+    if settings.MAINTENANCE_ENABLED:
+        app.state.maintenance.start()
+    email_queue.start()
+    qualification_scheduler.start()
+    replica_router.start()
+    pg_listener.start()
+    try:
+        yield
+    finally:
+        await pg_listener.stop()
+        await replica_router.stop()
+        await lead_importer.stop()
+        await qualification_scheduler.stop()
+        await app.state.maintenance.stop()
+        await email_queue.stop()
+        # Close lazily built services (email and LLM clients)
+        await services.aclose()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
@@ -61,22 +104,11 @@ app.add_middleware(
     allowed_hosts=["*"]  # Configure this appropriately for production
 )
 
-# Add request logging middleware
-@app.middleware("http")
-async def log_requests(request, call_next: Callable):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    
-    logger.info(
-        "request_processed",
-        method=request.method,
-        path=request.url.path,
-        status_code=response.status_code,
-        process_time=process_time,
-    )
-    
-    return response
+# Add read-your-writes cookie for requests that wrote on the primary
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Add request logging middleware (LAST - outermost, times the whole stack)
+app.add_middleware(RequestLoggingMiddleware)
 
 # Add rate limit error handling
 @app.exception_handler(RateLimitExceeded)
@@ -92,7 +124,7 @@ async def http_exception_handler(request, exc):
         detail=exc.detail,
         path=request.url.path,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
@@ -104,7 +136,7 @@ async def validation_exception_handler(request, exc):
         errors=exc.errors(),
         path=request.url.path,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"detail": exc.errors()},
     )
@@ -117,5 +149,16 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def health_check():
     return {"status": "healthy"}
 
-# Setup SQLAdmin interface
-setup_admin(app)
\ No newline at end of file
+# Database health: round-trip latency and pool saturation
+@app.get("/health/db")
+async def database_health_check():
+    report = await check_db_health()
+    return ORJSONResponse(status_code=200 if report["healthy"] else 503, content=report)
+
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+# Setup SQLAdmin interface (built on the first /admin request)
+app.mount("/admin", LazyASGIApp("admin"), name="admin")
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Read-your-writes cookie middleware
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import replica_router
+from app.core.replica import WRITE_COOKIE
+
+
+class ReadYourWritesMiddleware:
+    """
+    Hand the client the signed time of its write when the request committed
+    one on the primary (get_db leaves it in request.state), so its next reads
+    stay off a lagging replica on whichever worker serves them.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not replica_router.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and "db_write_marker" in state:
+                cookie = Response()
+                cookie.set_cookie(
+                    WRITE_COOKIE,
+                    state["db_write_marker"],
+                    max_age=replica_router.write_cookie_max_age,
+                    httponly=True,
+                    secure=settings.SECURE_COOKIES,
+                    samesite="lax",
+                )
+                headers = MutableHeaders(scope=message)
+                for name, value in cookie.raw_headers:
+                    if name == b"set-cookie":
+                        headers.append("set-cookie", value.decode("latin-1"))
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
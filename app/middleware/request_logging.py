@@ -0,0 +1,56 @@
+"""
+Request logging and latency metrics middleware
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import structlog
+
+from app.core import metrics
+
+logger = structlog.get_logger()
+
+
+class RequestLoggingMiddleware:
+    """Log every HTTP request and record its latency per route template"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        in_progress = metrics.HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Measured until the last body chunk is sent, so streaming
+            # responses are timed in full
+            process_time = time.perf_counter() - start_time
+            in_progress.dec()
+            metrics.HTTP_REQUEST_DURATION.labels(
+                method=method,
+                route=metrics.route_label(scope),
+                status_code=status_code,
+            ).observe(process_time)
+            logger.info(
+                "request_processed",
+                method=method,
+                path=scope["path"],
+                status_code=status_code,
+                process_time=process_time,
+            )
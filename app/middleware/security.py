@@ -2,72 +2,92 @@
 Security middleware for setting HTTP security headers
 """
 
-from fastapi import Request
-from fastapi.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import structlog
 
 logger = structlog.get_logger()
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+# Content Security Policy - prevent XSS and injection attacks
+CSP_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https:; "
+    "style-src 'self' 'unsafe-inline' https:; "
+    "img-src 'self' data: https:; "
+    "font-src 'self' https:; "
+    "connect-src 'self' https:; "
+    "frame-ancestors 'none'; "
+    "base-uri 'self'; "
+    "form-action 'self';"
+)
+
+# Permissions Policy - control browser features
+PERMISSIONS_POLICY = (
+    "accelerometer=(), "
+    "camera=(), "
+    "geolocation=(), "
+    "gyroscope=(), "
+    "magnetometer=(), "
+    "microphone=(), "
+    "payment=(), "
+    "usb=()"
+)
+
+# Headers added to every response, encoded once at import
+SECURITY_HEADERS = [
+    # Prevent MIME type sniffing
+    (b"x-content-type-options", b"nosniff"),
+    # Prevent clickjacking attacks
+    (b"x-frame-options", b"DENY"),
+    # Enable XSS protection
+    (b"x-xss-protection", b"1; mode=block"),
+    # Prevent information disclosure
+    (b"x-powered-by", b""),
+    (b"server", b""),
+    # Referrer Policy - limit referrer information
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"content-security-policy", CSP_POLICY.encode("latin-1")),
+    (b"permissions-policy", PERMISSIONS_POLICY.encode("latin-1")),
+]
+
+# Strict Transport Security - enforce HTTPS
+HTTPS_HEADERS = SECURITY_HEADERS + [
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains; preload"),
+]
+
+_REPLACED_HEADERS = frozenset(name for name, _ in HTTPS_HEADERS)
+
+
+class SecurityHeadersMiddleware:
     """Middleware to add security headers to all responses"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # Prevent MIME type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        
-        # Prevent clickjacking attacks
-        response.headers["X-Frame-Options"] = "DENY"
-        
-        # Enable XSS protection
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # Prevent information disclosure
-        response.headers["X-Powered-By"] = ""
-        response.headers["Server"] = ""
-        
-        # Referrer Policy - limit referrer information
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Content Security Policy - prevent XSS and injection attacks
-        csp_policy = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https:; "
-            "style-src 'self' 'unsafe-inline' https:; "
-            "img-src 'self' data: https:; "
-            "font-src 'self' https:; "
-            "connect-src 'self' https:; "
-            "frame-ancestors 'none'; "
-            "base-uri 'self'; "
-            "form-action 'self';"
-        )
-        response.headers["Content-Security-Policy"] = csp_policy
-        
-        # HTTPS enforcement for production
-        if request.url.scheme == "https":
-            # Strict Transport Security - enforce HTTPS
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
-            
-            # Secure cookies in production
-            response.headers["Set-Cookie"] = response.headers.get("Set-Cookie", "").replace(
-                "HttpOnly", "HttpOnly; Secure; SameSite=Strict"
-            )
-        
-        # Permissions Policy - control browser features
-        permissions_policy = (
-            "accelerometer=(), "
-            "camera=(), "
-            "geolocation=(), "
-            "gyroscope=(), "
-            "magnetometer=(), "
-            "microphone=(), "
-            "payment=(), "
-            "usb=()"
-        )
-        response.headers["Permissions-Policy"] = permissions_policy
-        
-        return response
\ No newline at end of file
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_https = scope.get("scheme") == "https"
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = self._apply(message.get("headers", []), is_https)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    @staticmethod
+    def _apply(headers, is_https: bool) -> list:
+        result = []
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered in _REPLACED_HEADERS:
+                continue
+            if is_https and lowered == b"set-cookie":
+                # Secure cookies in production
+                value = value.replace(b"HttpOnly", b"HttpOnly; Secure; SameSite=Strict")
+            result.append((name, value))
+        result.extend(HTTPS_HEADERS if is_https else SECURITY_HEADERS)
+        return result
\ No newline at end of file
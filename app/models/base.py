@@ -8,6 +8,9 @@ Base = declarative_base()
 
 class BaseModel(Base):
     __abstract__ = True
+    # Fetch server-generated columns (created_at, updated_at) with RETURNING
+    # on flush, so handlers don't need a refresh() round trip
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
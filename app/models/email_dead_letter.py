@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from app.models.base import BaseModel
+
+
+class EmailDeadLetter(BaseModel):
+    """An outbound email that could not be delivered after all retries"""
+    __tablename__ = "email_dead_letters"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    to_email = Column(String(255), nullable=False, index=True)
+    subject = Column(String(255), nullable=False)
+    category = Column(String(50), nullable=False)  # 'otp', etc.
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    # Bodies are not stored: they may contain one-time codes
+
+    def __repr__(self):
+        return f"<EmailDeadLetter {self.to_email} {self.category}>"
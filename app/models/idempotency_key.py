@@ -0,0 +1,28 @@
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, false
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """The lead created by the first of a set of repeated /leads/qualify requests"""
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the tenant and the Idempotency-Key header, or of the tenant
+    # and the request body when the client sent no key
+    id = Column(String(64), primary_key=True)
+    # Deferred so the key can be claimed before the lead is inserted
+    lead_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("leads.id", ondelete="CASCADE", deferrable=True, initially="DEFERRED"),
+        nullable=False,
+        index=True,
+    )
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    # The request was merged into a lead that existed before it; its replays
+    # get the same acknowledgement, never the stored lead
+    merged = Column(Boolean, nullable=False, default=False, server_default=false())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.id[:12]} lead={self.lead_id}>"
@@ -1,13 +1,29 @@
 from typing import Optional, List
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, Integer, ForeignKey, JSON, Numeric, DateTime, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, JSON, Numeric, DateTime, Text, Index, LargeBinary, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.dialects.postgresql import ENUM as PgEnum
 import uuid
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from app.models.base import BaseModel
 
+# Mailbox providers known to ignore dots in the local part
+DOTLESS_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+
+
+def normalize_email(email: str) -> str:
+    """
+    The mailbox an address delivers to, for matching leads:
+    John.Doe+promo@Gmail.com -> johndoe@gmail.com
+    Case is folded and +tags dropped everywhere; dots only where ignored.
+    """
+    local, _, domain = email.strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local, domain = local.replace(".", ""), DOTLESS_DOMAINS[domain]
+    return f"{local}@{domain}"
+
 
 class LeadCategory(str, PyEnum):
     HOT = "hot"
@@ -38,6 +54,10 @@ class Lead(BaseModel):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False)
+    # Set from email; unique per tenant, so each prospect is one lead
+    email_normalized = Column(String(255), nullable=True)
+    # tenant_key() of the submitter, as used for qualification quotas
+    tenant = Column(String(100), nullable=False, default="anonymous")
     company = Column(String(255), nullable=True)
     message = Column(Text, nullable=True)
     category = Column(String(50), nullable=False)  # hot/warm/cold
@@ -53,17 +73,50 @@ class Lead(BaseModel):
     risk_factors = Column(JSON, nullable=True)    # List[str]
     scoring_breakdown = Column(JSON, nullable=True)  # Detailed scoring breakdown
     next_actions = Column(JSON, nullable=True)  # List[str] - AI suggested next actions
+    # MinHash of the message, set when the LLM qualified it (see similar_leads)
+    message_signature = Column(LargeBinary, nullable=True)
     
     # Metadata
     source = Column(String, nullable=False, default="form")
     assigned_to = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     status = Column(PgEnum(LeadStatus, name='lead_status_enum', create_type=False), nullable=False, default=LeadStatus.NEW)
     processed_at = Column(DateTime(timezone=True), nullable=True)
+    # Refreshed while a worker's qualification scheduler still holds the lead
+    qualification_heartbeat_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_leads")
     assignee = relationship("User", foreign_keys=[assigned_to], back_populates="assigned_leads")
     notifications = relationship("Notification", back_populates="lead")
 
+    __table_args__ = (
+        # Bulk imports tag their leads with source "import:<job id>"
+        Index("ix_leads_source_id", "source", "id"),
+        # Lead reads probe (id, updated_at) for their ETag without touching the heap
+        Index("ix_leads_id_updated_at", "id", postgresql_include=["updated_at"]),
+        Index("ix_leads_created_at_version", text("created_at DESC"), postgresql_include=["id", "updated_at"]),
+        # Duplicates older than deduplication keep a NULL and never conflict
+        Index(
+            "uq_leads_tenant_email_normalized", "tenant", "email_normalized",
+            unique=True, postgresql_where=text("email_normalized IS NOT NULL"),
+        ),
+        # The similar lead index loads the most recently qualified signatures
+        Index(
+            "ix_leads_signed_updated_at", text("updated_at DESC"),
+            postgresql_where=text("message_signature IS NOT NULL"),
+        ),
+    )
+
+    @validates("email")
+    def _normalize_email(self, key, email):
+        self.email_normalized = normalize_email(email) if email else None
+        return email
+
+    @validates("message")
+    def _drop_message_signature(self, key, message):
+        # The analysis no longer describes this message
+        self.message_signature = None
+        return message
+
     def __repr__(self):
         return f"<Lead {self.name} - {self.company}>" 
\ No newline at end of file
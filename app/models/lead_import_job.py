@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from app.models.base import BaseModel
+
+
+class LeadImportJob(BaseModel):
+    """Progress and outcome of one bulk lead import"""
+    __tablename__ = "lead_import_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/completed/failed
+    format = Column(String(10), nullable=False)  # csv/ndjson
+    qualify = Column(Boolean, nullable=False, default=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    rows_read = Column(Integer, nullable=False, default=0)
+    rows_imported = Column(Integer, nullable=False, default=0)
+    rows_merged = Column(Integer, nullable=False, default=0)  # matched an existing lead by email
+    rows_failed = Column(Integer, nullable=False, default=0)
+    rows_enqueued = Column(Integer, nullable=False, default=0)
+    error_file = Column(String(500), nullable=True)  # per-row validation errors (CSV)
+    error_message = Column(Text, nullable=True)  # why the whole job failed
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def has_error_file(self) -> bool:
+        return self.error_file is not None
+
+    @property
+    def source(self) -> str:
+        """Lead.source of the leads this job imported"""
+        return f"import:{self.id}"
+
+    def __repr__(self):
+        return f"<LeadImportJob {self.id} {self.status}>"
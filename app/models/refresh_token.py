@@ -1,9 +1,10 @@
 from typing import Optional
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
+import hashlib
 
 from app.models.base import BaseModel
 
@@ -12,7 +13,8 @@ class RefreshToken(BaseModel):
     __tablename__ = "refresh_tokens"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    token = Column(String, unique=True, index=True, nullable=False)
+    # SHA-256 of the token; the raw value only ever lives in the client cookie
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     is_revoked = Column(Boolean, default=False, nullable=False)
@@ -20,9 +22,21 @@ class RefreshToken(BaseModel):
     # Relationships
     user = relationship("User", back_populates="refresh_tokens")
 
+    __table_args__ = (
+        # Serves "revoke all active tokens of a user"
+        Index("ix_refresh_tokens_user_id_active", "user_id", postgresql_where=text("NOT is_revoked")),
+        # Serves the periodic purge
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+
     def __repr__(self):
         return f"<RefreshToken {self.id}>"
     
+    @staticmethod
+    def hash_token(token: str) -> str:
+        """Hash a raw refresh token for storage and lookup"""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    
     def is_expired(self) -> bool:
         """Check if the refresh token is expired"""
         return datetime.now(timezone.utc) > self.expires_at
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, create_model
 from datetime import datetime
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Tuple, Type
 from uuid import UUID
 
 class LeadBase(BaseModel):
@@ -21,6 +22,9 @@ class LeadUpdate(BaseModel):
     score: Optional[int] = Field(None, ge=0, le=100, description="Score between 0-100")
 
 class LeadResponse(LeadBase):
+    # Stored addresses were validated on the way in; running email-validator
+    # again for every lead in a response dominated serialization time
+    email: str
     id: UUID
     category: Optional[str] = None
     score: Optional[int] = None
@@ -40,6 +44,32 @@ class LeadResponse(LeadBase):
     class Config:
         from_attributes = True
 
+def parse_lead_fields(fields: str) -> Tuple[str, ...]:
+    """
+    Validate a comma-separated fields= value against LeadResponse.
+    Returns: the names in LeadResponse order, always including id
+    """
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(LeadResponse.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown lead fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in LeadResponse.model_fields if name in requested or name == "id")
+
+
+@lru_cache(maxsize=64)
+def lead_projection(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A LeadResponse restricted to the given fields, for sparse fieldsets"""
+    return create_model(
+        "LeadProjection",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (LeadResponse.model_fields[name].annotation, LeadResponse.model_fields[name]) for name in fields}
+    )
+
+class LeadAccepted(BaseModel):
+    """Answer to a submission merged into an existing lead, which is not disclosed"""
+    status: str = "accepted"
+    detail: str = "Your submission was received."
+
 class LeadList(BaseModel):
     leads: List[LeadResponse]
     total: int
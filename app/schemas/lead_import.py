@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+class LeadImportJobResponse(BaseModel):
+    id: UUID
+    status: str
+    format: str
+    qualify: bool
+    rows_read: int
+    rows_imported: int
+    rows_merged: int
+    rows_failed: int
+    rows_enqueued: int
+    has_error_file: bool
+    error_message: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
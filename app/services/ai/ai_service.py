@@ -1,10 +1,12 @@
 
-import httpx
 import json
 import time
+from typing import TYPE_CHECKING, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core import metrics
+from app.core.services import services
 from app.crud import crud_ai_processing_log
 from app.schemas.ai_processing_log import AIProcessingLogCreate
 from .prompt_templates import LEAD_QUALIFICATION_PROMPT
@@ -12,13 +14,38 @@ from .response_parser import ResponseValidator
 from .fallback_handler import FallbackHandler
 from .scoring import ScoringService
 from .cost_tracker import CostTracker
+from .triage import triage
+from .similar_leads import message_signature_async, pack_signature, similar_analysis
+
+if TYPE_CHECKING:
+    import httpx
 
 class FreeAPIService:
+    provider = "groq"
+    model = "llama-3.1-8b-instant"
+
     def __init__(self):
         self.base_url = "https://api.groq.com/openai/v1"
         self.api_key = settings.GROQ_API_KEY
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Shared HTTP client, so connections to the provider are reused"""
+        import httpx
+
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def generate_response(self, lead_data: dict) -> dict:
+        import httpx
+
         prompt = LEAD_QUALIFICATION_PROMPT.format(
             name=lead_data.get("name"),
             company=lead_data.get("company"),
@@ -28,58 +55,98 @@ class FreeAPIService:
             timeline=lead_data.get("timeline"),
         )
 
-        async with httpx.AsyncClient() as client:
-            start_time = time.time()
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
+        start_time = time.time()
+        try:
+            response = await self.client.post(
+                "/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json",
                 },
                 json={
-                    "model": "llama-3.1-8b-instant",
+                    "model": self.model,
                     "messages": [{"role": "user", "content": prompt}],
                     "temperature": 0.1,
                     "max_tokens": 2000,
                 },
             )
             response.raise_for_status()
-            end_time = time.time()
-            
-            response_json = response.json()
-            response_json["processing_time"] = end_time - start_time
-            return response_json
+        except httpx.HTTPStatusError as e:
+            metrics.LLM_ERRORS.labels(provider=self.provider, reason=f"http_{e.response.status_code}").inc()
+            raise
+        except httpx.TimeoutException:
+            metrics.LLM_ERRORS.labels(provider=self.provider, reason="timeout").inc()
+            raise
+        except Exception as e:
+            metrics.LLM_ERRORS.labels(provider=self.provider, reason=type(e).__name__).inc()
+            raise
+        end_time = time.time()
+        
+        response_json = response.json()
+        response_json["processing_time"] = end_time - start_time
+        self._record_metrics(response_json)
+        return response_json
+
+    def _record_metrics(self, response_json: dict) -> None:
+        model = response_json.get("model") or self.model
+        metrics.LLM_REQUEST_DURATION.labels(provider=self.provider, model=model).observe(
+            response_json["processing_time"]
+        )
+        usage = response_json.get("usage") or {}
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            if usage.get(token_type):
+                metrics.LLM_TOKENS.labels(
+                    provider=self.provider, model=model, type=token_type.split("_")[0]
+                ).inc(usage[token_type])
+
+async def _close_llm_service(service: FreeAPIService) -> None:
+    await service.aclose()
+
+
+services.register("llm", FreeAPIService, close=_close_llm_service)
+
+
+def get_llm_service() -> FreeAPIService:
+    """Return the shared LLM client, building it on first use"""
+    return services.get("llm")
+
 
 class LeadQualificationAI:
     def __init__(self, db: AsyncSession):
-        self.api_service = FreeAPIService()
+        self.api_service = get_llm_service()
         self.validator = ResponseValidator()
         self.fallback_handler = FallbackHandler()
         self.scoring_service = ScoringService()
         self.cost_tracker = CostTracker()
         self.db = db
+        self.tokens_used = 0
 
     async def qualify_lead(self, lead_data: dict) -> dict:
+        # Obvious junk is scored without spending an LLM call
+        junk = triage(lead_data)
+        if junk is not None:
+            return junk
+
+        # A recent near-duplicate's analysis is scored again instead of asking the LLM
+        signature = await message_signature_async(lead_data) if settings.SIMILAR_LEAD_REUSE_ENABLED else None
+        if signature is not None:
+            reused = await similar_analysis(self.db, lead_data, signature)
+            if reused is not None:
+                return self._score(reused)
+
+        log_entry = None
         try:
             ai_response = await self.api_service.generate_response(lead_data)
+            self.tokens_used = (ai_response.get("usage") or {}).get("total_tokens", 0)
             response_content = ai_response["choices"][0]["message"]["content"]
             
             log_entry = self._prepare_log_entry(lead_data, ai_response, response_content)
 
             if self.validator.validate_ai_response(response_content):
-                response_data = self.validator.parse_ai_response(response_content)
-                
-                # Calculate enhanced scoring
-                enhanced_score = self.scoring_service.calculate_score(response_data)
-                enhanced_category = self.scoring_service.assign_category(enhanced_score)
-                scoring_breakdown = self.scoring_service.get_scoring_breakdown(response_data)
-                
-                # Preserve original AI scores and add enhanced results
-                response_data['ai_original_score'] = response_data.get('score')  # Store original AI score
-                response_data['score'] = enhanced_score  # Update to enhanced score
-                response_data['enhanced_score'] = enhanced_score
-                response_data['category'] = enhanced_category
-                response_data['scoring_breakdown'] = scoring_breakdown
+                response_data = self._score(self.validator.parse_ai_response(response_content))
+                # Only the LLM's own analyses are offered for reuse
+                if signature is not None:
+                    response_data['message_signature'] = pack_signature(signature)
                 
                 await crud_ai_processing_log.create_ai_processing_log(db=self.db, obj_in=log_entry)
                 return response_data
@@ -87,13 +154,31 @@ class LeadQualificationAI:
                 log_entry.success = False
                 log_entry.error_message = "Invalid AI response format"
                 await crud_ai_processing_log.create_ai_processing_log(db=self.db, obj_in=log_entry)
+                metrics.LLM_FALLBACKS.labels(reason="invalid_response").inc()
                 return self.fallback_handler.rule_based_qualify(lead_data)
         except Exception as e:
-            log_entry.success = False
-            log_entry.error_message = str(e)
-            crud_ai_processing_log.create_ai_processing_log(db=self.db, obj_in=log_entry)
+            # The LLM call itself may have failed before a log entry existed
+            if log_entry is not None:
+                log_entry.success = False
+                log_entry.error_message = str(e)
+                await crud_ai_processing_log.create_ai_processing_log(db=self.db, obj_in=log_entry)
+            metrics.LLM_FALLBACKS.labels(reason="llm_error").inc()
             return self.fallback_handler.rule_based_qualify(lead_data)
 
+    def _score(self, response_data: dict) -> dict:
+        # Calculate enhanced scoring
+        enhanced_score = self.scoring_service.calculate_score(response_data)
+        enhanced_category = self.scoring_service.assign_category(enhanced_score)
+        scoring_breakdown = self.scoring_service.get_scoring_breakdown(response_data)
+        
+        # Preserve original AI scores and add enhanced results
+        response_data['ai_original_score'] = response_data.get('score')  # Store original AI score
+        response_data['score'] = enhanced_score  # Update to enhanced score
+        response_data['enhanced_score'] = enhanced_score
+        response_data['category'] = enhanced_category
+        response_data['scoring_breakdown'] = scoring_breakdown
+        return response_data
+
     def _prepare_log_entry(self, lead_data: dict, ai_response: dict, response_content: str) -> AIProcessingLogCreate:
         # Prepare the prompt that was sent to the AI  
         from .prompt_templates import LEAD_QUALIFICATION_PROMPT
@@ -0,0 +1,315 @@
+"""
+Reuse of LLM analysis across near-duplicate leads.
+
+The same inquiry often arrives again from a colleague at the same company,
+reworded slightly or with a different greeting and signature, and the exact
+deduplication on ingest (lead_merge) does not catch it. Each LLM-qualified
+lead gets a MinHash signature of its normalized message (word bigrams,
+SIGNATURE_SIZE hash functions), stored in leads.message_signature. Every
+worker keeps the signatures of recently qualified leads in memory, bucketed
+by LSH bands, so finding near-duplicates costs a few dict lookups rather
+than a scan. When a new lead from the same tenant and company domain
+matches one at SIMILAR_LEAD_THRESHOLD estimated Jaccard similarity or more,
+its stored buying signals and risk factors are reused and only the local
+ScoringService runs.
+
+Writers queue pg_notify('lead_signatures', ...) in the transaction that
+stores a signature, and every worker's listener adds it to its index. The
+index is bounded to SIMILAR_LEAD_INDEX_MAX_ENTRIES (oldest out first) and
+SIMILAR_LEAD_MAX_AGE_HOURS, and is rebuilt from the leads table when the
+listener (re)connects, which covers restarts and missed notifications.
+Signatures are pure Python and cost grows with message length: 4-5 ms
+for a message at MAX_MESSAGE_CHARS (scripts/bench_similar_leads.py), so
+qualification signs on the default executor (message_signature_async).
+"""
+
+import asyncio
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+import structlog
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.core.pg_listener import PostgresListener, pg_listener
+from app.models.lead import Lead, LeadStatus
+
+logger = structlog.get_logger()
+
+CHANNEL = "lead_signatures"
+
+SIGNATURE_SIZE = 64
+# 16 bands of 4 rows: leads about 50% similar or more share a band at least
+# half the time, and 80% similar ones almost always do
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+SIGNATURE_FORMAT = f"<{SIGNATURE_SIZE}I"
+
+SHINGLE_WORDS = 2
+# Too few shingles make the similarity estimate meaningless
+MIN_SHINGLES = 4
+# Only the start of long messages is signed
+MAX_MESSAGE_CHARS = 2000
+
+# Company domains only: a shared mailbox provider says nothing about the sender
+FREE_MAIL_DOMAINS = frozenset({
+    "aol.com", "gmail.com", "gmx.com", "gmx.de", "gmx.net", "googlemail.com", "hotmail.com", "icloud.com",
+    "live.com", "mail.com", "mail.ru", "me.com", "msn.com", "outlook.com", "proton.me", "protonmail.com",
+    "qq.com", "web.de", "yahoo.com", "yandex.com", "yandex.ru", "zoho.com", "163.com",
+})
+
+NOISE_PATTERN = re.compile(r"https?://\S+|www\.\S+|\S+@\S+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Universal hashing modulo a Mersenne prime; the seed is fixed so every
+# worker and every restart computes the same signatures
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+_random = random.Random(0x4C454144)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(_PRIME)) for _ in range(SIGNATURE_SIZE)]
+
+Signature = Tuple[int, ...]
+
+
+def shingles(message: str, name: Optional[str] = None) -> Set[str]:
+    """Word bigrams of a message, without links, addresses or the sender's name"""
+    text = NOISE_PATTERN.sub(" ", message[:MAX_MESSAGE_CHARS].lower())
+    skip = set(WORD_PATTERN.findall(name.lower())) if name else set()
+    words = [word for word in WORD_PATTERN.findall(text) if word not in skip]
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(items: Set[str]) -> Signature:
+    hashes = [zlib.crc32(item.encode()) for item in items]
+    return tuple(min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def message_signature(lead_data: dict) -> Optional[Signature]:
+    """MinHash signature of a lead's message, or None if it is too short to compare"""
+    items = shingles(lead_data.get("message") or "", lead_data.get("name"))
+    return minhash(items) if len(items) >= MIN_SHINGLES else None
+
+
+async def message_signature_async(lead_data: dict) -> Optional[Signature]:
+    """message_signature() without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, message_signature, lead_data)
+
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the shingles behind two signatures"""
+    return sum(x == y for x, y in zip(first, second)) / SIGNATURE_SIZE
+
+
+def pack_signature(signature: Signature) -> bytes:
+    return struct.pack(SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data: bytes) -> Signature:
+    return struct.unpack(SIGNATURE_FORMAT, data)
+
+
+def lead_scope(tenant: Optional[str], email: Optional[str]) -> Optional[str]:
+    """Leads are only compared within a tenant and company domain; None for free mail"""
+    domain = (email or "").rpartition("@")[2].strip().lower()
+    if not tenant or not domain or domain in FREE_MAIL_DOMAINS:
+        return None
+    return f"{tenant}/{domain}"
+
+
+class _Entry(NamedTuple):
+    scope: str
+    signature: bytes  # packed: 256 bytes, where the tuple takes 2.5 KB
+    qualified_at: float  # epoch seconds
+
+
+class Match(NamedTuple):
+    lead_id: str
+    similarity: float
+    signature: bytes
+
+
+class SimilarLeadIndex:
+    """This worker's LSH index over the signatures of recently qualified leads"""
+
+    def __init__(self, listener: PostgresListener):
+        self.max_entries = settings.SIMILAR_LEAD_INDEX_MAX_ENTRIES
+        self.max_age = settings.SIMILAR_LEAD_MAX_AGE_HOURS * 3600
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Most buckets hold one lead; a list only once they collide
+        self._buckets: Dict[int, Union[str, List[str]]] = {}
+        self._load_task: Optional[asyncio.Task] = None
+        listener.listen(CHANNEL, self._on_notify)
+        listener.on_connect(self._reload)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _bucket_keys(scope: str, signature: Signature) -> Tuple[int, ...]:
+        return tuple(hash((scope, band, signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS))
+
+    def add(self, lead_id: str, scope: str, signature: Signature, qualified_at: float) -> None:
+        self.remove(lead_id)
+        self._entries[lead_id] = _Entry(scope, pack_signature(signature), qualified_at)
+        for key in self._bucket_keys(scope, signature):
+            bucket = self._buckets.setdefault(key, lead_id)
+            if bucket != lead_id:
+                if isinstance(bucket, str):
+                    self._buckets[key] = bucket = [bucket]
+                bucket.append(lead_id)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, lead_id: str) -> None:
+        entry = self._entries.pop(lead_id, None)
+        if entry is None:
+            return
+        for key in self._bucket_keys(entry.scope, unpack_signature(entry.signature)):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, list) and lead_id in bucket:
+                bucket.remove(lead_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+            elif bucket == lead_id:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def query(
+        self, scope: str, signature: Signature, threshold: float, exclude: Optional[str] = None
+    ) -> Optional[Match]:
+        """The most similar recent lead in scope at threshold or above"""
+        candidates = set()
+        for key in self._bucket_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, str):
+                candidates.add(bucket)
+            elif bucket:
+                candidates.update(bucket)
+        candidates.discard(exclude)
+        oldest = time.time() - self.max_age
+        best = None
+        for lead_id in candidates:
+            entry = self._entries[lead_id]
+            if entry.qualified_at < oldest:
+                self.remove(lead_id)
+                continue
+            # Different bands can collide in hash(); the scope check is cheap
+            if entry.scope != scope:
+                continue
+            score = similarity(signature, unpack_signature(entry.signature))
+            if score >= threshold and (best is None or score > best.similarity):
+                best = Match(lead_id, score, entry.signature)
+        return best
+
+    async def load(self) -> None:
+        """Rebuild the index from the signatures stored with recently qualified leads"""
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.max_age)
+        async with async_session_factory() as db:
+            rows = (await db.execute(
+                select(Lead.id, Lead.tenant, Lead.email, Lead.message_signature, Lead.updated_at)
+                .where(
+                    Lead.message_signature.is_not(None),
+                    Lead.status == LeadStatus.QUALIFIED.value,
+                    Lead.updated_at > since,
+                )
+                .order_by(Lead.updated_at.desc())
+                .limit(self.max_entries)
+            )).all()
+        self.clear()
+        # Oldest first, so they are the first evicted
+        for row in reversed(rows):
+            scope = lead_scope(row.tenant, row.email)
+            if scope is not None:
+                self.add(str(row.id), scope, unpack_signature(row.message_signature), row.updated_at.timestamp())
+        logger.info("similar_lead_index_loaded", entries=len(self._entries))
+
+    def _reload(self) -> None:
+        # Signatures sent while nobody listened are read back from the table
+        if self._load_task is None or self._load_task.done():
+            self._load_task = asyncio.create_task(self._load_logged())
+
+    async def _load_logged(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error("similar_lead_index_load_failed", error=str(e))
+
+    def _on_notify(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            signature = unpack_signature(bytes.fromhex(message["signature"]))
+        except (ValueError, KeyError, struct.error):
+            logger.warning("lead_signature_malformed", payload=payload[:200])
+            return
+        self.add(message["id"], message["scope"], signature, message["qualified_at"])
+
+
+async def publish_signature(db: AsyncSession, lead: Lead) -> None:
+    """Queue a flushed lead's signature for every worker's index; sent when db commits"""
+    scope = lead_scope(lead.tenant, lead.email)
+    if lead.message_signature is None or scope is None:
+        return
+    payload = {
+        "id": str(lead.id),
+        "scope": scope,
+        "signature": lead.message_signature.hex(),
+        "qualified_at": lead.updated_at.timestamp(),
+    }
+    await db.execute(select(func.pg_notify(CHANNEL, json.dumps(payload))))
+
+
+async def similar_analysis(db: AsyncSession, lead_data: dict, signature: Signature) -> Optional[dict]:
+    """
+    The stored LLM analysis of a recent near-duplicate of a lead, shaped like
+    a parsed LLM response, or None if there is none to reuse.
+    """
+    scope = lead_scope(lead_data.get("tenant"), lead_data.get("email"))
+    if scope is None:
+        metrics.SIMILAR_LEAD_LOOKUPS.labels("unscoped").inc()
+        return None
+    match = similar_lead_index.query(
+        scope, signature, settings.SIMILAR_LEAD_THRESHOLD, exclude=str(lead_data.get("id"))
+    )
+    if match is None:
+        metrics.SIMILAR_LEAD_LOOKUPS.labels("miss").inc()
+        return None
+    row = (await db.execute(
+        select(
+            Lead.ai_score, Lead.intent_analysis, Lead.buying_signals, Lead.risk_factors, Lead.next_actions,
+            Lead.message_signature, Lead.status,
+        ).where(Lead.id == match.lead_id)
+    )).first()
+    # Deleted, merged or qualified again since it was indexed
+    if row is None or row.status != LeadStatus.QUALIFIED or row.message_signature != match.signature:
+        similar_lead_index.remove(match.lead_id)
+        metrics.SIMILAR_LEAD_LOOKUPS.labels("stale").inc()
+        return None
+    metrics.SIMILAR_LEAD_LOOKUPS.labels("reused").inc()
+    intent = row.intent_analysis or {}
+    return {
+        "score": intent.get("original_score", row.ai_score),
+        "confidence": intent.get("confidence", 0.5),
+        "reasoning": f"Analysis reused from a {match.similarity:.0%} similar lead. {intent.get('reasoning') or ''}".strip(),
+        "buying_signals": row.buying_signals or [],
+        "risk_factors": row.risk_factors or [],
+        "next_actions": row.next_actions or [],
+        "similar_lead_id": match.lead_id,
+        "similarity": match.similarity,
+    }
+
+
+# Global index, filled once the listener connects
+similar_lead_index = SimilarLeadIndex(pg_listener)
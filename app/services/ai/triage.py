@@ -0,0 +1,135 @@
+"""
+Pre-LLM triage of inbound leads.
+
+A share of submissions are gibberish, test entries or spam, and each used to
+cost a full LLM call. Triage looks at cheap features of the lead (message
+length, character entropy, letters and vowels, disposable email domains,
+link count, compiled spam and test-entry patterns) and scores obvious junk
+as cold straight away, with the reason recorded. Everything else goes to
+the LLM. Checks are deliberately conservative: a genuine lead the rules
+miss only costs an LLM call, a genuine lead they catch is lost.
+
+The checks are plain string operations over at most TRIAGE_SAMPLE_CHARS
+characters, tens of microseconds per lead (scripts/bench_triage.py).
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+# Only the start of long messages is inspected
+TRIAGE_SAMPLE_CHARS = 256
+
+# As short as LeadCreate allows is still a lead ("Need a demo.")
+MIN_MESSAGE_CHARS = 10
+MIN_MESSAGE_WORDS = 2
+# Shannon entropy (bits per character) below this is repetition ("aaaaaa")
+MIN_ENTROPY_BITS = 2.5
+# Below this share of letters among non-space characters is symbol soup
+MIN_LETTER_RATIO = 0.5
+# Below this share of vowels among letters is keyboard mashing ("sdfghjkl")
+MIN_VOWEL_RATIO = 0.15
+MAX_LINKS = 2
+
+DISPOSABLE_DOMAINS = frozenset({
+    "10minutemail.com", "discard.email", "dispostable.com", "fakeinbox.com", "getnada.com",
+    "guerrillamail.com", "guerrillamail.net", "maildrop.cc", "mailinator.com", "mailnesia.com",
+    "mintemail.com", "mohmal.com", "sharklasers.com", "spamgourmet.com", "temp-mail.org",
+    "tempmail.com", "tempmail.net", "throwawaymail.com", "trashmail.com", "yopmail.com",
+})
+
+LINK_PATTERN = re.compile(r"https?://|www\.", re.IGNORECASE)
+# Spam on their own
+SPAM_PATTERN = re.compile(r"\b(?:casino|viagra|cialis|payday\s+loans?)\b", re.IGNORECASE)
+# Also said by genuine leads ("our staff work from home", "SEO services in
+# your CRM"), so spam only with a link or a second such phrase
+SPAM_HINT_PATTERN = re.compile(
+    r"\b(?:backlinks?|seo\s+services?|guest\s+posts?|earn\s+\$\d+|work\s+from\s+home|click\s+here)\b",
+    re.IGNORECASE,
+)
+# A whole message that is only a placeholder; names are not checked, as
+# some people are called Test
+TEST_PATTERN = re.compile(
+    r"^\s*(?:(?:this\s+is\s+(?:just\s+)?a\s+)?test(?:ing)?|asdf\w*|qwerty\w*|lorem\s+ipsum.*|xxx+)[\s\d.!]*$",
+    re.IGNORECASE,
+)
+VOWELS = "aeiouy"
+NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def _entropy_bits(text: str) -> float:
+    length = len(text)
+    return -sum(count / length * math.log2(count / length) for count in Counter(text).values())
+
+
+def triage_reason(lead_data: dict) -> Optional[str]:
+    """Why a lead is junk, or None if it should go to the LLM"""
+    message = (lead_data.get("message") or "").strip()
+    sample = message[:TRIAGE_SAMPLE_CHARS]
+    email = lead_data.get("email") or ""
+
+    if email.rpartition("@")[2].lower() in DISPOSABLE_DOMAINS:
+        return "disposable_email"
+    if TEST_PATTERN.match(sample):
+        return "test_submission"
+    # Scripts written without spaces have no word count to go by
+    if len(message) < MIN_MESSAGE_CHARS or (sample.isascii() and len(sample.split()) < MIN_MESSAGE_WORDS):
+        return "too_short"
+    links = len(LINK_PATTERN.findall(sample))
+    if links > MAX_LINKS:
+        return "too_many_links"
+    if SPAM_PATTERN.search(sample) or len(SPAM_HINT_PATTERN.findall(sample)) + min(links, 1) >= 2:
+        return "spam_keywords"
+
+    compact = "".join(sample.split())
+    letters = NON_LETTERS.sub("", compact)
+    if len(letters) < MIN_LETTER_RATIO * len(compact):
+        return "not_text"
+    # Vowels only tell for Latin script
+    if letters.isascii():
+        lowered = letters.lower()
+        if sum(lowered.count(vowel) for vowel in VOWELS) < MIN_VOWEL_RATIO * len(letters):
+            return "gibberish"
+    if _entropy_bits(compact.lower()) < MIN_ENTROPY_BITS:
+        return "repetitive"
+    return None
+
+
+REASON_DESCRIPTIONS = {
+    "disposable_email": "submitted from a disposable email address",
+    "test_submission": "looks like a test submission",
+    "too_short": "message is too short to qualify",
+    "too_many_links": "message is mostly links",
+    "spam_keywords": "message matches known spam",
+    "not_text": "message is mostly symbols or digits",
+    "gibberish": "message is not readable text",
+    "repetitive": "message repeats the same characters",
+}
+
+
+def junk_qualification(reason: str) -> dict:
+    """A qualification result for a lead triage turned away, shaped like the LLM's"""
+    return {
+        "score": 0,
+        "enhanced_score": 0,
+        "category": "cold",
+        "confidence": 0.9,
+        "reasoning": f"Skipped AI qualification: {REASON_DESCRIPTIONS[reason]}.",
+        "triage_reason": reason,
+        "buying_signals": [],
+        "risk_factors": [REASON_DESCRIPTIONS[reason].capitalize()],
+        "next_actions": ["Review manually only if this lead may be genuine"],
+    }
+
+
+def triage(lead_data: dict) -> Optional[dict]:
+    """A junk qualification for an obvious junk lead, or None to call the LLM"""
+    if not settings.TRIAGE_ENABLED:
+        return None
+    reason = triage_reason(lead_data)
+    metrics.LEAD_TRIAGE.labels(reason or "forwarded").inc()
+    return junk_qualification(reason) if reason else None
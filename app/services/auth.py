@@ -1,25 +1,22 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, func, or_, and_
 import secrets
 
 from app.core.config import settings
+from app.core.security import (
+    verify_password,
+    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+)
 from app.models.user import User
 from app.models.refresh_token import RefreshToken
 from app.schemas.auth import TokenPayload
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -53,7 +50,10 @@ def create_refresh_token() -> str:
     return secrets.token_urlsafe(32)
 
 async def create_tokens(db: AsyncSession, user_id: str) -> Tuple[str, str]:
-    """Create both access and refresh tokens"""
+    """
+    Create both access and refresh tokens.
+    The refresh token row is committed with the caller's unit of work.
+    """
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(subject=user_id, expires_delta=access_token_expires)
@@ -61,66 +61,97 @@ async def create_tokens(db: AsyncSession, user_id: str) -> Tuple[str, str]:
     # Create refresh token
     refresh_token_value = create_refresh_token()
     
-    # Store refresh token in database
+    # Store only the hash of the refresh token
     refresh_token = RefreshToken(
-        token=refresh_token_value,
+        token_hash=RefreshToken.hash_token(refresh_token_value),
         user_id=user_id,
         expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     )
     
     db.add(refresh_token)
-    await db.commit()
     
     return access_token, refresh_token_value
 
 async def verify_refresh_token(db: AsyncSession, refresh_token: str) -> Optional[User]:
     """Verify and return user if refresh token is valid"""
     result = await db.execute(
-        select(RefreshToken)
-        .filter(RefreshToken.token == refresh_token)
+        select(User)
+        .join(RefreshToken, RefreshToken.user_id == User.id)
+        .filter(RefreshToken.token_hash == RefreshToken.hash_token(refresh_token))
         .filter(RefreshToken.is_revoked == False)
+        .filter(RefreshToken.expires_at > func.now())
     )
-    token_record = result.scalars().first()
+    return result.scalars().first()
+
+async def consume_refresh_token(db: AsyncSession, refresh_token: str) -> Optional[User]:
+    """
+    Revoke a valid refresh token and return its user, for token rotation.
     
-    if not token_record or not token_record.is_valid():
+    The check and the revocation are one UPDATE, so a token can only be
+    rotated once. Nothing is committed here: the request's unit of work
+    commits it together with the replacement token from create_tokens.
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == RefreshToken.hash_token(refresh_token))
+        .where(RefreshToken.is_revoked == False)
+        .where(RefreshToken.expires_at > func.now())
+        .values(is_revoked=True, updated_at=func.now())
+        .returning(RefreshToken.user_id)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is None:
         return None
-    
-    # Get the user
-    result = await db.execute(select(User).filter(User.id == token_record.user_id))
-    return result.scalars().first()
+    return await db.get(User, user_id)
 
 async def revoke_refresh_token(db: AsyncSession, refresh_token: str) -> bool:
     """Revoke a refresh token"""
     result = await db.execute(
-        select(RefreshToken).filter(RefreshToken.token == refresh_token)
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == RefreshToken.hash_token(refresh_token))
+        .where(RefreshToken.is_revoked == False)
+        .values(is_revoked=True, updated_at=func.now())
     )
-    token_record = result.scalars().first()
-    
-    if token_record:
-        token_record.is_revoked = True
-        await db.commit()
-        return True
-    return False
+    return result.rowcount > 0
 
 async def revoke_all_user_tokens(db: AsyncSession, user_id: str) -> None:
     """Revoke all refresh tokens for a user"""
-    result = await db.execute(
-        select(RefreshToken)
-        .filter(RefreshToken.user_id == user_id)
-        .filter(RefreshToken.is_revoked == False)
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .where(RefreshToken.is_revoked == False)
+        .values(is_revoked=True, updated_at=func.now())
     )
-    tokens = result.scalars().all()
-    
-    for token in tokens:
-        token.is_revoked = True
-    
-    await db.commit()
+
+async def purge_expired_refresh_tokens(db: AsyncSession, batch_size: int = 5000) -> int:
+    """
+    Delete refresh tokens that expired, or were revoked, more than
+    REFRESH_TOKEN_PURGE_GRACE_HOURS ago. Works in batches so a large backlog
+    never holds long locks. Returns the number of deleted rows.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.REFRESH_TOKEN_PURGE_GRACE_HOURS)
+    stale_ids = (
+        select(RefreshToken.id)
+        .where(or_(
+            RefreshToken.expires_at < cutoff,
+            and_(RefreshToken.is_revoked == True, RefreshToken.updated_at < cutoff),
+        ))
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    total = 0
+    while True:
+        result = await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(stale_ids)))
+        await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     result = await db.execute(select(User).filter(User.email == email))
     user = result.scalars().first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user 
\ No newline at end of file
@@ -3,133 +3,161 @@ Email service for sending OTP and other notifications.
 Uses Brevo (formerly Sendinblue) for reliable email delivery.
 """
 
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
 import structlog
-import httpx
-from jinja2 import Template
 
 from app.core.config import settings
+from app.core import metrics
+from app.core.services import services
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = structlog.get_logger()
 
+BREVO_SEND_URL = "https://api.brevo.com/v3/smtp/email"
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+
+@dataclass
+class EmailMessage:
+    to_email: str
+    subject: str
+    text_content: str
+    html_content: str
+    category: str = "general"
+
+
+class EmailDeliveryError(Exception):
+    """Raised when the provider rejects or fails to accept an email"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
 
 class EmailService:
     """Email service using Brevo API"""
-    
+
     def __init__(self):
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
         if not settings.BREVO_API_KEY:
-            logger.warning("Brevo API key not configured")
-            raise ValueError("Brevo API key is required for email service")
-    
+            logger.warning("Brevo API key not configured, emails will not be sent")
+        # Templates are loaded and compiled once, when the service is built
+        template_env = Environment(
+            loader=FileSystemLoader(str(TEMPLATES_DIR)),
+            autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+        )
+        self.otp_html_template = template_env.get_template("otp_verification.html")
+        self.otp_text_template = template_env.get_template("otp_verification.txt")
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Shared HTTP client, so connections to Brevo are pooled and reused"""
+        import httpx
+
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=settings.EMAIL_HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.EMAIL_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.EMAIL_HTTP_MAX_CONNECTIONS,
+                ),
+                headers={
+                    "Api-Key": settings.BREVO_API_KEY,
+                    "Content-Type": "application/json"
+                },
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def build_otp_email(self, email: str, otp_code: str, user_name: str = "User") -> EmailMessage:
+        """Render the OTP verification email"""
+        context = {
+            "user_name": user_name,
+            "otp_code": otp_code,
+            "expires_minutes": settings.OTP_EXPIRY_MINUTES,
+        }
+        return EmailMessage(
+            to_email=email,
+            subject="LeadGenie - Email Verification Code",
+            text_content=self.otp_text_template.render(**context),
+            html_content=self.otp_html_template.render(**context),
+            category="otp",
+        )
+
     async def send_otp_email(self, email: str, otp_code: str, user_name: str = "User") -> bool:
         """Send OTP verification email"""
-        subject = "LeadGenie - Email Verification Code"
-        
-        # Create HTML email template
-        html_template = Template("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Email Verification - LeadGenie</title>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-                .header { background: #6366f1; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
-                .content { background: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }
-                .otp-code { font-size: 32px; font-weight: bold; color: #6366f1; text-align: center; 
-                           letter-spacing: 5px; margin: 20px 0; padding: 15px; background: white; 
-                           border-radius: 8px; border: 2px dashed #6366f1; }
-                .footer { text-align: center; margin-top: 20px; font-size: 12px; color: #666; }
-                .warning { background: #fef3cd; border: 1px solid #fbbf24; color: #92400e; 
-                          padding: 10px; border-radius: 4px; margin: 15px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🚀 LeadGenie</h1>
-                    <p>Email Verification Required</p>
-                </div>
-                <div class="content">
-                    <p>Hi {{ user_name }},</p>
-                    <p>Welcome to LeadGenie! Please verify your email address to complete your registration.</p>
-                    
-                    <p>Your verification code is:</p>
-                    <div class="otp-code">{{ otp_code }}</div>
-                    
-                    <div class="warning">
-                        <strong>⏰ This code expires in 5 minutes</strong><br>
-                        For security, please don't share this code with anyone.
-                    </div>
-                    
-                    <p>If you didn't request this verification, please ignore this email.</p>
-                    
-                    <p>Best regards,<br>The LeadGenie Team</p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated message from LeadGenie.<br>
-                    © 2025 LeadGenie. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        html_content = html_template.render(user_name=user_name, otp_code=otp_code)
-        
-        # Plain text version
-        text_content = f"""
-        Hi {user_name},
-
-        Welcome to LeadGenie! Please verify your email address to complete your registration.
-
-        Your verification code is: {otp_code}
-
-        ⏰ This code expires in 5 minutes.
-        For security, please don't share this code with anyone.
-
-        If you didn't request this verification, please ignore this email.
-
-        Best regards,
-        The LeadGenie Team
-        """
-        
-        return await self._send_via_brevo(email, subject, text_content, html_content)
-    
+        message = self.build_otp_email(email, otp_code, user_name)
+        return await self._send_via_brevo(
+            message.to_email, message.subject, message.text_content, message.html_content
+        )
+
     async def _send_via_brevo(self, to_email: str, subject: str, text_content: str, html_content: str) -> bool:
         """Send email via Brevo (Sendinblue) API"""
-        url = "https://api.brevo.com/v3/smtp/email"
-        
-        headers = {
-            "Api-Key": settings.BREVO_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
+        try:
+            await self.deliver(EmailMessage(to_email, subject, text_content, html_content))
+            return True
+        except EmailDeliveryError:
+            return False
+
+    async def deliver(self, message: EmailMessage) -> None:
+        """
+        Send a single email via Brevo.
+        Raises EmailDeliveryError; retryable is False when resending can't help.
+        """
+        import httpx
+
+        if not settings.BREVO_API_KEY:
+            raise EmailDeliveryError("Brevo API key is not configured", retryable=False)
+
         data = {
             "sender": {
                 "name": settings.EMAIL_FROM_NAME,
                 "email": settings.EMAIL_FROM_ADDRESS
             },
-            "to": [{"email": to_email}],
-            "subject": subject,
-            "textContent": text_content,
-            "htmlContent": html_content
+            "to": [{"email": message.to_email}],
+            "subject": message.subject,
+            "textContent": message.text_content,
+            "htmlContent": message.html_content
         }
-        
+
+        start = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=data, headers=headers)
-                
-                if response.status_code == 201:
-                    logger.info("Email sent successfully via Brevo", email=to_email)
-                    return True
-                else:
-                    logger.error("Brevo email failed", status=response.status_code, response=response.text)
-                    return False
-        except Exception as e:
+            response = await self.client.post(BREVO_SEND_URL, json=data)
+        except httpx.HTTPError as e:
             logger.error("Failed to send email via Brevo", error=str(e))
-            return False
+            raise EmailDeliveryError(f"{type(e).__name__}: {e}") from e
+        finally:
+            metrics.EMAIL_SEND_DURATION.observe(time.perf_counter() - start)
+
+        if response.status_code == 201:
+            logger.info("Email sent successfully via Brevo", email=message.to_email)
+            return
+
+        logger.error("Brevo email failed", status=response.status_code, response=response.text)
+        # Throttling and server errors are worth retrying, other 4xx are not
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise EmailDeliveryError(f"Brevo returned {response.status_code}: {response.text[:500]}", retryable)
+
+
+async def _close_email_service(service: EmailService) -> None:
+    await service.aclose()
+
+
+services.register("email", EmailService, close=_close_email_service)
 
 
-# Global email service instance
-email_service = EmailService()
\ No newline at end of file
+def get_email_service() -> EmailService:
+    """Return the shared EmailService, building it on first use"""
+    return services.get("email")
@@ -0,0 +1,193 @@
+"""
+In-process outbound email queue.
+
+Requests enqueue a rendered EmailMessage and return immediately; worker tasks
+send it through the shared Brevo client, retrying transient failures with
+exponential backoff. Messages that still fail, or are still waiting when
+the queue stops, are recorded in the email_dead_letters table and their
+on_failure callback is run.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.core import metrics
+from app.core.database import async_session_factory
+from app.models.email_dead_letter import EmailDeadLetter
+from app.services.email import EmailDeliveryError, EmailMessage, get_email_service
+
+logger = structlog.get_logger()
+
+FailureCallback = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class QueuedEmail:
+    message: EmailMessage
+    on_failure: Optional[FailureCallback] = None
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EmailQueue:
+    """Bounded queue of outbound emails drained by a fixed pool of workers"""
+
+    def __init__(self, workers: int, max_size: int, max_attempts: int, backoff_seconds: float):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Retries waiting off-queue, with the email each one will requeue
+        self._retry_tasks: Dict[asyncio.Task, QueuedEmail] = {}
+        # Emails whose delivery was cancelled by stop()
+        self._interrupted: List[QueuedEmail] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"email-worker:{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Give queued emails a chance to go out, then cancel the workers.
+        Whatever is left (queued, waiting to retry or cut off mid-send) is
+        dead-lettered rather than dropped.
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Email queue not drained before shutdown", pending=self._queue.qsize())
+        retry_tasks = dict(self._retry_tasks)
+        for task in [*self._tasks, *retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *retry_tasks, return_exceptions=True)
+        self._tasks = []
+        self._retry_tasks.clear()
+
+        unsent = [item for task, item in retry_tasks.items() if task.cancelled()]
+        unsent.extend(self._interrupted)
+        self._interrupted = []
+        while not self._queue.empty():
+            unsent.append(self._queue.get_nowait())
+        metrics.EMAIL_QUEUE_DEPTH.set(0)
+        if unsent:
+            logger.warning("Dead-lettering unsent emails on shutdown", count=len(unsent))
+            await self._dead_letter_many(unsent, "Email queue stopped before delivery")
+
+    def enqueue(self, message: EmailMessage, on_failure: Optional[FailureCallback] = None) -> bool:
+        """
+        Queue an email for delivery.
+        Returns False if the queue is not running or is full.
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(QueuedEmail(message, on_failure))
+        except asyncio.QueueFull:
+            logger.error("Email queue full", email=message.to_email, category=message.category)
+            return False
+        metrics.EMAIL_QUEUE_DEPTH.inc()
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            metrics.EMAIL_QUEUE_DEPTH.dec()
+            try:
+                await self._attempt(item)
+            except asyncio.CancelledError:
+                self._interrupted.append(item)
+                raise
+            except Exception as e:
+                logger.error("Email worker error", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _attempt(self, item: QueuedEmail) -> None:
+        item.attempts += 1
+        try:
+            await get_email_service().deliver(item.message)
+        except EmailDeliveryError as e:
+            if e.retryable and item.attempts < self.max_attempts:
+                self._schedule_retry(item)
+            else:
+                await self._dead_letter(item, str(e))
+            return
+        metrics.EMAIL_DELIVERIES.labels(item.message.category, "sent").inc()
+
+    def _schedule_retry(self, item: QueuedEmail) -> None:
+        # Retries wait off-queue so one failing email never stalls a worker
+        delay = self.backoff_seconds * 2 ** (item.attempts - 1)
+        delay += random.uniform(0, delay / 2)
+        logger.info("Retrying email", email=item.message.to_email, attempt=item.attempts, delay=round(delay, 2))
+        task = asyncio.create_task(self._requeue_after(item, delay))
+        self._retry_tasks[task] = item
+        task.add_done_callback(lambda done: self._retry_tasks.pop(done, None))
+
+    async def _requeue_after(self, item: QueuedEmail, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self._queue.put_nowait(item)
+            metrics.EMAIL_QUEUE_DEPTH.inc()
+        except asyncio.QueueFull:
+            await self._dead_letter(item, "Email queue full on retry")
+
+    async def _dead_letter(self, item: QueuedEmail, error: str) -> None:
+        await self._dead_letter_many([item], error)
+
+    async def _dead_letter_many(self, items: List[QueuedEmail], error: str) -> None:
+        for item in items:
+            message = item.message
+            metrics.EMAIL_DELIVERIES.labels(message.category, "dead_lettered").inc()
+            logger.error(
+                "Email dead-lettered", email=message.to_email, category=message.category,
+                attempts=item.attempts, error=error
+            )
+        try:
+            async with async_session_factory() as db:
+                db.add_all([
+                    EmailDeadLetter(
+                        to_email=item.message.to_email,
+                        subject=item.message.subject[:255],
+                        category=item.message.category,
+                        attempts=item.attempts,
+                        last_error=error,
+                    )
+                    for item in items
+                ])
+                await db.commit()
+        except Exception as e:
+            logger.error("Failed to record dead-lettered email", error=str(e))
+        for item in items:
+            if item.on_failure is not None:
+                try:
+                    await item.on_failure()
+                except Exception as e:
+                    logger.error("Email failure callback failed", error=str(e))
+
+
+# Global email queue instance, started with the application
+email_queue = EmailQueue(
+    workers=settings.EMAIL_QUEUE_WORKERS,
+    max_size=settings.EMAIL_QUEUE_MAX_SIZE,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    backoff_seconds=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,147 @@
+"""
+Idempotent lead submission.
+
+Client retries and double-submitted forms would otherwise create duplicate
+leads, each paying for a full LLM qualification. A request is identified by
+its Idempotency-Key header or, without one, by a hash of its body, both
+scoped to the tenant. The first request claims the key in idempotency_keys
+in the same transaction that inserts its lead; repeats get that lead back.
+
+Claiming is an INSERT ... ON CONFLICT on the primary key, so concurrent
+duplicates are resolved by Postgres: the second insert waits for the first
+transaction and, once it commits, finds the key taken. A key that expired
+is claimed anew by the same statement.
+
+A request merged into an existing lead (see lead_merge) is answered with an
+acknowledgement only, and the key remembers that so its replays are too.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+from app.schemas.lead import LeadCreate
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an Idempotency-Key comes back with a different body"""
+
+
+@dataclass
+class RequestIdentity:
+    key_id: str
+    request_hash: str
+    source: str  # "header" or "body", for metrics
+    ttl: timedelta
+
+
+class OriginalLead(NamedTuple):
+    """The lead an earlier request with the same identity ended up in"""
+    lead_id: UUID
+    merged: bool
+
+
+def _sha256(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def identify_request(tenant: str, lead: LeadCreate, idempotency_key: Optional[str]) -> RequestIdentity:
+    """Key a /leads/qualify request by its header if given, else by its body"""
+    request_hash = _sha256(json.dumps(lead.model_dump(mode="json"), sort_keys=True))
+    if idempotency_key:
+        return RequestIdentity(
+            key_id=_sha256("header", tenant, idempotency_key),
+            request_hash=request_hash,
+            source="header",
+            ttl=timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+    return RequestIdentity(
+        key_id=_sha256("body", tenant, request_hash),
+        request_hash=request_hash,
+        source="body",
+        ttl=timedelta(seconds=settings.IDEMPOTENCY_WINDOW_SECONDS),
+    )
+
+
+def _original_lead(row, identity: RequestIdentity) -> Optional[OriginalLead]:
+    if row is None:
+        return None
+    if row.request_hash != identity.request_hash:
+        raise IdempotencyKeyReused(identity.key_id)
+    return OriginalLead(row.lead_id, row.merged)
+
+
+async def find_original_lead(db: AsyncSession, identity: RequestIdentity) -> Optional[OriginalLead]:
+    """The lead of an earlier request with this identity, if its key is live"""
+    row = (await db.execute(
+        select(IdempotencyKey.lead_id, IdempotencyKey.request_hash, IdempotencyKey.merged)
+        .where(IdempotencyKey.id == identity.key_id, IdempotencyKey.expires_at > func.now())
+    )).first()
+    return _original_lead(row, identity)
+
+
+async def claim(
+    db: AsyncSession, identity: RequestIdentity, lead_id: UUID, merged: bool = False
+) -> Optional[OriginalLead]:
+    """
+    Claim the key for the lead this request inserted or merged into, in the
+    same transaction.
+    Returns: None if claimed, else the lead of the request that holds the key
+    """
+    expires_at = datetime.now(timezone.utc) + identity.ttl
+    statement = insert(IdempotencyKey).values(
+        id=identity.key_id, lead_id=lead_id, request_hash=identity.request_hash, expires_at=expires_at,
+        merged=merged,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.id],
+        set_={
+            "lead_id": statement.excluded.lead_id,
+            "request_hash": statement.excluded.request_hash,
+            "expires_at": statement.excluded.expires_at,
+            "merged": statement.excluded.merged,
+            "created_at": func.now(),
+            "updated_at": func.now(),
+        },
+        where=IdempotencyKey.expires_at <= func.now(),
+    )
+    while True:
+        if (await db.execute(statement.returning(IdempotencyKey.id))).first() is not None:
+            return None
+        # The conflicting row committed before ON CONFLICT saw it, so this
+        # statement's snapshot includes it; it is gone only if its lead was
+        # deleted meanwhile, and then the key is free to claim again
+        row = (await db.execute(
+            select(IdempotencyKey.lead_id, IdempotencyKey.request_hash, IdempotencyKey.merged)
+            .where(IdempotencyKey.id == identity.key_id)
+        )).first()
+        if row is not None:
+            return _original_lead(row, identity)
+
+
+async def purge_expired_idempotency_keys(db: AsyncSession, batch_size: int = 5000) -> int:
+    """Delete expired keys in batches. Returns the number of deleted rows"""
+    expired_ids = (
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at < func.now())
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    total = 0
+    while True:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired_ids)))
+        await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
@@ -0,0 +1,351 @@
+"""
+Bulk lead import.
+
+An upload is spooled to a file, then read back as a stream of CSV or NDJSON
+rows. Each IMPORT_CHUNK_SIZE rows are validated against LeadCreate and the
+valid ones are written with a single COPY (asyncpg copy_records_to_table)
+into a staging table, so memory is bounded by the chunk size rather than the
+file size. From there they are upserted into leads: a row for an address
+the tenant already has is merged into that lead (see lead_merge), and rows
+for one address within a chunk are merged before that. Rows that fail
+validation go to a per-job CSV error file. Progress is kept in
+lead_import_jobs so any worker can report it.
+
+With qualify, the imported leads, and leads an import merged new content
+into, are then fed to the qualification scheduler
+a batch at a time, as the tenant's queue has room across all workers (see
+tenant_limits), and marked PROCESSING only once queued so the stale lead
+reaper never sees a lead still waiting here.
+"""
+
+import asyncio
+import csv
+import functools
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import structlog
+from pydantic import ValidationError
+from sqlalchemy import column, select, table, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import async_session_factory, engine
+from app.core.metrics import qualification_queue
+from app.models.lead import Lead, LeadStatus, normalize_email
+from app.models.lead_import_job import LeadImportJob
+from app.schemas.lead import LeadCreate
+from app.services.lead_merge import INSERTED, merge_message, merge_on_conflict
+from app.services.qualification_scheduler import qualification_scheduler
+
+logger = structlog.get_logger()
+
+# process_lead_qualification(lead_id, lead_data), passed in by the caller
+QualifyFunc = Callable[[uuid.UUID, dict], Awaitable[Optional[int]]]
+ProgressCallback = Callable[[LeadImportJob], None]
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+COPY_COLUMNS = (
+    "id", "name", "email", "email_normalized", "tenant", "company", "message", "category", "score", "source", "status",
+)
+
+# Per-connection staging table for COPY; emptied when each chunk commits
+STAGING_TABLE = "lead_import_staging"
+CREATE_STAGING_TABLE = text(
+    f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} "
+    f"(LIKE {Lead.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+)
+staging = table(STAGING_TABLE, *(column(name) for name in COPY_COLUMNS))
+
+# Leads handed to the scheduler per round while feeding qualification
+ENQUEUE_BATCH_SIZE = 100
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds IMPORT_MAX_UPLOAD_MB"""
+
+
+def _work_dir() -> str:
+    path = settings.IMPORT_WORK_DIR or os.path.join(tempfile.gettempdir(), "leadgenie-imports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_path(job_id) -> str:
+    return os.path.join(_work_dir(), f"{job_id}.upload")
+
+
+def error_file_path(job_id) -> str:
+    return os.path.join(_work_dir(), f"{job_id}-errors.csv")
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], path: str) -> int:
+    """Write an upload to disk as it arrives. Returns: bytes written"""
+    max_bytes = settings.IMPORT_MAX_UPLOAD_MB * 1024 * 1024
+    written = 0
+    try:
+        with open(path, "wb") as spool:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {settings.IMPORT_MAX_UPLOAD_MB} MB")
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return written
+
+
+def iter_rows(path: str, import_format: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (line number, row) from a spooled upload.
+    A row is a dict, or the error that kept the line from parsing.
+    """
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as source:
+        if import_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError("Line is not a JSON object")
+
+
+def _blank_to_none(row: Dict) -> Dict:
+    # CSV has no null; an empty optional column means "not given"
+    return {key: (None if value == "" else value) for key, value in row.items() if key}
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def validate_chunk(rows: List[Tuple[int, object]], source: str, tenant: str) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Split parsed rows into COPY records and (line, error, raw row) tuples.
+    Rows for one mailbox are merged into a single record.
+    """
+    merged: Dict[str, dict] = {}
+    errors = []
+    for line_number, row in rows:
+        if isinstance(row, Exception):
+            errors.append((line_number, str(row), ""))
+            continue
+        try:
+            lead = LeadCreate(**_blank_to_none(row))
+        except ValidationError as e:
+            errors.append((line_number, _describe(e), json.dumps(row, default=str)))
+            continue
+        email_normalized = normalize_email(lead.email)
+        record = merged.get(email_normalized)
+        if record is None:
+            merged[email_normalized] = lead.model_dump()
+        else:
+            record["message"] = merge_message(record["message"], lead.message)
+            record["company"] = record["company"] or lead.company
+    records = [
+        (
+            uuid.uuid4(), lead["name"], lead["email"], email_normalized, tenant, lead["company"], lead["message"],
+            "cold", 0, source, LeadStatus.NEW.value,
+        )
+        for email_normalized, lead in merged.items()
+    ]
+    return records, errors
+
+
+class LeadImporter:
+    """Runs import jobs as background tasks in this process"""
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self, job_id, path: str, tenant: str, qualify: Optional[QualifyFunc] = None) -> None:
+        """Run a job in the background and remove its spooled upload afterwards"""
+        task = asyncio.create_task(self._run_spooled(job_id, path, tenant, qualify), name=f"lead-import:{job_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def run(
+        self,
+        job_id,
+        path: str,
+        tenant: str,
+        qualify: Optional[QualifyFunc] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> LeadImportJob:
+        """Load an upload file, then optionally feed its leads to qualification"""
+        async with async_session_factory() as db:
+            job = await db.get(LeadImportJob, job_id)
+        logger.info("lead_import_started", job_id=str(job_id), format=job.format, qualify=job.qualify)
+        try:
+            await self._update(job, on_progress, status="running")
+            await self._load(job, path, tenant, on_progress)
+            if qualify is not None:
+                await self._enqueue_qualification(job, tenant, qualify, on_progress)
+            await self._update(job, on_progress, status="completed", finished_at=datetime.now(timezone.utc))
+        except asyncio.CancelledError:
+            await self._update(job, on_progress, status="failed", error_message="Interrupted by shutdown",
+                               finished_at=datetime.now(timezone.utc))
+            raise
+        except Exception as e:
+            logger.error("lead_import_failed", job_id=str(job_id), error=str(e))
+            await self._update(job, on_progress, status="failed", error_message=str(e),
+                               finished_at=datetime.now(timezone.utc))
+        logger.info(
+            "lead_import_finished", job_id=str(job_id), status=job.status,
+            imported=job.rows_imported, failed=job.rows_failed, enqueued=job.rows_enqueued
+        )
+        return job
+
+    async def _run_spooled(self, job_id, path: str, tenant: str, qualify: Optional[QualifyFunc]) -> None:
+        try:
+            await self.run(job_id, path, tenant, qualify)
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    async def _load(
+        self, job: LeadImportJob, path: str, tenant: str, on_progress: Optional[ProgressCallback]
+    ) -> None:
+        rows = iter_rows(path, job.format)
+        error_writer = None
+        error_file = None
+        try:
+            while True:
+                # Parsing and validation are CPU work; keep them off the event loop
+                chunk = await asyncio.to_thread(lambda: list(islice(rows, settings.IMPORT_CHUNK_SIZE)))
+                if not chunk:
+                    break
+                records, errors = await asyncio.to_thread(validate_chunk, chunk, job.source, tenant)
+                if errors:
+                    if error_writer is None:
+                        error_file = open(error_file_path(job.id), "w", newline="", encoding="utf-8")
+                        error_writer = csv.writer(error_file)
+                        error_writer.writerow(["line", "error", "row"])
+                    error_writer.writerows(errors)
+                    error_file.flush()
+                await self._copy_chunk(job, records, len(chunk), len(errors))
+                if errors and job.error_file is None:
+                    await self._update(job, on_progress, error_file=error_file.name)
+                elif on_progress is not None:
+                    on_progress(job)
+        finally:
+            rows.close()
+            if error_file is not None:
+                error_file.close()
+
+    async def _copy_chunk(self, job: LeadImportJob, records: List[tuple], read: int, failed: int) -> None:
+        """Upsert one chunk into leads and advance the job's counters in the same transaction"""
+        inserted = 0
+        async with engine.begin() as conn:
+            if records:
+                await conn.execute(CREATE_STAGING_TABLE)
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    STAGING_TABLE, records=records, columns=COPY_COLUMNS
+                )
+                result = await conn.execute(
+                    merge_on_conflict(
+                        insert(Lead).from_select(COPY_COLUMNS, select(staging)), LeadStatus.NEW.value
+                    ).returning(INSERTED)
+                )
+                inserted = sum(1 for row in result if row.inserted)
+            # Valid rows that did not become a lead of their own were merged
+            merged = read - failed - inserted
+            await conn.execute(
+                update(LeadImportJob)
+                .where(LeadImportJob.id == job.id)
+                .values(
+                    rows_read=LeadImportJob.rows_read + read,
+                    rows_imported=LeadImportJob.rows_imported + inserted,
+                    rows_merged=LeadImportJob.rows_merged + merged,
+                    rows_failed=LeadImportJob.rows_failed + failed,
+                )
+            )
+        job.rows_read += read
+        job.rows_imported += inserted
+        job.rows_merged += merged
+        job.rows_failed += failed
+
+    async def _enqueue_qualification(
+        self,
+        job: LeadImportJob,
+        tenant: str,
+        qualify: QualifyFunc,
+        on_progress: Optional[ProgressCallback],
+    ) -> None:
+        last_id = None
+        while True:
+            # Shared with the tenant's /leads/qualify calls on every worker
+            room = await qualification_scheduler.room(tenant)
+            if room <= 0:
+                await asyncio.sleep(1)
+                continue
+            query = (
+                select(Lead.id, Lead.name, Lead.email, Lead.company, Lead.message)
+                .where(Lead.source == job.source, Lead.status == LeadStatus.NEW.value)
+                .order_by(Lead.id)
+                .limit(min(room, ENQUEUE_BATCH_SIZE))
+            )
+            if last_id is not None:
+                query = query.where(Lead.id > last_id)
+            async with async_session_factory() as db:
+                batch = (await db.execute(query)).all()
+                if not batch:
+                    return
+                await db.execute(
+                    update(Lead)
+                    .where(Lead.id.in_([row.id for row in batch]))
+                    .values(status=LeadStatus.PROCESSING.value)
+                )
+                await db.execute(
+                    update(LeadImportJob)
+                    .where(LeadImportJob.id == job.id)
+                    .values(rows_enqueued=LeadImportJob.rows_enqueued + len(batch))
+                )
+                await db.commit()
+            for row in batch:
+                lead_data = {
+                    "name": row.name, "email": row.email, "company": row.company, "message": row.message,
+                    "tenant": tenant,
+                }
+                qualification_queue.enqueued(row.id)
+                await qualification_scheduler.submit(tenant, row.id, functools.partial(qualify, row.id, lead_data))
+            job.rows_enqueued += len(batch)
+            last_id = batch[-1].id
+            if on_progress is not None:
+                on_progress(job)
+
+    async def _update(self, job: LeadImportJob, on_progress: Optional[ProgressCallback], **values) -> None:
+        async with async_session_factory() as db:
+            await db.execute(update(LeadImportJob).where(LeadImportJob.id == job.id).values(**values))
+            await db.commit()
+        for name, value in values.items():
+            setattr(job, name, value)
+        if on_progress is not None:
+            on_progress(job)
+
+
+# Global importer instance; running jobs are cancelled on shutdown
+lead_importer = LeadImporter()
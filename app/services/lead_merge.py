@@ -0,0 +1,127 @@
+"""
+Lead deduplication on ingest.
+
+The same prospect often arrives through several channels under variants of
+one address (John.Doe+promo@Gmail.com, johndoe@gmail.com). Leads are unique
+per tenant on normalize_email(email), and ingest inserts with ON CONFLICT on
+that index, so a submission for a known prospect is merged into the existing
+lead rather than creating another one. A merge appends the new message and
+fills in a missing company; since that changes what was scored, the lead is
+qualified again, unless sales already took it further (contacted, won or
+lost): those keep their status and source. A repeat that adds nothing is
+left alone: no write and no LLM call.
+"""
+
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import LEAD_MERGES
+from app.models.lead import Lead, LeadStatus, normalize_email
+from app.schemas.lead import LeadCreate
+
+MESSAGE_SEPARATOR = "\n\n"
+
+# A lead merged many times keeps the newest text of its messages
+MERGED_MESSAGE_MAX_LENGTH = 8000
+
+# A merge qualifies these again; later stages belong to the sales workflow
+REQUALIFIED_STATUSES = (
+    LeadStatus.NEW.value, LeadStatus.PROCESSING.value, LeadStatus.QUALIFIED.value, LeadStatus.FAILED.value,
+)
+
+# In RETURNING: true for a row the statement inserted, false for an update
+INSERTED = literal_column("xmax = 0").label("inserted")
+
+
+def adds_to_message(existing: Optional[str], incoming: str) -> bool:
+    """Whether a message says something the existing one doesn't (merge_on_conflict's rule)"""
+    return incoming.lower() not in (existing or "").lower()
+
+
+def merge_message(existing: Optional[str], incoming: str) -> str:
+    """The message merge_on_conflict stores for a lead"""
+    if not adds_to_message(existing, incoming):
+        return existing
+    # An edited resubmission that repeats the whole message replaces it
+    if not existing or existing.lower() in incoming.lower():
+        return incoming
+    return (existing + MESSAGE_SEPARATOR + incoming)[-MERGED_MESSAGE_MAX_LENGTH:]
+
+
+def merge_on_conflict(statement: Insert, merged_status: str) -> Insert:
+    """
+    Turn an INSERT into leads into an upsert on (tenant, email_normalized).
+    Rows that add a message or a company update the existing lead and, if it
+    is in REQUALIFIED_STATUSES, set merged_status and the row's source; rows
+    that add nothing leave it untouched and return nothing.
+    """
+    excluded = statement.excluded
+    existing = func.lower(func.coalesce(Lead.message, ""))
+    new_message = func.strpos(existing, func.lower(excluded.message)) == 0
+    new_company = Lead.company.is_(None) & excluded.company.is_not(None)
+    repeats_existing = func.strpos(func.lower(excluded.message), existing) > 0
+    requalify = Lead.status.in_(REQUALIFIED_STATUSES)
+    merged = func.right(func.concat_ws(MESSAGE_SEPARATOR, Lead.message, excluded.message), MERGED_MESSAGE_MAX_LENGTH)
+    return statement.on_conflict_do_update(
+        index_elements=[Lead.tenant, Lead.email_normalized],
+        index_where=Lead.email_normalized.is_not(None),
+        set_={
+            "message": case(
+                (~new_message, Lead.message), (repeats_existing, excluded.message), else_=merged
+            ),
+            "company": func.coalesce(Lead.company, excluded.company),
+            "source": case((requalify, excluded.source), else_=Lead.source),
+            "status": case((requalify, literal(merged_status, Lead.status.type)), else_=Lead.status),
+            # Its analysis, if any, was of the message before the merge
+            "message_signature": None,
+            "updated_at": func.now(),
+        },
+        where=new_message | new_company,
+    )
+
+
+async def ingest_lead(
+    db: AsyncSession, lead_id: UUID, lead: LeadCreate, tenant: str, created_by: Optional[UUID]
+) -> Tuple[UUID, Optional[dict]]:
+    """
+    Insert a submitted lead as lead_id, or merge it into the tenant's lead
+    for the same mailbox.
+    Returns: (id of the lead, lead_data to qualify it with, or None if the
+    submission changed nothing or the lead is past qualification)
+    """
+    statement = merge_on_conflict(
+        insert(Lead).values(
+            id=lead_id,
+            name=lead.name,
+            email=lead.email,
+            email_normalized=normalize_email(lead.email),
+            tenant=tenant,
+            company=lead.company,
+            message=lead.message,
+            category="cold",  # Default category
+            score=0,  # Default score
+            status=LeadStatus.PROCESSING.value,
+            created_by=created_by,
+        ),
+        LeadStatus.PROCESSING.value,
+    ).returning(Lead.id, Lead.name, Lead.email, Lead.company, Lead.message, Lead.status, INSERTED)
+    while True:
+        row = (await db.execute(statement)).first()
+        if row is not None:
+            LEAD_MERGES.labels("inserted" if row.inserted else "merged").inc()
+            if row.status != LeadStatus.PROCESSING:
+                return row.id, None
+            return row.id, {
+                "name": row.name, "email": row.email, "company": row.company, "message": row.message, "tenant": tenant
+            }
+        existing_id = await db.scalar(
+            select(Lead.id).where(Lead.tenant == tenant, Lead.email_normalized == normalize_email(lead.email))
+        )
+        # Gone only if deleted since the conflict; then insert after all
+        if existing_id is not None:
+            LEAD_MERGES.labels("unchanged").inc()
+            return existing_id, None
@@ -0,0 +1,72 @@
+"""
+Periodic housekeeping jobs run by the maintenance scheduler
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.notify import EVENT_COLUMNS, notify_lead_event
+from app.core.scheduler import MaintenanceScheduler
+from app.models.lead import Lead, LeadStatus
+from app.services import auth as auth_service
+from app.services.idempotency import purge_expired_idempotency_keys
+from app.services.otp import OTPService
+
+logger = structlog.get_logger()
+
+
+async def fail_stale_processing_leads(db: AsyncSession) -> int:
+    """
+    Mark leads stuck in PROCESSING as FAILED.
+    Qualification runs in-process, so a worker restart can orphan a lead.
+    Leads a live worker still holds queued or running keep a fresh
+    qualification heartbeat and are left alone however long they wait.
+    Returns: number of leads marked as failed
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.STALE_LEAD_TIMEOUT_MINUTES)
+    result = await db.execute(
+        update(Lead)
+        .where(Lead.status == LeadStatus.PROCESSING.value)
+        .where(Lead.updated_at < cutoff)
+        .where(or_(Lead.qualification_heartbeat_at.is_(None), Lead.qualification_heartbeat_at < cutoff))
+        .values(status=LeadStatus.FAILED.value, updated_at=func.clock_timestamp())
+        .returning(*EVENT_COLUMNS)
+    )
+    failed = result.all()
+    # Clients streaming these leads get the failure when this commits
+    for lead in failed:
+        await notify_lead_event(db, lead)
+    await db.commit()
+    if failed:
+        logger.warning("Marked stale processing leads as failed", count=len(failed))
+    return len(failed)
+
+
+def build_maintenance_scheduler() -> MaintenanceScheduler:
+    scheduler = MaintenanceScheduler(engine)
+    scheduler.add_job(
+        "otp_cleanup",
+        settings.OTP_CLEANUP_INTERVAL_MINUTES * 60,
+        OTPService.cleanup_expired_otps,
+    )
+    scheduler.add_job(
+        "refresh_token_purge",
+        settings.REFRESH_TOKEN_PURGE_INTERVAL_MINUTES * 60,
+        auth_service.purge_expired_refresh_tokens,
+    )
+    scheduler.add_job(
+        "stale_lead_reaper",
+        settings.STALE_LEAD_CHECK_INTERVAL_MINUTES * 60,
+        fail_stale_processing_leads,
+    )
+    scheduler.add_job(
+        "idempotency_key_purge",
+        settings.IDEMPOTENCY_PURGE_INTERVAL_MINUTES * 60,
+        purge_expired_idempotency_keys,
+    )
+    return scheduler
@@ -3,13 +3,16 @@ OTP (One-Time Password) service for email verification
 """
 
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Tuple
+from typing import Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, delete
 import structlog
 
 from app.models.otp import EmailOTP
-from app.services.email import email_service
+from app.core.database import async_session_factory
+from app.services.email import get_email_service
+from app.services.email_queue import email_queue
+from app.services.otp_store import VerifyStatus, get_otp_store
 from app.core.config import settings
 
 logger = structlog.get_logger()
@@ -30,30 +33,31 @@ class OTPService:
         Returns: (success, message)
         """
         try:
+            store = get_otp_store()
+            
             # Check if there's a recent valid OTP
-            existing_otp = await OTPService._get_valid_otp(db, email, purpose)
-            if existing_otp:
+            if await store.has_active(db, email, purpose):
                 logger.info("Valid OTP already exists", email=email)
                 return False, "A verification code was already sent. Please check your email or wait 5 minutes to request a new one."
             
-            # Invalidate any existing OTPs for this email/purpose
-            await OTPService._invalidate_existing_otps(db, email, purpose)
-            
-            # Create new OTP
-            otp = EmailOTP.create_otp(email, purpose, settings.OTP_EXPIRY_MINUTES)
-            db.add(otp)
-            await db.commit()
+            # Replace any existing OTP for this email/purpose with a new one
+            otp_code = await store.issue(db, email, purpose, settings.OTP_EXPIRY_MINUTES)
             
-            # Send email
-            email_sent = await email_service.send_otp_email(email, otp.otp_code, user_name)
+            # Hand the email to the outbound queue; send inline if it isn't running
+            if email_queue.running:
+                message = get_email_service().build_otp_email(email, otp_code, user_name)
+                email_sent = email_queue.enqueue(
+                    message, on_failure=OTPService._discard_on_failure(email, purpose, otp_code)
+                )
+            else:
+                email_sent = await get_email_service().send_otp_email(email, otp_code, user_name)
             
             if email_sent:
                 logger.info("OTP sent successfully", email=email, purpose=purpose)
                 return True, f"Verification code sent to {email}. Please check your email."
             else:
                 # Remove OTP if email failed
-                await db.delete(otp)
-                await db.commit()
+                await store.discard(db, email, purpose, otp_code)
                 logger.error("Failed to send OTP email", email=email)
                 return False, "Failed to send verification email. Please try again."
                 
@@ -74,50 +78,30 @@ class OTPService:
         Returns: (success, message)
         """
         try:
-            # Find the OTP
-            result = await db.execute(
-                select(EmailOTP).filter(
-                    and_(
-                        EmailOTP.email == email,
-                        EmailOTP.created_for == purpose,
-                        EmailOTP.is_verified == False
-                    )
-                ).order_by(EmailOTP.created_at.desc())
-            )
-            otp_record = result.scalars().first()
+            # Attempts are counted atomically by the store
+            result = await get_otp_store().verify(db, email, purpose, otp_code)
             
-            if not otp_record:
+            if result.status == VerifyStatus.NOT_FOUND:
                 logger.warning("No OTP found for verification", email=email)
                 return False, "No verification code found. Please request a new one."
             
-            # Increment attempts
-            otp_record.attempts += 1
-            
-            # Check if expired
-            if otp_record.is_expired():
+            if result.status == VerifyStatus.EXPIRED:
                 logger.warning("OTP expired", email=email)
                 return False, "Verification code has expired. Please request a new one."
             
-            # Check max attempts
-            if otp_record.attempts > settings.OTP_MAX_ATTEMPTS:
+            if result.status == VerifyStatus.TOO_MANY_ATTEMPTS:
                 logger.warning("Max OTP attempts exceeded", email=email)
                 return False, "Too many failed attempts. Please request a new verification code."
             
-            # Verify code
-            if otp_record.otp_code != otp_code:
-                await db.commit()  # Save the attempt increment
-                remaining = settings.OTP_MAX_ATTEMPTS - otp_record.attempts
+            if result.status == VerifyStatus.INVALID:
+                remaining = settings.OTP_MAX_ATTEMPTS - result.attempts
                 if remaining > 0:
-                    logger.warning("Invalid OTP attempt", email=email, attempts=otp_record.attempts)
+                    logger.warning("Invalid OTP attempt", email=email, attempts=result.attempts)
                     return False, f"Invalid verification code. {remaining} attempts remaining."
                 else:
                     logger.warning("OTP verification failed - max attempts", email=email)
                     return False, "Invalid verification code. Please request a new one."
             
-            # Success - mark as verified
-            otp_record.is_verified = True
-            await db.commit()
-            
             logger.info("OTP verified successfully", email=email, purpose=purpose)
             return True, "Email verification successful."
             
@@ -127,25 +111,31 @@ class OTPService:
             return False, "An error occurred during verification. Please try again."
     
     @staticmethod
-    async def cleanup_expired_otps(db: AsyncSession) -> int:
+    async def cleanup_expired_otps(db: AsyncSession, batch_size: int = 5000) -> int:
         """
-        Clean up expired OTPs (run as background task)
+        Clean up expired OTPs (run by the maintenance scheduler)
+        Only the database store needs this; key-value OTPs expire on their own.
+        Deletes in batches so a large backlog never holds long locks.
         Returns: number of deleted OTPs
         """
         try:
             # Delete OTPs older than 24 hours
             cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
-            
-            result = await db.execute(
-                select(EmailOTP).filter(EmailOTP.created_at < cutoff_time)
+            expired_ids = (
+                select(EmailOTP.id)
+                .filter(EmailOTP.created_at < cutoff_time)
+                .limit(batch_size)
+                .scalar_subquery()
             )
-            expired_otps = result.scalars().all()
             
-            count = len(expired_otps)
-            for otp in expired_otps:
-                await db.delete(otp)
+            count = 0
+            while True:
+                result = await db.execute(delete(EmailOTP).where(EmailOTP.id.in_(expired_ids)))
+                await db.commit()
+                count += result.rowcount
+                if result.rowcount < batch_size:
+                    break
             
-            await db.commit()
             logger.info("Cleaned up expired OTPs", count=count)
             return count
             
@@ -155,36 +145,10 @@ class OTPService:
             return 0
     
     @staticmethod
-    async def _get_valid_otp(db: AsyncSession, email: str, purpose: str) -> Optional[EmailOTP]:
-        """Get valid OTP for email/purpose if exists"""
-        result = await db.execute(
-            select(EmailOTP).filter(
-                and_(
-                    EmailOTP.email == email,
-                    EmailOTP.created_for == purpose,
-                    EmailOTP.is_verified == False,
-                    EmailOTP.expires_at > datetime.now(timezone.utc),
-                    EmailOTP.attempts < settings.OTP_MAX_ATTEMPTS
-                )
-            ).order_by(EmailOTP.created_at.desc())
-        )
-        return result.scalars().first()
-    
-    @staticmethod
-    async def _invalidate_existing_otps(db: AsyncSession, email: str, purpose: str):
-        """Mark existing OTPs as verified (invalidate them)"""
-        result = await db.execute(
-            select(EmailOTP).filter(
-                and_(
-                    EmailOTP.email == email,
-                    EmailOTP.created_for == purpose,
-                    EmailOTP.is_verified == False
-                )
-            )
-        )
-        existing_otps = result.scalars().all()
-        
-        for otp in existing_otps:
-            otp.is_verified = True
-        
-        await db.commit()
\ No newline at end of file
+    def _discard_on_failure(email: str, purpose: str, otp_code: str):
+        """Callback that drops an OTP whose email was dead-lettered, so a new one can be requested"""
+        async def discard():
+            async with async_session_factory() as db:
+                await get_otp_store().discard(db, email, purpose, otp_code)
+                await db.commit()
+        return discard
@@ -0,0 +1,297 @@
+"""
+Storage backends for one-time passwords.
+
+DatabaseOTPStore keeps OTPs in the email_otps table (the default).
+KeyValueOTPStore keeps them in a TTL key-value store instead: Redis when it
+is configured, otherwise a process-local dict (single-node setups only).
+Attempt counting is atomic in every backend.
+
+DatabaseOTPStore writes through the caller's session and never commits: the
+request's unit of work does, so a code is only consumed if the request that
+consumed it succeeds. Attempts are the exception, see verify().
+"""
+
+import secrets
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.models.otp import EmailOTP
+
+
+class VerifyStatus(str, Enum):
+    VERIFIED = "verified"
+    NOT_FOUND = "not_found"
+    EXPIRED = "expired"
+    TOO_MANY_ATTEMPTS = "too_many_attempts"
+    INVALID = "invalid"
+
+
+@dataclass
+class VerifyResult:
+    status: VerifyStatus
+    attempts: int = 0
+
+
+def generate_otp_code() -> str:
+    return str(100000 + secrets.randbelow(900000))
+
+
+class OTPStore(ABC):
+    """Interface used by OTPService"""
+
+    @abstractmethod
+    async def has_active(self, db: AsyncSession, email: str, purpose: str) -> bool:
+        """Whether an unexpired, unused OTP with attempts left exists"""
+
+    @abstractmethod
+    async def issue(self, db: AsyncSession, email: str, purpose: str, expires_minutes: int) -> str:
+        """Invalidate any previous OTP and store a new one. Returns the code."""
+
+    @abstractmethod
+    async def discard(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> None:
+        """Remove an OTP that could not be delivered"""
+
+    @abstractmethod
+    async def verify(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> VerifyResult:
+        """Count an attempt and check the code"""
+
+    def _check(self, attempts: int, expired: bool, stored_code: str, otp_code: str) -> VerifyResult:
+        if expired:
+            return VerifyResult(VerifyStatus.EXPIRED, attempts)
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            return VerifyResult(VerifyStatus.TOO_MANY_ATTEMPTS, attempts)
+        if not secrets.compare_digest(stored_code, otp_code):
+            return VerifyResult(VerifyStatus.INVALID, attempts)
+        return VerifyResult(VerifyStatus.VERIFIED, attempts)
+
+
+class DatabaseOTPStore(OTPStore):
+    """OTPs in the email_otps table"""
+
+    async def has_active(self, db: AsyncSession, email: str, purpose: str) -> bool:
+        result = await db.execute(
+            select(EmailOTP.id).filter(
+                and_(
+                    EmailOTP.email == email,
+                    EmailOTP.created_for == purpose,
+                    EmailOTP.is_verified == False,
+                    EmailOTP.expires_at > datetime.now(timezone.utc),
+                    EmailOTP.attempts < settings.OTP_MAX_ATTEMPTS
+                )
+            ).limit(1)
+        )
+        return result.first() is not None
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, expires_minutes: int) -> str:
+        # Invalidate any existing OTPs for this email/purpose
+        await db.execute(
+            update(EmailOTP)
+            .where(
+                and_(
+                    EmailOTP.email == email,
+                    EmailOTP.created_for == purpose,
+                    EmailOTP.is_verified == False
+                )
+            )
+            .values(is_verified=True)
+        )
+        otp = EmailOTP.create_otp(email, purpose, expires_minutes)
+        db.add(otp)
+        await db.flush()
+        return otp.otp_code
+
+    async def discard(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> None:
+        await db.execute(
+            delete(EmailOTP).where(
+                and_(
+                    EmailOTP.email == email,
+                    EmailOTP.created_for == purpose,
+                    EmailOTP.otp_code == otp_code,
+                    EmailOTP.is_verified == False
+                )
+            )
+        )
+
+    async def verify(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> VerifyResult:
+        latest_id = (
+            select(EmailOTP.id)
+            .filter(
+                and_(
+                    EmailOTP.email == email,
+                    EmailOTP.created_for == purpose,
+                    EmailOTP.is_verified == False
+                )
+            )
+            .order_by(EmailOTP.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        # Increment attempts in the same statement that reads the OTP. It is
+        # committed on its own: a failed attempt ends in an error response,
+        # which rolls the request back, and must still count
+        async with async_session_factory() as attempt_db:
+            result = await attempt_db.execute(
+                update(EmailOTP)
+                .where(EmailOTP.id == latest_id)
+                .values(attempts=EmailOTP.attempts + 1)
+                .returning(EmailOTP.id, EmailOTP.attempts, EmailOTP.otp_code, EmailOTP.expires_at)
+            )
+            row = result.first()
+            await attempt_db.commit()
+        if row is None:
+            return VerifyResult(VerifyStatus.NOT_FOUND)
+
+        verdict = self._check(
+            row.attempts, datetime.now(timezone.utc) > row.expires_at, row.otp_code, otp_code
+        )
+        if verdict.status == VerifyStatus.VERIFIED:
+            # Only the first correct attempt can flip is_verified
+            marked = await db.execute(
+                update(EmailOTP)
+                .where(EmailOTP.id == row.id)
+                .where(EmailOTP.is_verified == False)
+                .values(is_verified=True)
+            )
+            if marked.rowcount == 0:
+                verdict = VerifyResult(VerifyStatus.NOT_FOUND, row.attempts)
+        return verdict
+
+
+# Returns nil if the OTP is gone, else {attempts, code, expires_at}
+_REDIS_ATTEMPT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+local fields = redis.call('HMGET', KEYS[1], 'code', 'expires_at')
+return {attempts, fields[1], fields[2]}
+"""
+
+
+class KeyValueOTPStore(OTPStore):
+    """
+    OTPs as TTL'd hashes in Redis, or in a process-local dict when Redis is
+    not configured. Keys outlive expiry by a grace period so users get an
+    "expired" message instead of "not found".
+    """
+
+    GRACE_SECONDS = 300
+
+    def __init__(self, redis=None):
+        self.redis = redis
+        self._local: Dict[str, Dict[str, object]] = {}
+        self._attempt_script = redis.register_script(_REDIS_ATTEMPT_SCRIPT) if redis is not None else None
+
+    @staticmethod
+    def _key(email: str, purpose: str) -> str:
+        return f"otp:{purpose}:{email.lower()}"
+
+    async def has_active(self, db: AsyncSession, email: str, purpose: str) -> bool:
+        key = self._key(email, purpose)
+        if self.redis is not None:
+            attempts, expires_at = await self.redis.hmget(key, "attempts", "expires_at")
+        else:
+            entry = self._get_local(key)
+            attempts, expires_at = (entry["attempts"], entry["expires_at"]) if entry else (None, None)
+        if expires_at is None:
+            return False
+        return float(expires_at) > time.time() and int(attempts) < settings.OTP_MAX_ATTEMPTS
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, expires_minutes: int) -> str:
+        key = self._key(email, purpose)
+        code = generate_otp_code()
+        expires_at = time.time() + expires_minutes * 60
+        ttl = expires_minutes * 60 + self.GRACE_SECONDS
+        if self.redis is not None:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping={"code": code, "attempts": 0, "expires_at": expires_at})
+                pipe.expire(key, ttl)
+                await pipe.execute()
+        else:
+            self._prune_local()
+            self._local[key] = {
+                "code": code,
+                "attempts": 0,
+                "expires_at": expires_at,
+                "evict_at": time.time() + ttl,
+            }
+        return code
+
+    async def discard(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> None:
+        key = self._key(email, purpose)
+        if self.redis is not None:
+            if await self.redis.hget(key, "code") == otp_code:
+                await self.redis.delete(key)
+        else:
+            entry = self._get_local(key)
+            if entry and entry["code"] == otp_code:
+                del self._local[key]
+
+    async def verify(self, db: AsyncSession, email: str, purpose: str, otp_code: str) -> VerifyResult:
+        key = self._key(email, purpose)
+        if self.redis is not None:
+            row = await self._attempt_script(keys=[key])
+            if row is None:
+                return VerifyResult(VerifyStatus.NOT_FOUND)
+            attempts, stored_code, expires_at = int(row[0]), row[1], float(row[2])
+        else:
+            # No await between read and write, so this is atomic per process
+            entry = self._get_local(key)
+            if entry is None:
+                return VerifyResult(VerifyStatus.NOT_FOUND)
+            entry["attempts"] += 1
+            attempts, stored_code, expires_at = entry["attempts"], entry["code"], entry["expires_at"]
+
+        verdict = self._check(attempts, time.time() > expires_at, stored_code, otp_code)
+        if verdict.status == VerifyStatus.VERIFIED:
+            # Only the caller that actually removes the key wins
+            if self.redis is not None:
+                consumed = await self.redis.delete(key)
+            else:
+                consumed = self._local.pop(key, None) is not None
+            if not consumed:
+                return VerifyResult(VerifyStatus.NOT_FOUND, attempts)
+        return verdict
+
+    def _get_local(self, key: str) -> Optional[Dict[str, object]]:
+        entry = self._local.get(key)
+        if entry is not None and entry["evict_at"] <= time.time():
+            del self._local[key]
+            return None
+        return entry
+
+    def _prune_local(self) -> None:
+        now = time.time()
+        for key in [key for key, entry in self._local.items() if entry["evict_at"] <= now]:
+            del self._local[key]
+
+
+_otp_store: Optional[OTPStore] = None
+
+
+def get_otp_store() -> OTPStore:
+    """Return the OTP store selected by OTP_STORE_BACKEND"""
+    global _otp_store
+    if _otp_store is None:
+        if settings.OTP_STORE_BACKEND == "kv":
+            redis = None
+            if settings.REDIS_AVAILABLE:
+                from app.core.redis import get_redis
+
+                redis = get_redis()
+            _otp_store = KeyValueOTPStore(redis)
+        elif settings.OTP_STORE_BACKEND == "database":
+            _otp_store = DatabaseOTPStore()
+        else:
+            raise ValueError(f"Unknown OTP_STORE_BACKEND: {settings.OTP_STORE_BACKEND}")
+    return _otp_store
@@ -0,0 +1,275 @@
+"""
+Per-tenant admission control and weighted fair scheduling for AI qualification.
+
+Every tenant (a company, else a user, else "anonymous") has its own FIFO
+queue. A fixed pool of workers picks the next lead by weighted fair queuing:
+each lead gets a virtual finish tag of start + cost / weight, and the lowest
+tag among tenants still within their in-flight and tokens-per-minute quotas
+runs next. A tenant that floods /leads/qualify only lengthens its own queue
+and is refused with 429 once that queue is full. Queued and running leads
+get their qualification_heartbeat_at refreshed every
+QUALIFICATION_HEARTBEAT_SECONDS so the stale lead reaper can tell a long
+wait from a lead orphaned by a dead worker.
+
+Queues and the fair-queuing order are per process: each gunicorn worker
+schedules the leads submitted to it. The quotas are enforced by
+tenant_limits, across all workers when Redis is configured and as a
+per-process share of each quota otherwise.
+"""
+
+import asyncio
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import func, update
+
+from app.core.config import settings
+from app.core import metrics
+from app.core.database import async_session_factory
+from app.models.lead import Lead, LeadStatus
+from app.models.user import User
+from app.services.tenant_limits import TenantQuota, get_tenant_limits
+
+logger = structlog.get_logger()
+
+# Returns the number of LLM tokens used, if known
+JobFunc = Callable[[], Awaitable[Optional[int]]]
+
+ANONYMOUS_TENANT = "anonymous"
+HEARTBEAT_BATCH_SIZE = 1000
+# Metric label shared by every user without a company, to bound cardinality
+USER_TENANT_LABEL = "user"
+
+
+def tenant_key(user: Optional[User]) -> str:
+    """Scheduling key for a caller; TENANT_QUOTAS overrides use the same keys"""
+    if user is None:
+        return ANONYMOUS_TENANT
+    if user.company_id:
+        return f"company:{user.company_id}"
+    return f"user:{user.id}"
+
+
+def tenant_label(tenant: str) -> str:
+    """Metric label for a tenant: companies by key, users without one together"""
+    return USER_TENANT_LABEL if tenant.startswith("user:") else tenant
+
+
+class TenantQueueFull(Exception):
+    """Raised when a tenant already has TENANT_MAX_QUEUED leads waiting"""
+
+
+@dataclass
+class QualificationJob:
+    tenant: str
+    lead_id: str
+    run: JobFunc
+    cost: int
+    start_tag: float
+    finish_tag: float
+
+
+class TenantState:
+    """Queue and running leads of one tenant in this process"""
+
+    def __init__(self, quota: TenantQuota):
+        self.quota = quota
+        self.queue: Deque[QualificationJob] = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return not self.queue and self.in_flight == 0
+
+
+class QualificationScheduler:
+    """Runs qualification jobs on a worker pool, fairly across tenants"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._tenants: Dict[str, TenantState] = {}
+        self._virtual_time = 0.0
+        # Running lead ids, with their tenants
+        self._running: Dict[str, str] = {}
+        # Tenants whose head job a worker is starting
+        self._starting: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"qualification-worker:{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="qualification-heartbeat"))
+        self._tasks.append(asyncio.create_task(self._renew_leases(), name="qualification-leases"))
+
+    async def stop(self) -> None:
+        # Queued leads stay PROCESSING; without heartbeats the stale lead
+        # reaper fails them
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def room(self, tenant: str) -> int:
+        """How many more leads the tenant may queue, across all workers"""
+        return await get_tenant_limits().room(tenant)
+
+    def pending(self, tenant: str) -> int:
+        """Leads of a tenant that this worker holds queued or running"""
+        state = self._tenants.get(tenant)
+        return len(state.queue) + state.in_flight if state else 0
+
+    def lead_ids(self) -> List[str]:
+        """Leads this worker holds, queued or running"""
+        ids = [job.lead_id for state in self._tenants.values() for job in state.queue]
+        ids.extend(self._running)
+        return ids
+
+    async def heartbeat(self) -> int:
+        """Stamp the leads this worker holds; returns how many are still PROCESSING"""
+        ids = self.lead_ids()
+        touched = 0
+        for start in range(0, len(ids), HEARTBEAT_BATCH_SIZE):
+            async with async_session_factory() as db:
+                result = await db.execute(
+                    update(Lead)
+                    .where(Lead.id.in_(ids[start:start + HEARTBEAT_BATCH_SIZE]))
+                    .where(Lead.status == LeadStatus.PROCESSING.value)
+                    # Not a change clients see: updated_at is the lead's version
+                    .values(qualification_heartbeat_at=func.now(), updated_at=Lead.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                touched += result.rowcount
+        return touched
+
+    async def check_admission(self, tenant: str) -> None:
+        """Raise TenantQueueFull if the tenant can't queue another lead"""
+        if await self.room(tenant) <= 0:
+            metrics.TENANT_REJECTED.labels(tenant_label(tenant)).inc()
+            logger.warning("qualification_admission_refused", tenant=tenant)
+            raise TenantQueueFull(tenant)
+
+    async def submit(self, tenant: str, lead_id, run: JobFunc, cost: Optional[int] = None) -> None:
+        lead_id = str(lead_id)
+        await get_tenant_limits().enqueue(tenant, lead_id)
+        state = self._state(tenant)
+        cost = cost or settings.QUALIFICATION_ESTIMATED_TOKENS
+        start_tag = max(self._virtual_time, state.last_finish)
+        state.last_finish = start_tag + cost / max(state.quota.weight, 0.01)
+        state.queue.append(QualificationJob(tenant, lead_id, run, cost, start_tag, state.last_finish))
+        metrics.TENANT_QUEUE_DEPTH.labels(tenant_label(tenant)).inc()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _state(self, tenant: str) -> TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = TenantState(TenantQuota.for_tenant(tenant))
+        return state
+
+    async def _next_job(self) -> Tuple[Optional[QualificationJob], float]:
+        """Start the eligible job with the lowest finish tag, or say how long to wait"""
+        limits = get_tenant_limits()
+        heads = sorted(
+            (state.queue[0] for tenant, state in self._tenants.items() if state.queue and tenant not in self._starting),
+            key=lambda job: job.finish_tag,
+        )
+        wait = math.inf
+        for job in heads:
+            # Only the worker holding the tenant in _starting pops its queue
+            self._starting.add(job.tenant)
+            try:
+                delay = await limits.start(job.tenant, job.lead_id, job.cost)
+            finally:
+                self._starting.discard(job.tenant)
+            if delay <= 0:
+                self._tenants[job.tenant].queue.popleft()
+                return job, 0.0
+            wait = min(wait, delay)
+        return None, wait
+
+    async def _worker(self) -> None:
+        limits = get_tenant_limits()
+        while True:
+            # Cleared before looking, so a submit or finish meanwhile isn't missed
+            self._wakeup.clear()
+            job, wait = await self._next_job()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if wait == math.inf else wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            state = self._tenants[job.tenant]
+            state.in_flight += 1
+            self._running[job.lead_id] = job.tenant
+            self._virtual_time = max(self._virtual_time, job.start_tag)
+            metrics.TENANT_QUEUE_DEPTH.labels(tenant_label(job.tenant)).dec()
+            metrics.TENANT_IN_FLIGHT.labels(tenant_label(job.tenant)).inc()
+
+            tokens_used = None
+            try:
+                tokens_used = await job.run()
+            except Exception as e:
+                logger.error("qualification_job_failed", tenant=job.tenant, lead_id=job.lead_id, error=str(e))
+            finally:
+                state.in_flight -= 1
+                self._running.pop(job.lead_id, None)
+                metrics.TENANT_IN_FLIGHT.labels(tenant_label(job.tenant)).dec()
+                # Settle the up-front estimate against actual usage, which is
+                # none for triaged, reused, fallback and failed qualifications
+                tokens_used = tokens_used or 0
+                await limits.finish(job.tenant, job.lead_id, job.cost, tokens_used)
+                if tokens_used:
+                    metrics.TENANT_TOKENS.labels(tenant_label(job.tenant)).inc(tokens_used)
+                self._forget_if_idle(job.tenant)
+                self._wakeup.set()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(settings.QUALIFICATION_HEARTBEAT_SECONDS)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error("qualification_heartbeat_failed", error=str(e))
+
+    async def _renew_leases(self) -> None:
+        while True:
+            await asyncio.sleep(settings.TENANT_LEASE_SECONDS / 3)
+            held: Dict[str, List[str]] = {}
+            for tenant, state in self._tenants.items():
+                if state.queue:
+                    held[tenant] = [job.lead_id for job in state.queue]
+            for lead_id, tenant in self._running.items():
+                held.setdefault(tenant, []).append(lead_id)
+            if not held:
+                continue
+            try:
+                await get_tenant_limits().renew(held)
+            except Exception as e:
+                logger.error("tenant_lease_renewal_failed", error=str(e))
+
+    def _forget_if_idle(self, tenant: str) -> None:
+        # Keep state while it still matters: a lead in the fair-queuing order
+        state = self._tenants.get(tenant)
+        if state is not None and state.idle and state.last_finish <= self._virtual_time:
+            del self._tenants[tenant]
+
+
+# Global scheduler instance, started with the application
+qualification_scheduler = QualificationScheduler(workers=settings.QUALIFICATION_WORKERS)
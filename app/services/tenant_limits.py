@@ -0,0 +1,324 @@
+"""
+Per-tenant qualification quotas, enforced across worker processes.
+
+The qualification scheduler keeps each tenant's queue and fair-queuing order
+in its own process; the quotas themselves live here. RedisTenantLimits keeps
+every tenant's queued and running leads (as leased sorted-set members) and
+its tokens-per-minute bucket in Redis, updated by Lua scripts, so
+TENANT_MAX_QUEUED, TENANT_MAX_IN_FLIGHT and TENANT_TOKENS_PER_MINUTE hold
+for the whole deployment. Each worker renews the leases of the leads it
+holds every TENANT_LEASE_SECONDS / 3; a worker that dies frees its slots
+once they lapse. If Redis can't be reached, leads are admitted and started
+unthrottled rather than stalled.
+
+Without Redis, LocalTenantLimits keeps the same state in process memory and
+gives each process an equal share of every quota, QUALIFICATION_PROCESSES
+being the number of worker processes (gunicorn.conf.py sets it). In-flight
+and queue limits are at least one lead per process, so a quota smaller than
+the process count is exceeded. Fairness between tenants is per process
+either way: a lead is ordered only against leads queued in the same worker.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# How long a worker waits before asking again whether a tenant has a free
+# in-flight slot, when the slot may be freed by another process
+IN_FLIGHT_RETRY_SECONDS = 0.5
+
+
+@dataclass
+class TenantQuota:
+    weight: float
+    max_in_flight: int
+    max_queued: int
+    tokens_per_minute: int
+
+    @classmethod
+    def for_tenant(cls, tenant: str) -> "TenantQuota":
+        overrides = settings.TENANT_QUOTAS.get(tenant)
+        if overrides is None:
+            # Also accept a bare company or user id as the key
+            overrides = settings.TENANT_QUOTAS.get(tenant.partition(":")[2], {})
+        return cls(
+            weight=float(overrides.get("weight", settings.TENANT_WEIGHT)),
+            max_in_flight=int(overrides.get("max_in_flight", settings.TENANT_MAX_IN_FLIGHT)),
+            max_queued=int(overrides.get("max_queued", settings.TENANT_MAX_QUEUED)),
+            tokens_per_minute=int(overrides.get("tokens_per_minute", settings.TENANT_TOKENS_PER_MINUTE)),
+        )
+
+    def per_process(self, processes: int) -> "TenantQuota":
+        """This process's share of the quota when each of processes enforces its own"""
+        return TenantQuota(
+            weight=self.weight,
+            max_in_flight=max(self.max_in_flight // processes, 1),
+            max_queued=max(self.max_queued // processes, 1),
+            tokens_per_minute=self.tokens_per_minute and max(self.tokens_per_minute // processes, 1),
+        )
+
+
+class TenantLimits(ABC):
+    """Admission, in-flight and token accounting for the qualification scheduler"""
+
+    @abstractmethod
+    async def room(self, tenant: str) -> int:
+        """How many more leads the tenant may queue"""
+
+    @abstractmethod
+    async def enqueue(self, tenant: str, lead_id: str) -> None:
+        """Count a lead as queued"""
+
+    @abstractmethod
+    async def start(self, tenant: str, lead_id: str, cost: int) -> float:
+        """
+        Move a queued lead to in flight and charge its estimated tokens.
+        Returns 0 if it may run now, else how long to wait before asking
+        again (math.inf: until this process finishes one of its leads).
+        """
+
+    @abstractmethod
+    async def finish(self, tenant: str, lead_id: str, cost: int, tokens_used: int) -> None:
+        """Free the lead's in-flight slot and settle its estimate against actual usage"""
+
+    async def renew(self, held: Dict[str, List[str]]) -> None:
+        """Extend the leases of the leads this process holds, by tenant"""
+
+
+class TokenBucket:
+    """Tokens-per-minute bucket of one tenant in this process"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.refilled_at = time.monotonic()
+
+    @property
+    def full(self) -> bool:
+        self.refill()
+        return self.tokens >= self.tokens_per_minute
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        rate = self.tokens_per_minute / 60
+        self.tokens = min(float(self.tokens_per_minute), self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+
+    def seconds_until_affordable(self, cost: int) -> float:
+        """0 if the bucket covers the cost, else how long until it does"""
+        if self.tokens_per_minute <= 0:
+            return 0.0
+        self.refill()
+        # A job larger than the whole bucket runs once the bucket is full
+        shortfall = min(cost, self.tokens_per_minute) - self.tokens
+        if shortfall <= 0:
+            return 0.0
+        return shortfall / (self.tokens_per_minute / 60)
+
+
+class _LocalTenant:
+    def __init__(self, quota: TenantQuota):
+        self.quota = quota
+        self.queued = 0
+        self.in_flight = 0
+        self.bucket = TokenBucket(quota.tokens_per_minute)
+
+    @property
+    def idle(self) -> bool:
+        return self.queued == 0 and self.in_flight == 0 and self.bucket.full
+
+
+class LocalTenantLimits(TenantLimits):
+    """Quotas kept in this process, each process getting an equal share"""
+
+    def __init__(self, processes: int):
+        self.processes = max(processes, 1)
+        self._tenants: Dict[str, _LocalTenant] = {}
+
+    async def room(self, tenant: str) -> int:
+        state = self._tenants.get(tenant)
+        if state is None:
+            return TenantQuota.for_tenant(tenant).per_process(self.processes).max_queued
+        return state.quota.max_queued - state.queued
+
+    async def enqueue(self, tenant: str, lead_id: str) -> None:
+        self._state(tenant).queued += 1
+
+    async def start(self, tenant: str, lead_id: str, cost: int) -> float:
+        state = self._state(tenant)
+        if state.in_flight >= state.quota.max_in_flight:
+            return math.inf
+        delay = state.bucket.seconds_until_affordable(cost)
+        if delay > 0:
+            return delay
+        state.queued -= 1
+        state.in_flight += 1
+        state.bucket.tokens -= cost
+        return 0.0
+
+    async def finish(self, tenant: str, lead_id: str, cost: int, tokens_used: int) -> None:
+        state = self._state(tenant)
+        state.in_flight -= 1
+        state.bucket.tokens -= tokens_used - cost
+        # Keep state while it still matters: a lead, or a debt in the bucket
+        if state.idle:
+            del self._tenants[tenant]
+
+    def _state(self, tenant: str) -> _LocalTenant:
+        state = self._tenants.get(tenant)
+        if state is None:
+            quota = TenantQuota.for_tenant(tenant).per_process(self.processes)
+            state = self._tenants[tenant] = _LocalTenant(quota)
+        return state
+
+
+# KEYS: queued. ARGV: now. Drops lapsed leases and counts what is left.
+_COUNT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# KEYS: queued, running, bucket. ARGV: now, lease, max_in_flight,
+# tokens_per_minute, cost, lead_id. Returns "0" once started, "-1" while
+# the tenant is at max_in_flight, else the seconds until the bucket covers
+# the cost (as a string: Lua numbers come back truncated to integers).
+_START_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[4])
+local cost = tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return '-1'
+end
+if capacity > 0 then
+    local rate = capacity / 60
+    local bucket = redis.call('HMGET', KEYS[3], 'tokens', 'at')
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+    end
+    -- A job larger than the whole bucket runs once the bucket is full
+    local shortfall = math.min(cost, capacity) - tokens
+    if shortfall > 0 then
+        return tostring(shortfall / rate)
+    end
+    tokens = tokens - cost
+    redis.call('HSET', KEYS[3], 'tokens', tokens, 'at', now)
+    -- Once it would be full again the bucket is the same as no bucket
+    redis.call('EXPIRE', KEYS[3], math.ceil((capacity - tokens) / rate) + 1)
+end
+redis.call('ZREM', KEYS[1], ARGV[6])
+redis.call('ZADD', KEYS[2], now + lease, ARGV[6])
+redis.call('EXPIRE', KEYS[2], lease)
+return '0'
+"""
+
+# KEYS: running, bucket. ARGV: now, tokens_per_minute, lead_id, tokens used
+# minus the estimate charged at start.
+_FINISH_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[3])
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+if capacity > 0 then
+    local rate = capacity / 60
+    local bucket = redis.call('HMGET', KEYS[2], 'tokens', 'at')
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+    end
+    tokens = tokens - tonumber(ARGV[4])
+    redis.call('HSET', KEYS[2], 'tokens', tokens, 'at', now)
+    redis.call('EXPIRE', KEYS[2], math.max(math.ceil((capacity - tokens) / rate), 0) + 1)
+end
+"""
+
+
+class RedisTenantLimits(TenantLimits):
+    """Quotas shared by every process through Redis"""
+
+    def __init__(self, redis, lease_seconds: int):
+        self.redis = redis
+        self.lease_seconds = lease_seconds
+        self._count_script = redis.register_script(_COUNT_SCRIPT)
+        self._start_script = redis.register_script(_START_SCRIPT)
+        self._finish_script = redis.register_script(_FINISH_SCRIPT)
+
+    @staticmethod
+    def _key(tenant: str, kind: str) -> str:
+        return f"leadgenie:tenant:{tenant}:{kind}"
+
+    async def room(self, tenant: str) -> int:
+        max_queued = TenantQuota.for_tenant(tenant).max_queued
+        try:
+            queued = await self._count_script(keys=[self._key(tenant, "queued")], args=[time.time()])
+        except Exception as e:
+            logger.warning("tenant_limits_unavailable", operation="room", error=str(e))
+            return max_queued
+        return max_queued - int(queued)
+
+    async def enqueue(self, tenant: str, lead_id: str) -> None:
+        key = self._key(tenant, "queued")
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {lead_id: time.time() + self.lease_seconds})
+                pipe.expire(key, self.lease_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("tenant_limits_unavailable", operation="enqueue", error=str(e))
+
+    async def start(self, tenant: str, lead_id: str, cost: int) -> float:
+        quota = TenantQuota.for_tenant(tenant)
+        try:
+            result = float(await self._start_script(
+                keys=[self._key(tenant, "queued"), self._key(tenant, "running"), self._key(tenant, "tokens")],
+                args=[time.time(), self.lease_seconds, quota.max_in_flight, quota.tokens_per_minute, cost, lead_id],
+            ))
+        except Exception as e:
+            logger.warning("tenant_limits_unavailable", operation="start", error=str(e))
+            return 0.0
+        return IN_FLIGHT_RETRY_SECONDS if result < 0 else result
+
+    async def finish(self, tenant: str, lead_id: str, cost: int, tokens_used: int) -> None:
+        try:
+            await self._finish_script(
+                keys=[self._key(tenant, "running"), self._key(tenant, "tokens")],
+                args=[time.time(), TenantQuota.for_tenant(tenant).tokens_per_minute, lead_id, tokens_used - cost],
+            )
+        except Exception as e:
+            logger.warning("tenant_limits_unavailable", operation="finish", error=str(e))
+
+    async def renew(self, held: Dict[str, List[str]]) -> None:
+        expires_at = time.time() + self.lease_seconds
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tenant, lead_ids in held.items():
+                for kind in ("queued", "running"):
+                    key = self._key(tenant, kind)
+                    # Only leads still in that set: xx never adds one
+                    pipe.zadd(key, {lead_id: expires_at for lead_id in lead_ids}, xx=True)
+                    pipe.expire(key, self.lease_seconds)
+            await pipe.execute()
+
+
+_tenant_limits: Optional[TenantLimits] = None
+
+
+def get_tenant_limits() -> TenantLimits:
+    """Redis-backed limits when Redis is configured, else this process's share"""
+    global _tenant_limits
+    if _tenant_limits is None:
+        if settings.REDIS_AVAILABLE:
+            from app.core.redis import get_redis
+
+            _tenant_limits = RedisTenantLimits(get_redis(), settings.TENANT_LEASE_SECONDS)
+        else:
+            _tenant_limits = LocalTenantLimits(settings.QUALIFICATION_PROCESSES)
+    return _tenant_limits
@@ -120,6 +120,12 @@ const categoryIcons = {
   cold: Snowflake,
 }
 
+// Fields the lead cards render; the details modal loads the full lead
+const LEAD_CARD_FIELDS = [
+  'id', 'name', 'email', 'company', 'message', 'category', 'score', 'ai_score', 'enhanced_score',
+  'status', 'intent_analysis', 'buying_signals', 'risk_factors', 'created_at',
+].join(',')
+
 const Dashboard = () => {
   const [searchQuery, setSearchQuery] = useState('')
   const [selectedCategory, setSelectedCategory] = useState('all')
@@ -160,6 +166,7 @@ const Dashboard = () => {
       const params = {
         page: currentPage,
         per_page: 10,
+        fields: LEAD_CARD_FIELDS,
         ...(selectedCategory !== 'all' && { category: selectedCategory }),
         ...(searchQuery && { search: searchQuery })
       }
@@ -289,9 +296,14 @@ const Dashboard = () => {
     setShowBulkDeleteModal(false)
   }
 
-  const handleLeadClick = (lead) => {
+  const handleLeadClick = async (lead) => {
     setSelectedLead(lead)
     setShowLeadDetails(true)
+    try {
+      setSelectedLead(await leads.getById(lead.id))
+    } catch (error) {
+      console.error('Error fetching lead details:', error)
+    }
   }
 
   const closeLeadDetails = () => {
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useForm } from 'react-hook-form'
 import { zodResolver } from '@hookform/resolvers/zod'
 import { z } from 'zod'
@@ -170,6 +170,8 @@ const LeadForm = () => {
   const [isSubmitting, setIsSubmitting] = useState(false)
   const [detectedSignals, setDetectedSignals] = useState([])
   const [detectedRisks, setDetectedRisks] = useState([])
+  // One key per submission, kept when a retry follows a network error
+  const idempotencyKey = useRef(crypto.randomUUID())
 
   const {
     register,
@@ -239,7 +241,7 @@ const LeadForm = () => {
         } : {})
       }
       
-      const result = await leads.qualify(leadData)
+      const result = await leads.qualify(leadData, idempotencyKey.current)
       toast.success('Lead submitted successfully! AI analysis complete.')
       
       // Reset form
@@ -248,6 +250,10 @@ const LeadForm = () => {
       console.log('Lead qualified:', result)
     } catch (error) {
       console.error('Submission error:', error)
+      if (error.response) {
+        // The server answered, so the next attempt is a new submission
+        idempotencyKey.current = crypto.randomUUID()
+      }
       toast.error('Failed to submit lead. Please try again.')
     } finally {
       setIsSubmitting(false)
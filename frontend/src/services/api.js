@@ -108,8 +108,11 @@ export const leads = {
     const response = await api.post('/api/v1/leads', data)
     return response.data
   },
-  qualify: async (data) => {
-    const response = await api.post('/api/v1/leads/qualify', data)
+  // Retries with the same idempotencyKey get the original lead back
+  qualify: async (data, idempotencyKey) => {
+    const response = await api.post('/api/v1/leads/qualify', data, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+    })
     return response.data
   },
   update: async (id, data) => {
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for running LeadGenie with multiple Uvicorn workers.
+
+Usage: gunicorn app.main:app -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+import shutil
+
+# Prometheus multiprocess mode needs a directory shared by all workers. It has
+# to be set before any worker imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/leadgenie-prometheus")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Without Redis, each worker enforces its share of the tenant quotas
+os.environ.setdefault("QUALIFICATION_PROCESSES", str(workers))
+
+
+def on_starting(server):
+    """Start every deployment with an empty metrics directory"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges of workers that have exited"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
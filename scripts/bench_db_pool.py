@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compare database pool and asyncpg statement cache settings under load.
+
+Runs the GET /leads query pair (count + first page) from many concurrent
+clients against the configured database, once per connection preset (and
+optionally per pool size), and reports throughput, latency percentiles and
+time spent waiting for a pooled connection. Statement caching shows up as
+the gap between "direct" and "pgbouncer-transaction"; pool sizing shows up
+as checkout wait once concurrency exceeds pool_size + max_overflow.
+
+Needs a reachable database (POSTGRES_* / SQLALCHEMY_DATABASE_URI); the
+queries only read. Point it at PgBouncer to measure the pooled presets.
+
+Usage: python scripts/bench_db_pool.py [--concurrency 50] [--duration 10]
+                                       [--presets direct,pgbouncer-transaction]
+                                       [--pool-sizes 5,20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import DB_CONNECTION_PRESETS, Settings, settings
+from app.core.database import asyncpg_connect_args
+from app.models.lead import Lead
+
+leads = Lead.__table__
+COUNT_QUERY = select(func.count(leads.c.id))
+PAGE_QUERY = select(leads).order_by(desc(leads.c.created_at)).limit(10)
+
+
+def preset_values(preset: str, pool_size: int = None) -> dict:
+    """Setting values a deployment would get from DB_CONNECTION_PRESET alone"""
+    values = {
+        name: field.default
+        for name, field in Settings.model_fields.items()
+        if name.startswith("DB_")
+    }
+    values.update(DB_CONNECTION_PRESETS[preset])
+    if pool_size is not None:
+        values["DB_POOL_SIZE"] = pool_size
+    return values
+
+
+def build_engine(values: dict):
+    return create_async_engine(
+        settings.SQLALCHEMY_DATABASE_URI,
+        pool_size=values["DB_POOL_SIZE"],
+        max_overflow=values["DB_MAX_OVERFLOW"],
+        pool_timeout=values["DB_POOL_TIMEOUT_SECONDS"],
+        pool_pre_ping=values["DB_POOL_PRE_PING"],
+        connect_args=asyncpg_connect_args(SimpleNamespace(**values)),
+    )
+
+
+async def run(values: dict, concurrency: int, duration: float) -> dict:
+    engine = build_engine(values)
+    timings, waits = [], []
+
+    async def client(deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with engine.connect() as conn:
+                waits.append(time.perf_counter() - start)
+                await conn.scalar(COUNT_QUERY)
+                (await conn.execute(PAGE_QUERY)).all()
+            timings.append(time.perf_counter() - start)
+
+    try:
+        # Warm the pool and statement caches before measuring
+        await asyncio.gather(*(client(time.perf_counter() + 0.5) for _ in range(concurrency)))
+        timings.clear()
+        waits.clear()
+        await asyncio.gather(*(client(time.perf_counter() + duration) for _ in range(concurrency)))
+    finally:
+        await engine.dispose()
+
+    timings.sort()
+    return {
+        "rps": len(timings) / duration,
+        "p50": timings[len(timings) // 2] * 1000,
+        "p99": timings[int(len(timings) * 0.99)] * 1000,
+        "wait": statistics.mean(waits) * 1000,
+    }
+
+
+async def main(concurrency: int, duration: float, presets: list, pool_sizes: list) -> None:
+    print(f"{concurrency} concurrent clients, {duration:.0f} s per configuration")
+    for preset in presets:
+        for pool_size in pool_sizes or [None]:
+            values = preset_values(preset, pool_size)
+            label = f"{preset} pool={values['DB_POOL_SIZE']}+{values['DB_MAX_OVERFLOW']}"
+            try:
+                result = await run(values, concurrency, duration)
+            except Exception as e:
+                print(f"  {label:<38} failed: {e}")
+                continue
+            print(
+                f"  {label:<38} {result['rps']:8.0f} req/s  p50 {result['p50']:6.2f} ms"
+                f"  p99 {result['p99']:6.2f} ms  checkout wait {result['wait']:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--presets", default="direct,pgbouncer-transaction")
+    parser.add_argument("--pool-sizes", default="", help="comma-separated pool sizes to try per preset")
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.concurrency,
+        args.duration,
+        [p for p in args.presets.split(",") if p],
+        [int(n) for n in args.pool_sizes.split(",") if n],
+    ))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure event-loop lag while bcrypt verifications run concurrently.
+
+A ticker task sleeps for 10 ms in a loop and records how late it wakes up.
+The benchmark then simulates a burst of concurrent logins, verifying
+passwords inline (the old behaviour) and through verify_password_async.
+
+Usage: python scripts/bench_password_hashing.py [--logins 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Settings need a database config to import; the benchmark never connects
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core.security import get_password_hash, verify_password, verify_password_async
+
+TICK = 0.01
+
+
+async def ticker(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def inline_login(password: str, hashed: str) -> bool:
+    await asyncio.sleep(0)
+    return verify_password(password, hashed)
+
+
+async def offloaded_login(password: str, hashed: str) -> bool:
+    await asyncio.sleep(0)
+    return await verify_password_async(password, hashed)
+
+
+async def measure(login, logins: int, password: str, hashed: str) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    await asyncio.gather(*(login(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "max_lag": lags[-1] * 1000 if lags else 0.0,
+        "ticks": len(lags),
+        "mean_lag": statistics.mean(lags) * 1000 if lags else 0.0,
+    }
+
+
+async def main(logins: int) -> None:
+    password = "correct horse battery staple"
+    hashed = get_password_hash(password)
+    print(f"{logins} concurrent logins, ticker every {TICK * 1000:.0f} ms")
+    for name, login in (("inline", inline_login), ("executor", offloaded_login)):
+        result = await measure(login, logins, password, hashed)
+        print(
+            f"  {name:<9} total {result['elapsed']:6.2f} s | {result['ticks']:4d} ticks"
+            f"  loop lag mean {result['mean_lag']:7.1f} ms  max {result['max_lag']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
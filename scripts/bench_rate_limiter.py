@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure the latency the rate limiter adds to each request.
+
+Runs the configured strategy against in-process memory and, when available,
+the configured shared storage (RATE_LIMIT_STORAGE_URI / Redis), spreading
+hits over many client keys like real traffic. The target is a p99 below 1 ms.
+
+Usage: python scripts/bench_rate_limiter.py [--hits 20000] [--clients 500]
+                                            [--storage-uri redis://localhost:6379/0]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Settings need a database config to import; the benchmark never connects
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from limits import parse, strategies
+from limits.storage import storage_from_string
+
+from app.core.config import settings
+from app.core.rate_limiter import GENERAL_RATE_LIMITS
+
+
+def measure(storage_uri: str, hits: int, clients: int) -> dict:
+    storage = storage_from_string(storage_uri)
+    limiter = strategies.STRATEGIES[settings.RATE_LIMIT_STRATEGY](storage)
+    limit = parse(GENERAL_RATE_LIMITS["default"])
+    storage.reset()
+    timings = []
+    for i in range(hits):
+        key = f"bench:10.0.{i % clients // 256}.{i % 256}"
+        start = time.perf_counter()
+        limiter.hit(limit, key)
+        timings.append(time.perf_counter() - start)
+    storage.reset()
+    timings.sort()
+    return {
+        "p50": timings[len(timings) // 2] * 1e6,
+        "p99": timings[int(len(timings) * 0.99)] * 1e6,
+        "mean": statistics.mean(timings) * 1e6,
+    }
+
+
+def main(hits: int, clients: int, storage_uri: str) -> None:
+    print(f"{settings.RATE_LIMIT_STRATEGY}, {GENERAL_RATE_LIMITS['default']}, {hits} hits over {clients} clients")
+    targets = ["memory://"]
+    if storage_uri and not storage_uri.startswith("memory://"):
+        targets.append(storage_uri)
+    for uri in targets:
+        try:
+            result = measure(uri, hits, clients)
+        except Exception as e:
+            print(f"  {uri.split('://')[0]:<8} unavailable: {e}")
+            continue
+        verdict = "ok" if result["p99"] < 1000 else "over 1 ms budget"
+        print(
+            f"  {uri.split('://')[0]:<8} p50 {result['p50']:7.1f} us  p99 {result['p99']:7.1f} us"
+            f"  mean {result['mean']:7.1f} us  ({verdict})"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--storage-uri", default=settings.RATE_LIMIT_STORAGE)
+    args = parser.parse_args()
+    main(args.hits, args.clients, args.storage_uri)
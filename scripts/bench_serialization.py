@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Compare JSON rendering paths for a page of leads.
+
+Builds a LeadList page of leads carrying realistic analysis blobs and renders
+it the ways the API can: validate + dump to Python + json.dumps (JSONResponse),
+the same with orjson (an orjson default_response_class), Pydantic's dump_json
+(FastAPI's path for routes with a response_model), and assembling the page
+from per-lead bodies cached by version (GET /leads, /admin/leads). Reports
+time per page and memory allocated while rendering one page.
+
+Usage: python scripts/bench_serialization.py [--leads 100] [--iterations 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Settings need a database config to import; the benchmark never connects
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+import orjson
+from pydantic import TypeAdapter
+
+# Importing the application configures every mapper
+from app.main import app  # noqa: F401
+from app.core.lead_cache import LeadResponseCache, lead_list_body
+from app.models.lead import Lead, LeadStatus
+from app.schemas.lead import LeadList
+
+PAGE = TypeAdapter(LeadList)
+
+
+def make_leads(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        Lead(
+            id=uuid.uuid4(),
+            name=f"Lead {i}",
+            email=f"lead{i}@example.com",
+            company=f"Company {i}",
+            message="We are evaluating vendors for a 200 seat rollout next quarter. " * 3,
+            category="warm",
+            score=64,
+            ai_score=60,
+            enhanced_score=64,
+            status=LeadStatus.QUALIFIED,
+            intent_analysis={"confidence": 0.82, "reasoning": "Clear budget and timeline. " * 4},
+            buying_signals=["budget approved", "timeline next quarter", "200 seats"],
+            risk_factors=["evaluating competitors"],
+            next_actions=["schedule demo", "send pricing"],
+            scoring_breakdown={
+                "base_confidence_score": 30,
+                "ai_influence_score": 18,
+                "buying_signals_score": 12,
+                "risk_factors_score": -4,
+                "combination_bonus": 8,
+                "total_score": 64,
+                "category": "warm",
+                "breakdown": {"confidence": "47%", "ai": "28%", "signals": "19%", "bonus": "6%"},
+            },
+            source="form",
+            processed_at=now,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def page_of(leads: list) -> dict:
+    return {"leads": leads, "total": 5000, "page": 1, "per_page": len(leads), "total_pages": 50}
+
+
+def json_response(leads):
+    content = PAGE.dump_python(PAGE.validate_python(page_of(leads)), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orjson_response(leads):
+    return orjson.dumps(PAGE.dump_python(PAGE.validate_python(page_of(leads)), mode="json"))
+
+
+def pydantic_dump_json(leads):
+    return PAGE.dump_json(PAGE.validate_python(page_of(leads)))
+
+
+def cached_bodies(cache: LeadResponseCache):
+    def render(leads):
+        return lead_list_body([cache.serialize(lead)[1] for lead in leads], 5000, 1, len(leads), 50)
+    return render
+
+
+def measure(render, leads: list, iterations: int) -> dict:
+    render(leads)
+    tracemalloc.start()
+    render(leads)
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render(leads)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "p50": timings[len(timings) // 2] * 1000,
+        "p99": timings[int(len(timings) * 0.99)] * 1000,
+        "peak_kb": peak / 1024,
+        "blocks": blocks,
+    }
+
+
+def main(count: int, iterations: int) -> None:
+    leads = make_leads(count)
+    cache = LeadResponseCache(max_size=count)
+    paths = [
+        ("validate + json.dumps", json_response),
+        ("validate + orjson", orjson_response),
+        ("validate + dump_json", pydantic_dump_json),
+        ("cached lead bodies", cached_bodies(cache)),
+    ]
+    reference = json.loads(pydantic_dump_json(leads))
+    print(f"{count} leads per page, {iterations} iterations, {len(pydantic_dump_json(leads)) / 1024:.0f} KB body")
+    for label, render in paths:
+        assert json.loads(render(leads)) == reference, f"{label} renders a different page"
+        result = measure(render, leads, iterations)
+        print(
+            f"  {label:<22} p50 {result['p50']:7.3f} ms  p99 {result['p99']:7.3f} ms"
+            f"  peak {result['peak_kb']:7.0f} KB  live blocks {result['blocks']:6d}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    main(args.leads, args.iterations)
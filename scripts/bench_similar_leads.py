@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Check near-duplicate lead matching: its verdict on sample pairs, its cost
+per lead and the index's memory per entry.
+
+Rewordings of one inquiry (another sender, greeting, signature, spacing)
+must match at SIMILAR_LEAD_THRESHOLD, and different inquiries from the same
+company must not. Then signs and looks up leads against an index filled
+with --entries signatures, and measures what the entries take in memory.
+
+Usage: python scripts/bench_similar_leads.py [--entries 10000] [--iterations 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Settings need a database config to import; the benchmark never connects
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core.config import settings
+from app.core.pg_listener import PostgresListener
+from app.services.ai.similar_leads import (
+    MAX_MESSAGE_CHARS,
+    SIGNATURE_SIZE,
+    SimilarLeadIndex,
+    message_signature,
+    similarity,
+)
+
+INQUIRY = (
+    "Hi team, we are a 40-person sales organization currently using spreadsheets to track leads. "
+    "We need a CRM with lead scoring and Salesforce integration, budget is approved for Q3 and we "
+    "would like to see a demo next week. Can you send pricing for 50 seats?"
+)
+
+SAME = [
+    (
+        {"name": "Jane Smith", "message": INQUIRY + "\n\nThanks,\nJane Smith\nHead of Sales"},
+        {"name": "Tom Baker", "message": "Hello,\n\n" + INQUIRY.replace("Hi team, w", "W") + "\n\nBest regards, Tom Baker"},
+    ),
+    (
+        {"name": "Jane Smith", "message": INQUIRY},
+        {"name": "Ann Lee", "message": "  ".join(INQUIRY.upper().split()) + " Ann Lee, https://acme.com/team"},
+    ),
+    (
+        {"name": "Jane Smith", "message": INQUIRY},
+        {"name": "Ann Lee", "message": "Good morning! " + INQUIRY.replace(". ", ".\n") + "\n-- \nAnn Lee | Acme Corp"},
+    ),
+]
+
+DIFFERENT = [
+    (
+        {"name": "Jane Smith", "message": INQUIRY},
+        {"name": "Tom Baker", "message": (
+            "We are unhappy with our current support desk vendor and want to evaluate your ticketing "
+            "product for our 200 agents. What does migration from Zendesk look like?"
+        )},
+    ),
+    (
+        {"name": "Jane Smith", "message": INQUIRY},
+        {"name": "Tom Baker", "message": (
+            "Hi team, we are a 40-person sales organization. Could you tell us whether you offer "
+            "a discount for nonprofits? We are only researching options for next year."
+        )},
+    ),
+]
+
+WORDS = (
+    "we need crm lead scoring pricing demo budget seats team sales integration quarter approved vendor "
+    "replace urgent support migration enterprise plan trial onboarding contract renewal users api"
+).split()
+
+
+def random_message(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+
+
+def main(entries: int, iterations: int) -> int:
+    threshold = settings.SIMILAR_LEAD_THRESHOLD
+    failures = 0
+    for expected, pairs in ((True, SAME), (False, DIFFERENT)):
+        for first, second in pairs:
+            score = similarity(message_signature(first), message_signature(second))
+            ok = (score >= threshold) == expected
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {'same' if expected else 'diff'} similarity {score:.2f}"
+                  f"  {second['message'][:50]!r}")
+    print(f"threshold {threshold}: {len(SAME) + len(DIFFERENT) - failures}/{len(SAME) + len(DIFFERENT)} pairs right")
+
+    rng = random.Random(1)
+    index = SimilarLeadIndex(PostgresListener("postgresql://bench@localhost/bench"))
+    index.max_entries = entries
+    # Random signatures, as signing this many messages would take a while
+    signatures = [tuple(rng.getrandbits(32) for _ in range(SIGNATURE_SIZE)) for _ in range(entries)]
+    now = time.time()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i, signature in enumerate(signatures):
+        index.add(f"lead-{i}", f"company:{i % 500}/acme{i % 500}.com", signature, now)
+    del signatures
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{len(index)} entries: {used / len(index):.0f} bytes each, {used / 2**20:.1f} MiB")
+
+    leads = [{"name": "Jane Smith", "message": random_message(rng)} for _ in range(iterations)]
+    timings = []
+    for i, lead in enumerate(leads):
+        start = time.perf_counter()
+        signature = message_signature(lead)
+        index.query(f"company:{i % 500}/acme{i % 500}.com", signature, threshold)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"{iterations} leads signed and looked up: p50 {timings[len(timings) // 2] * 1e3:.2f} ms"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1e3:.2f} ms"
+    )
+
+    # The longest message that is signed in full
+    long_lead = {"name": "Jane Smith", "message": (INQUIRY + " ") * (MAX_MESSAGE_CHARS // len(INQUIRY) + 1)}
+    long_lead["message"] = " ".join(
+        f"{word}{i % 97}" for i, word in enumerate(long_lead["message"].split())
+    )[:MAX_MESSAGE_CHARS]
+    start = time.perf_counter()
+    for _ in range(100):
+        message_signature(long_lead)
+    print(f"{MAX_MESSAGE_CHARS}-character message signed: {(time.perf_counter() - start) * 10:.2f} ms each")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    sys.exit(main(args.entries, args.iterations))
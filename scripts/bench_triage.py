@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Check pre-LLM lead triage: its verdict on sample leads and its cost per lead.
+
+Runs triage_reason over a set of genuine leads, which must all be forwarded
+to the LLM, and obvious junk, which must all be caught, then times it over
+the mix. The target is a p99 well under 100 microseconds per lead.
+
+Usage: python scripts/bench_triage.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Settings need a database config to import; the benchmark never connects
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.services.ai.triage import triage_reason
+
+
+def lead(message: str, email: str = "jane@acme.com", name: str = "Jane Smith") -> dict:
+    return {"name": name, "email": email, "company": "Acme", "message": message}
+
+
+GENUINE = [
+    lead("We need a CRM for our 40-person sales team. Budget is approved for Q3, can we get a demo?"),
+    lead("Looking for pricing on the enterprise plan, we want to replace our current vendor ASAP."),
+    lead("Hi, interested in learning more. What integrations do you support?"),
+    lead("Can you send a quote for 50 seats? See https://acme.com/rfp for our requirements."),
+    lead("Wir suchen eine Lösung für unser Vertriebsteam mit 20 Nutzern. Bitte um ein Angebot."),
+    lead("我们公司正在寻找销售线索管理系统，请联系我们讨论价格。"),
+    lead("Нам нужна CRM для отдела продаж, бюджет согласован. Свяжитесь с нами."),
+    lead("Our SEO agency needs lead scoring for 12 clients, timeline is 2 months."),
+    lead("Test automation company here, 200 engineers, want to evaluate your platform."),
+    lead(" ".join(["We are evaluating vendors for a 200 seat rollout next quarter."] * 40)),
+    lead("Our 300 staff work from home and we need a CRM for them."),
+    lead("We want SEO services integrated in your CRM, pricing?"),
+    lead("Need a demo."),
+    lead("Call me ASAP"),
+    lead("Need a quote for 50 seats asap", name="Anna Test"),
+]
+
+JUNK = [
+    lead("Need a quote for 50 seats asap", email="x@mailinator.com"),
+    lead("test test 123"),
+    lead("this is a test"),
+    lead("asdfasdf asdf"),
+    lead("Lorem ipsum dolor sit amet, consectetur adipiscing elit"),
+    lead("sdfgh jklqw rtzxc vbnmp"),
+    lead("aaaa aaaa aaaa aaaa"),
+    lead("!!!! ???? #### $$$$ 1234 5678"),
+    lead("Best casino bonuses, click here to claim your free spins today"),
+    lead("We sell backlinks and guest posts for your website, cheap rates"),
+    lead("Visit http://a.example http://b.example http://c.example now"),
+    lead("Work from home and earn $500 a day, see https://spam.example"),
+]
+
+
+def main(iterations: int) -> int:
+    missed = [item["message"] for item in GENUINE if triage_reason(item) is not None]
+    leaked = [item["message"] for item in JUNK if triage_reason(item) is None]
+    for message in missed:
+        print(f"genuine lead triaged as junk: {message[:60]!r} ({triage_reason(lead(message))})")
+    for message in leaked:
+        print(f"junk forwarded to the LLM: {message[:60]!r}")
+    print(f"genuine forwarded {len(GENUINE) - len(missed)}/{len(GENUINE)}, junk caught {len(JUNK) - len(leaked)}/{len(JUNK)}")
+
+    leads = GENUINE + JUNK
+    timings = []
+    for i in range(iterations):
+        item = leads[i % len(leads)]
+        start = time.perf_counter()
+        triage_reason(item)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"{iterations} leads: p50 {timings[len(timings) // 2] * 1e6:.1f} us"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us"
+    )
+    return 1 if missed or leaked else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    sys.exit(main(args.iterations))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check that importing the application stays under a cold-start budget.
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters, takes
+the fastest run and fails if it exceeds the budget, or if a module that should
+only load on first use (SQLAdmin, Jinja2, httpx) was imported eagerly.
+Prints the slowest top-level imports either way.
+
+Usage: python scripts/check_import_time.py [--budget-ms 1500] [--runs 3]
+Exit status is non-zero when the check fails, so it can gate CI.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# Settings need a database config to import; the check never connects
+DUMMY_ENV = {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "check",
+    "POSTGRES_PASSWORD": "check",
+    "POSTGRES_DB": "check",
+    "FIRST_SUPERUSER": "check@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "check",
+}
+
+# Built lazily through app.core.services; importing them at startup is a regression
+LAZY_MODULES = ("sqladmin", "jinja2", "httpx")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once(target: str) -> list:
+    env = {**DUMMY_ENV, **os.environ}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(project_root), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=project_root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {target} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500)))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile_once(args.target) for _ in range(args.runs)]
+    totals = [next(us for module, us, _ in rows if module == args.target) for rows in runs]
+    best = min(range(len(runs)), key=lambda i: totals[i])
+    rows, total_ms = runs[best], totals[best] / 1000
+
+    print(f"import {args.target}: best {total_ms:.0f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports:")
+    top_level = sorted((row for row in rows if row[2] == 1), key=lambda row: -row[1])
+    for module, us, _ in top_level[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    eager = sorted({module.split(".")[0] for module, _, _ in rows} & set(LAZY_MODULES))
+    if eager:
+        print(f"FAIL: imported eagerly, should load on first use: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Bulk import leads from a CSV or NDJSON file.
+
+Runs the same pipeline as POST /leads/import: rows are validated in chunks
+against LeadCreate and loaded with COPY, and invalid rows are written to an
+error file. With --qualify the imported leads are then qualified by
+qualification workers started in this process, and the script waits for them.
+
+CSV files need a header row with name, email, message and optionally company.
+
+Usage: python scripts/import_leads.py leads.csv [--format csv|ndjson]
+                                      [--qualify] [--tenant company:<id>]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Importing the application configures every mapper the pipeline touches
+from app.main import app  # noqa: F401
+from app.api.v1.endpoints.leads import process_lead_qualification
+from app.core.database import async_session_factory, engine
+from app.models.lead_import_job import LeadImportJob
+from app.services.lead_import import IMPORT_FORMATS, lead_importer
+from app.services.qualification_scheduler import qualification_scheduler
+
+
+def print_progress(job: LeadImportJob) -> None:
+    print(
+        f"\r{job.status:<10} read {job.rows_read:>9,}  imported {job.rows_imported:>9,}  merged {job.rows_merged:>7,}"
+        f"  failed {job.rows_failed:>7,}  queued for qualification {job.rows_enqueued:>9,}",
+        end="",
+        flush=True,
+    )
+
+
+async def main(path: Path, import_format: str, qualify: bool, tenant: str) -> int:
+    async with async_session_factory() as db:
+        job = LeadImportJob(format=import_format, qualify=qualify, status="pending")
+        db.add(job)
+        await db.commit()
+
+    if qualify:
+        qualification_scheduler.start()
+    started = time.monotonic()
+    try:
+        job = await lead_importer.run(
+            job.id,
+            str(path),
+            tenant,
+            qualify=process_lead_qualification if qualify else None,
+            on_progress=print_progress,
+        )
+        if qualify:
+            while qualification_scheduler.pending(tenant):
+                await asyncio.sleep(1)
+    finally:
+        await qualification_scheduler.stop()
+        await engine.dispose()
+
+    print(f"\nImport {job.id} {job.status} in {time.monotonic() - started:.1f} s")
+    if job.error_message:
+        print(f"Error: {job.error_message}")
+    if job.error_file:
+        print(f"Rejected rows: {job.error_file}")
+    return 0 if job.status == "completed" else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--qualify", action="store_true", help="qualify the imported leads")
+    parser.add_argument("--tenant", default="anonymous", help="qualification tenant, e.g. company:<id>")
+    args = parser.parse_args()
+    import_format = args.format or ("ndjson" if args.path.suffix in (".ndjson", ".jsonl") else "csv")
+    sys.exit(asyncio.run(main(args.path, import_format, args.qualify, args.tenant)))